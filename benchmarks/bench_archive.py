@@ -0,0 +1,122 @@
+"""
+Benchmark the daily input path before and after archiving old entries.
+
+Builds a database holding years of synthetic history, times the operations
+the dashboard runs on every input, moves everything older than a year into
+the yearly archives with archive_entries and times the same operations
+again. A multi-year history query is timed as well, to show the cost of
+reading through the attached archives.
+
+Usage:
+    python benchmarks/bench_archive.py --years 10 --meals 8
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "catweight")))
+from db import CAT_ID_SQL, CatWeightDatabase
+
+CATS = ["Mittens", "Cheddar", "Lola"]
+
+
+def populate(db, years, meals_per_day, seed=0):
+    """Fill the database with meals_per_day completed entries per cat and day for the last years."""
+    rng = random.Random(seed)
+    today = datetime.date.today()
+    created_at = datetime.datetime.now().isoformat()
+
+    def rows():
+        for offset in range(years * 365, 0, -1):
+            day = (today - datetime.timedelta(days=offset)).isoformat()
+            for cat_name in CATS:
+                for _ in range(meals_per_day):
+                    yield cat_name, day, rng.uniform(80, 150), rng.uniform(0, 40), created_at
+
+    db.cursor.executemany(
+        "INSERT INTO cat_weights (cat_id, date, initial_weight, remaining_weight, created_at) "
+        f"VALUES ({CAT_ID_SQL}, ?, ?, ?, ?)",
+        rows()
+    )
+    db.conn.commit()
+    db.cursor.execute("ANALYZE")
+
+
+def time_call(func, repeat):
+    """Return the median wall time of func in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+def record_meal(db):
+    """The input path: add an entry for today and record its remaining weight."""
+    entry_id = db.add_entry("Lola", 120.0)
+    db.update_remaining_weight(entry_id, 30.0)
+
+
+def run(years, meals_per_day, repeat):
+    today = datetime.date.today()
+    week_ago = (today - datetime.timedelta(days=7)).isoformat()
+    month_ago = (today - datetime.timedelta(days=30)).isoformat()
+    history_start = (today - datetime.timedelta(days=3 * 365)).isoformat()
+
+    # Recording a meal comes last, so the meals it adds are not read by the
+    # other operations; they are deleted again after each round
+    operations = {
+        "today's open entries": lambda db: db.get_todays_open_entries("Lola"),
+        "7d range, one cat": lambda db: db.get_entries_by_date_range(week_ago, today.isoformat(), "Lola"),
+        "30d daily totals": lambda db: db.get_daily_consumption(month_ago, today.isoformat()),
+        "3 years, one cat": lambda db: db.get_entries_by_date_range(history_start, today.isoformat(), "Lola"),
+        "record a meal": record_meal,
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        db = CatWeightDatabase(db_path)
+        populate(db, years, meals_per_day)
+        hot_rows = db.conn.execute("SELECT COUNT(*) FROM cat_weights").fetchone()[0]
+        # Move the pages still in the WAL into the database file, so its size counts them
+        db.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+        hot_size = os.path.getsize(db_path)
+        before = {name: time_call(lambda: operation(db), repeat) for name, operation in operations.items()}
+        db.delete_entries_by_date(today.isoformat())
+
+        start = time.perf_counter()
+        moved = db.archive_entries()
+        elapsed = time.perf_counter() - start
+        db.cursor.execute("VACUUM")
+        db.cursor.execute("ANALYZE")
+        db.close()
+        print(f"Archived {moved} of {hot_rows} entries into {len(os.listdir(db.archive_dir))} files in {elapsed:.2f}s; "
+              f"database shrank from {hot_size / 1e6:.1f} MB to {os.path.getsize(db_path) / 1e6:.1f} MB")
+
+        # Reopen, as a new process would, so the timings include attaching archives
+        db = CatWeightDatabase(db_path)
+        after = {name: time_call(lambda: operation(db), repeat) for name, operation in operations.items()}
+        db.close()
+
+    print(f"{'operation':>22}  {'before':>10}  {'after':>10}")
+    for name in operations:
+        print(f"{name:>22}  {before[name]:>8.3f}ms  {after[name]:>8.3f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--years", type=int, default=10, help="years of synthetic history")
+    parser.add_argument("--meals", type=int, default=8, help="entries per cat and day")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    run(args.years, args.meals, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
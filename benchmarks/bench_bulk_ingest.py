@@ -0,0 +1,75 @@
+"""
+Benchmark bulk ingestion against the per-row add/update path.
+
+The per-row path calls add_entry and update_remaining_weight for each reading,
+committing once per row. The bulk path streams the same readings through
+add_entries_bulk and update_remaining_weights_bulk, which commit once.
+
+Usage:
+    python benchmarks/bench_bulk_ingest.py --rows 5000 --chunk-size 1000
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "catweight")))
+from db import CatWeightDatabase
+
+CATS = ["Mittens", "Cheddar", "Lola"]
+
+
+def readings(num_rows, seed=0):
+    """Yield synthetic (cat_name, date, initial_weight, remaining_weight) readings."""
+    rng = random.Random(seed)
+    start = datetime.date.today() - datetime.timedelta(days=num_rows // len(CATS))
+    for i in range(num_rows):
+        day = start + datetime.timedelta(days=i // len(CATS))
+        yield CATS[i % len(CATS)], day.isoformat(), rng.uniform(80, 150), rng.uniform(0, 40)
+
+
+def per_row(db, num_rows, chunk_size):
+    for cat_name, date, initial, remaining in readings(num_rows):
+        entry_id = db.add_entry(cat_name, initial, date)
+        db.update_remaining_weight(entry_id, remaining)
+
+
+def bulk(db, num_rows, chunk_size):
+    rows = list(readings(num_rows))
+    entry_ids = db.add_entries_bulk(
+        ({"cat_name": cat_name, "date": date, "initial_weight": initial} for cat_name, date, initial, _ in rows),
+        chunk_size=chunk_size
+    )
+    db.update_remaining_weights_bulk(
+        ((entry_id, row[3]) for entry_id, row in zip(entry_ids, rows)),
+        chunk_size=chunk_size
+    )
+
+
+def run(num_rows, chunk_size):
+    results = {}
+    for name, ingest in (("per-row", per_row), ("bulk", bulk)):
+        with tempfile.TemporaryDirectory() as tmp:
+            db = CatWeightDatabase(os.path.join(tmp, "bench.db"))
+            start = time.perf_counter()
+            ingest(db, num_rows, chunk_size)
+            elapsed = time.perf_counter() - start
+            db.close()
+        results[name] = elapsed
+        print(f"{name:>8}: {num_rows} rows in {elapsed:.3f}s ({num_rows / elapsed:,.0f} rows/s)")
+    print(f" speedup: {results['per-row'] / results['bulk']:.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+    run(args.rows, args.chunk_size)
+
+
+if __name__ == "__main__":
+    main()
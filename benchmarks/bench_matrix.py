@@ -0,0 +1,101 @@
+"""
+Benchmark reading daily totals from the consumption matrix against SQLite.
+
+Builds a database holding years of synthetic history with a consumption
+matrix, then times reading each cat's daily consumption over windows of
+several lengths from the daily_consumption rollup and from the matrix, and
+the cost the matrix adds to recording a meal.
+
+Usage:
+    python benchmarks/bench_matrix.py --years 5 --cats 3
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "catweight")))
+from db import CatWeightDatabase
+from matrix import ConsumptionMatrix, default_matrix_path
+
+WINDOWS = (7, 30, 365, 3 * 365)
+
+
+def populate(db, years, cats, seed=0):
+    """Fill the database with two completed meals per cat and day for the last years."""
+    rng = random.Random(seed)
+    today = datetime.date.today()
+    db.add_entries_bulk(
+        {
+            "cat_name": f"Cat {cat}",
+            "date": (today - datetime.timedelta(days=offset)).isoformat(),
+            "initial_weight": rng.uniform(80, 150),
+            "remaining_weight": rng.uniform(0, 40),
+        }
+        for offset in range(years * 365, 0, -1)
+        for cat in range(cats)
+        for _ in range(2)
+    )
+
+
+def time_call(func, repeat):
+    """Return the median wall time of func in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+def run(years, cats, repeat):
+    today = datetime.date.today()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        plain = CatWeightDatabase(db_path)
+        populate(plain, years, cats)
+        matrix = ConsumptionMatrix(default_matrix_path(db_path))
+        db = CatWeightDatabase(db_path, matrix=matrix)
+        cat_ids = [cat["id"] for cat in db.get_cats() if cat["name"].startswith("Cat ")]
+
+        print(f"{'window':>10}  {'rollup':>10}  {'matrix':>10}")
+        for days in WINDOWS:
+            start_date = (today - datetime.timedelta(days=days - 1)).isoformat()
+
+            def from_rollup():
+                return db.get_daily_consumption(start_date, today.isoformat())
+
+            def from_matrix():
+                cells = matrix.window(start_date, today.isoformat())
+                return [cells[cat_id]["consumed"] for cat_id in cat_ids]
+
+            print(f"{days:>9}d  {time_call(from_rollup, repeat):>8.3f}ms  {time_call(from_matrix, repeat):>8.3f}ms")
+
+        def record_meal(database):
+            entry_id = database.add_entry("Cat 0", 120.0)
+            database.update_remaining_weight(entry_id, 30.0)
+
+        plain_ms = time_call(lambda: record_meal(plain), repeat)
+        matrix_ms = time_call(lambda: record_meal(db), repeat)
+        print(f"record a meal: {plain_ms:.3f}ms without the matrix, {matrix_ms:.3f}ms with it; "
+              f"matrix file {os.stat(matrix.path).st_blocks * 512 / 1e3:.0f} kB on disk")
+        db.close()
+        plain.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--years", type=int, default=5, help="years of synthetic history")
+    parser.add_argument("--cats", type=int, default=3, help="number of cats")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    run(args.years, args.cats, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
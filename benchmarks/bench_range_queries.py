@@ -0,0 +1,99 @@
+"""
+Benchmark the hot read queries as the cat_weights table grows.
+
+Builds synthetic histories of increasing size and times the dashboard's
+range queries against each. With the schema indexes in place the per-query
+latency should stay roughly flat while the row count grows by orders of
+magnitude. Pass --no-indexes to drop them and see the full-scan baseline,
+and --cats to spread the rows over more cats.
+
+Usage:
+    python benchmarks/bench_range_queries.py --sizes 10000 100000 1000000 --cats 3
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "catweight")))
+from db import CAT_ID_SQL, CatWeightDatabase
+
+CATS = ["Mittens", "Cheddar", "Lola"]
+
+
+def populate(db, num_rows, cats=CATS, seed=0):
+    """Fill the database with num_rows entries of the cats spread back in time from today."""
+    rng = random.Random(seed)
+    today = datetime.date.today()
+    for cat_name in cats:
+        db.add_cat(cat_name)
+    # Roughly two meals per cat per day
+    num_days = max(1, num_rows // (len(cats) * 2))
+    created_at = datetime.datetime.now().isoformat()
+
+    def rows():
+        for i in range(num_rows):
+            day = today - datetime.timedelta(days=rng.randrange(num_days))
+            remaining = None if day == today and rng.random() < 0.5 else rng.uniform(0, 40)
+            yield (cats[i % len(cats)], day.isoformat(), rng.uniform(80, 150), remaining, created_at)
+
+    db.cursor.executemany(
+        "INSERT INTO cat_weights (cat_id, date, initial_weight, remaining_weight, created_at) "
+        f"VALUES ({CAT_ID_SQL}, ?, ?, ?, ?)",
+        rows()
+    )
+    db.conn.commit()
+    db.cursor.execute("ANALYZE")
+
+
+def time_call(func, repeat):
+    """Return the median wall time of func in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+def run(sizes, repeat, drop_indexes, num_cats=len(CATS)):
+    today = datetime.date.today()
+    week_ago = (today - datetime.timedelta(days=7)).isoformat()
+    month_ago = (today - datetime.timedelta(days=30)).isoformat()
+
+    queries = {
+        "7d range, one cat": lambda db: db.get_entries_by_date_range(week_ago, today.isoformat(), "Lola"),
+        "30d range, all cats": lambda db: db.get_entries_by_date_range(month_ago, today.isoformat()),
+        "today's open entries": lambda db: db.get_todays_open_entries("Lola"),
+        "30d daily totals": lambda db: db.get_daily_consumption(month_ago, today.isoformat()),
+    }
+
+    print(f"{'rows':>10}  " + "  ".join(f"{name:>22}" for name in queries))
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            db = CatWeightDatabase(os.path.join(tmp, "bench.db"))
+            if drop_indexes:
+                for index in ("idx_cat_weights_cat_date", "idx_cat_weights_date", "idx_cat_weights_open"):
+                    db.cursor.execute(f"DROP INDEX IF EXISTS {index}")
+            populate(db, size, CATS + [f"Cat {i}" for i in range(len(CATS), num_cats)])
+            timings = [time_call(lambda: query(db), repeat) for query in queries.values()]
+            db.close()
+        print(f"{size:>10}  " + "  ".join(f"{ms:>20.3f}ms" for ms in timings))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--no-indexes", action="store_true", help="drop the schema indexes before timing")
+    parser.add_argument("--cats", type=int, default=len(CATS), help="number of cats to spread the rows over")
+    args = parser.parse_args()
+    run(args.sizes, args.repeat, args.no_indexes, args.cats)
+
+
+if __name__ == "__main__":
+    main()
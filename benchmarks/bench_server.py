@@ -0,0 +1,110 @@
+"""
+Load-test the HTTP ingestion API.
+
+Concurrent clients post readings over kept-alive connections for a fixed
+duration, each adding an entry and then recording its remaining weight, and
+the achieved requests per second and latency percentiles are reported.
+Without --url, a local server is started in-process on a temporary database,
+once with group commit disabled (--max-batch 1) and once with the default
+batch size, so the effect of sharing commits is visible.
+
+Usage:
+    python benchmarks/bench_server.py --clients 16 --seconds 5
+    python benchmarks/bench_server.py --url http://127.0.0.1:8502 --clients 16
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "catweight")))
+from server import DEFAULT_MAX_BATCH, IngestServer
+
+CATS = ["Mittens", "Cheddar", "Lola"]
+
+
+def client(host, port, deadline, latencies, errors, seed):
+    """Post add/close pairs until the deadline, recording each request's latency."""
+    rng = random.Random(seed)
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    headers = {"Content-Type": "application/json"}
+
+    def post(path, body):
+        start = time.perf_counter()
+        conn.request("POST", path, body=json.dumps(body), headers=headers)
+        response = conn.getresponse()
+        payload = json.loads(response.read())
+        latencies.append(time.perf_counter() - start)
+        if response.status >= 400:
+            errors.append(response.status)
+        return payload
+
+    while time.perf_counter() < deadline:
+        initial = round(rng.uniform(80, 150), 1)
+        created = post("/entries", {"cat_name": rng.choice(CATS), "initial_weight": initial})
+        if "id" in created:
+            post(f"/entries/{created['id']}/remaining", {"remaining_weight": round(rng.uniform(0, initial), 1)})
+    conn.close()
+
+
+def load(host, port, num_clients, seconds):
+    """Run the clients against a server and return (requests, errors, elapsed, latencies)."""
+    latencies, errors = [], []
+    deadline = time.perf_counter() + seconds
+    threads = [
+        threading.Thread(target=client, args=(host, port, deadline, latencies, errors, seed))
+        for seed in range(num_clients)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return len(latencies), len(errors), time.perf_counter() - start, sorted(latencies)
+
+
+def report(name, requests, errors, elapsed, latencies):
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000 if latencies else float("nan")
+
+    print(f"{name:>14}: {requests / elapsed:,.0f} req/s ({requests} requests, {errors} errors), "
+          f"p50 {percentile(0.5):.1f}ms, p99 {percentile(0.99):.1f}ms")
+
+
+def run_local(num_clients, seconds, profile):
+    for name, max_batch in (("no group", 1), ("group commit", DEFAULT_MAX_BATCH)):
+        with tempfile.TemporaryDirectory() as tmp:
+            server = IngestServer(("127.0.0.1", 0), os.path.join(tmp, "bench.db"), profile=profile,
+                                  max_batch=max_batch)
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            try:
+                report(name, *load(*server.server_address, num_clients, seconds))
+            finally:
+                server.shutdown()
+                server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="base URL of a running server (default: start local servers)")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--profile", default="durable", help="connection profile of the local servers")
+    args = parser.parse_args()
+
+    if args.url:
+        url = urlsplit(args.url)
+        report(url.netloc, *load(url.hostname, url.port or 80, args.clients, args.seconds))
+    else:
+        run_local(args.clients, args.seconds, args.profile)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""
+Vectorized consumption statistics for the dashboard.
+"""
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Mapping, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from online_stats import RunningStats
+
+
+WEEKDAY_NAMES = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+# Relative change between the two halves of a window that counts as a trend
+HALF_WINDOW_TREND_THRESHOLD = 0.1
+# Fewest tracked days for the half-window trend
+MIN_TREND_DAYS = 3
+# Fewest tracked days for the least-squares trend
+MIN_REGRESSION_DAYS = 10
+# Fewest meals on a weekday before its average is reported
+MIN_WEEKDAY_MEALS = 3
+
+DAILY_FRAME_DTYPES = {
+    "cat_name": object,
+    "date": object,
+    "consumed": "float64",
+    "meals": "int64",
+    "initial_total": "float64",
+    "remaining_total": "float64",
+}
+
+PER_CAT_COLUMNS = [
+    "total_consumed", "meals", "days_tracked", "avg_consumed", "consistency",
+    "trend", "slope", "trend_strength", "leftover_pct",
+]
+
+
+def daily_frame(daily: Dict[str, Dict[str, Dict[str, Any]]], start_date: str, end_date: str) -> pd.DataFrame:
+    """
+    Flatten per-cat, per-day totals into one row per cat and tracked day.
+
+    Days without a completed entry are dropped, as they carry no consumption.
+
+    Args:
+        daily: Per-cat, per-day totals as returned by get_daily_consumption
+        start_date: Start date in YYYY-MM-DD format
+        end_date: End date in YYYY-MM-DD format
+
+    Returns:
+        A DataFrame with cat_name, date, consumed, meals, initial_total and
+        remaining_total columns, sorted by cat and date
+    """
+    rows = [
+        (cat_name, date, day["consumed"], day["complete_count"], day["initial_total"], day["remaining_total"])
+        for cat_name, days in daily.items()
+        for date, day in days.items()
+        if start_date <= date <= end_date and day["complete_count"] > 0
+    ]
+    frame = pd.DataFrame(rows, columns=list(DAILY_FRAME_DTYPES)).astype(DAILY_FRAME_DTYPES)
+    return frame.sort_values(["cat_name", "date"], ignore_index=True)
+
+
+@dataclass(frozen=True)
+class WindowStats:
+    """
+    Statistics for every cat over one date window.
+
+    Attributes:
+        start_date: First day of the window in YYYY-MM-DD format
+        end_date: Last day of the window in YYYY-MM-DD format
+        per_cat: One row per cat with completed entries, indexed by cat name
+            in the requested order, with the PER_CAT_COLUMNS columns
+        daily_totals: Consumption of all cats per tracked day, indexed by date
+        weekday: Consumption, meals and average per meal for each weekday,
+            indexed 0 (Monday) to 6 (Sunday); the average is NaN for weekdays
+            with fewer than MIN_WEEKDAY_MEALS meals
+    """
+    start_date: str
+    end_date: str
+    per_cat: pd.DataFrame
+    daily_totals: pd.Series
+    weekday: pd.DataFrame
+
+    @property
+    def empty(self) -> bool:
+        """Whether no cat has a completed entry in the window."""
+        return self.per_cat.empty
+
+    def leader(self, column: str, largest: bool = True, min_days: int = 1) -> Optional[str]:
+        """
+        Find the cat with the highest or lowest value of a statistic.
+
+        Ties go to the cat that comes first in per_cat.
+
+        Args:
+            column: One of PER_CAT_COLUMNS
+            largest: Whether to pick the highest value rather than the lowest
+            min_days: Only consider cats tracked on at least this many days
+
+        Returns:
+            The cat name, or None when no cat has a value
+        """
+        values = self.per_cat.loc[self.per_cat["days_tracked"] >= min_days, column].dropna()
+        if values.empty:
+            return None
+        return values.idxmax() if largest else values.idxmin()
+
+
+def compute_window_stats(
+    daily: Dict[str, Dict[str, Dict[str, Any]]],
+    start_date: str,
+    end_date: str,
+    cats: Optional[Iterable[str]] = None,
+    running: Optional[Mapping[str, RunningStats]] = None,
+) -> WindowStats:
+    """
+    Compute the statistics of all cats over a window in one pass.
+
+    Per cat this gives the total and per-meal consumption, the standard
+    deviation of daily totals, a half-window trend (second half of the tracked
+    days at least 10% above or below the first half) and a least-squares slope
+    of daily totals against the tracked-day index. The slopes of all cats come
+    from the closed-form solution over grouped sums rather than one fit per cat.
+
+    Args:
+        daily: Per-cat, per-day totals as returned by get_daily_consumption
+        start_date: Start date in YYYY-MM-DD format
+        end_date: End date in YYYY-MM-DD format
+        cats: Order of the cats in per_cat (defaults to alphabetical order);
+            cats not listed are left out
+        running: Optional running statistics for the same window, as returned
+            by get_running_stats. When given, everything except the half-window
+            trend and the daily totals is taken from them instead of being
+            aggregated from daily.
+
+    Returns:
+        The WindowStats for the window
+    """
+    frame = daily_frame(daily, start_date, end_date)
+    if cats is not None:
+        cats = list(cats)
+        frame = frame[frame["cat_name"].isin(cats)]
+
+    if running is None:
+        sums, weekday = _aggregate_days(frame)
+    else:
+        selected = {cat: stats for cat, stats in running.items() if stats.days and (cats is None or cat in cats)}
+        sums, weekday = _aggregate_running(selected)
+
+    n = sums["days"]
+    per_cat = pd.DataFrame(index=sums.index)
+    per_cat["total_consumed"] = sums["consumed"]
+    per_cat["meals"] = sums["meals"].astype(int)
+    per_cat["days_tracked"] = n.astype(int)
+    per_cat["avg_consumed"] = sums["consumed"] / sums["meals"]
+    per_cat["consistency"] = sums["std"].where(n > 1, 0.0)
+    per_cat["trend"] = _half_window_trend(frame).reindex(per_cat.index).fillna("stable")
+
+    mean = sums["consumed"] / n
+    has_regression = (n >= MIN_REGRESSION_DAYS) & (mean > 0)
+    per_cat["slope"] = sums["slope"].where(has_regression)
+    # Change over the window relative to the average day
+    per_cat["trend_strength"] = (sums["slope"] * n / mean).abs().where(has_regression)
+
+    initial = sums["initial_total"]
+    per_cat["leftover_pct"] = (sums["remaining_total"] / initial.where(initial > 0)) * 100
+
+    order = cats if cats is not None else sorted(per_cat.index)
+    per_cat = per_cat.reindex([cat for cat in order if cat in per_cat.index])[PER_CAT_COLUMNS]
+
+    daily_totals = frame.groupby("date")["consumed"].sum().sort_index()
+
+    weekday.index.name = "weekday"
+    weekday["avg_consumed"] = (weekday["consumed"] / weekday["meals"]).where(weekday["meals"] >= MIN_WEEKDAY_MEALS)
+
+    return WindowStats(start_date, end_date, per_cat, daily_totals, weekday)
+
+
+def _aggregate_days(frame: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Per-cat sums, spread and slope, and weekday sums, from one row per tracked day."""
+    x = frame.groupby("cat_name", sort=False).cumcount().astype(float)
+    y = frame["consumed"]
+    frame = frame.assign(x=x, xx=x * x, xy=x * y)
+
+    groups = frame.groupby("cat_name")
+    sums = groups[["consumed", "meals", "initial_total", "remaining_total", "x", "xx", "xy"]].sum()
+    sums["days"] = groups.size().astype(float)
+    sums["std"] = groups["consumed"].std(ddof=0)
+
+    # Least squares y = slope * x + b for every cat at once
+    n = sums["days"]
+    denominator = n * sums["xx"] - sums["x"] ** 2
+    sums["slope"] = (n * sums["xy"] - sums["x"] * sums["consumed"]) / denominator.where(denominator > 0)
+
+    weekday = frame.groupby(pd.to_datetime(frame["date"]).dt.weekday)[["consumed", "meals"]].sum()
+    return sums, weekday.reindex(range(7), fill_value=0)
+
+
+def _aggregate_running(running: Mapping[str, RunningStats]) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Per-cat sums, spread and slope, and weekday sums, from running statistics."""
+    sums = pd.DataFrame(
+        [
+            (cat, stats.consumed, stats.meals, stats.initial_total, stats.remaining_total,
+             float(stats.days), stats.std, stats.slope)
+            for cat, stats in running.items()
+        ],
+        columns=["cat_name", "consumed", "meals", "initial_total", "remaining_total", "days", "std", "slope"],
+    ).set_index("cat_name")
+
+    weekday = pd.DataFrame({"consumed": np.zeros(7), "meals": np.zeros(7, dtype=int)})
+    for stats in running.values():
+        weekday["consumed"] += stats.weekday_consumed
+        weekday["meals"] += stats.weekday_meals
+    return sums, weekday
+
+
+def _half_window_trend(frame: pd.DataFrame) -> pd.Series:
+    """Half-window trend per cat from one row per tracked day, sorted by cat and date."""
+    groups = frame.groupby("cat_name", sort=False)
+    n = groups["date"].transform("size")
+    first_half = groups.cumcount() < n // 2
+    y = frame["consumed"]
+
+    sums = frame.assign(first=y.where(first_half, 0.0), first_days=first_half.astype(int)).groupby("cat_name")[
+        ["consumed", "first", "first_days"]
+    ].sum()
+    days = groups.size().reindex(sums.index)
+    first_avg = sums["first"] / sums["first_days"]
+    second_avg = (sums["consumed"] - sums["first"]) / (days - sums["first_days"])
+
+    has_trend = days >= MIN_TREND_DAYS
+    trend = np.select(
+        [
+            has_trend & (second_avg > first_avg * (1 + HALF_WINDOW_TREND_THRESHOLD)),
+            has_trend & (second_avg < first_avg * (1 - HALF_WINDOW_TREND_THRESHOLD)),
+        ],
+        ["increasing", "decreasing"],
+        "stable",
+    )
+    return pd.Series(trend, index=sums.index, dtype=object)
@@ -7,46 +7,148 @@ import matplotlib.pyplot as plt
 import datetime
 import numpy as np
 import os
-import base64
-from db import CatWeightDatabase
+import io
+import zlib
+import threading
+from contextlib import contextmanager
+from db import CatWeightDatabase, DEFAULT_DB_PATH
+from pool import ConnectionPool
+from cache import QueryCache
+from matrix import ConsumptionMatrix, default_matrix_path
+from dashboard_data import DashboardData, DASHBOARD_WINDOW_DAYS
+from analytics import WEEKDAY_NAMES, compute_window_stats
+from chart_cache import ChartCache, fingerprint
+from assets import AssetCache
 
 # Constants
-CATS = ["Mittens", "Cheddar", "Lola"]
-CAT_COLORS = {
-    "Mittens": "#FF9671",  # Orange
-    "Cheddar": "#FFC75F",  # Yellow
-    "Lola": "#D65DB1"      # Pink
+# Colors of cats that have none of their own in the cats table, picked by cat id
+CAT_PALETTE = ["#FF9671", "#FFC75F", "#D65DB1", "#00C9A7", "#845EC2", "#F9F871", "#C34A36", "#4D8076"]
+# Shown for cats without a picture
+CAT_FALLBACK_EMOJI = "🐱"
+# Number of cats shown side by side in the per-cat sections; with more cats,
+# a control in the sidebar pages through them
+CATS_PER_PAGE = int(os.environ.get("CATWEIGHT_CATS_PER_PAGE", "6"))
+
+# Maximum number of SQLite connections shared by all sessions of this process
+DB_POOL_SIZE = int(os.environ.get("CATWEIGHT_DB_POOL_SIZE", "8"))
+# Whether to keep the memory-mapped consumption matrix next to the database,
+# which long history ranges are read from instead of SQLite
+USE_CONSUMPTION_MATRIX = os.environ.get("CATWEIGHT_CONSUMPTION_MATRIX", "1") == "1"
+
+# Number of most recent days shown in the history chart
+HISTORY_CHART_DAYS = 10
+# Everything about the history chart's appearance that is not data; part of
+# the key its rendered images are cached under. Format is "png" or "svg".
+HISTORY_CHART_THEME = {
+    "figsize": (14, 8),
+    "background": "#262730",
+    "dpi": 200,
+    "format": "png",
 }
-CAT_EMOJIS = {
-    "Mittens": "🐱",
-    "Cheddar": "🐈",
-    "Lola": "😺"
+# How the history chart is drawn: "matplotlib" renders an image on the server,
+# "altair" sends the daily series to the browser as an interactive Vega-Lite chart
+HISTORY_CHART_BACKEND = os.environ.get("CATWEIGHT_CHART_BACKEND", "matplotlib")
+# Ranges the interactive history chart can show, in days up to and including today
+HISTORY_CHART_RANGES = {"10 days": 10, "30 days": 30, "90 days": 90, "1 year": 365}
+
+# Page stylesheet in the static asset directory
+PAGE_STYLESHEET = "style.css"
+
+# Kinds of data each dashboard fragment shows, by fragment key. "entries"
+# changes with every write; "consumption" only when a remaining weight is
+# recorded or entries are deleted. A write reruns just the fragments that
+# depend on what it changed.
+FRAGMENT_DEPENDENCIES = {
+    "status": {"entries"},
+    "input_panel": {"entries"},
+    "cat_cards": {"entries"},
+    "history": {"consumption"},
+    "stats_7days": {"consumption"},
+    "stats_30days": {"consumption"},
 }
 
-# Function to handle the cat image for Cheddar
-def get_cat_icon_html(cat_name):
-    """Get HTML to display the cat icon (emoji or image)"""
-    # Use image files for all cats
-    image_name = f"{cat_name.lower()}.png"
+
+@st.cache_resource
+def get_database():
+    """
+    Get the process-wide database handle, backed by a shared connection pool.
+    
+    Reads are cached across sessions and invalidated by every write, so most
+    reruns are served without querying SQLite. The consumption matrix file is
+    shared with the other server processes on the same database.
+    """
+    return CatWeightDatabase(
+        pool=ConnectionPool(DEFAULT_DB_PATH, max_size=DB_POOL_SIZE),
+        cache=QueryCache(),
+        matrix=ConsumptionMatrix(default_matrix_path(DEFAULT_DB_PATH)) if USE_CONSUMPTION_MATRIX else None
+    )
+
+
+@st.cache_resource
+def get_chart_cache():
+    """Get the process-wide cache of rendered chart images, shared by all sessions."""
+    return ChartCache()
+
+
+@st.cache_resource
+def get_asset_cache():
+    """Get the process-wide cache of encoded images, shared by all sessions."""
+    return AssetCache()
+
+
+def cat_color(cat):
+    """
+    Get the color a cat is shown in.
+    
+    Args:
+        cat: The cat's dictionary as returned by get_cats
+    
+    Returns:
+        The cat's own color, or one from CAT_PALETTE that stays the same for
+        the cat across runs
+    """
+    if cat.get("color"):
+        return cat["color"]
+    index = cat["id"] if cat.get("id") is not None else zlib.crc32(cat["name"].encode("utf-8"))
+    return CAT_PALETTE[index % len(CAT_PALETTE)]
+
+
+def get_cat_icon_html(cat, assets=None, static_serving=None):
+    """
+    Get HTML to display the cat icon (emoji or image).
+    
+    With Streamlit's static file serving enabled the image is linked, so the
+    browser downloads it once and keeps it cached; otherwise it is inlined as
+    a data URI encoded once per process.
+    
+    Args:
+        cat: The cat's dictionary as returned by get_cats; cats without an
+            image fall back to <name>.png and then to CAT_FALLBACK_EMOJI
+        assets: Asset cache to use (defaults to the process-wide one)
+        static_serving: Whether to link the image (defaults to the
+            server.enableStaticServing option)
+    """
+    cat_name = cat["name"]
+    image_name = cat.get("image") or f"{cat_name.lower()}.png"
+    if assets is None:
+        assets = get_asset_cache()
+    if static_serving is None:
+        static_serving = st.get_option("server.enableStaticServing")
+    src = assets.static_url(image_name) if static_serving else assets.data_uri(image_name)
+    
+    if not src:
+        return f"""
+    <div class="emoji-container" title="{cat_name}">{CAT_FALLBACK_EMOJI}</div>
+    """
     
     # Display the image using HTML for better styling control
     return f"""
     <div class="emoji-container cat-image-container">
-        <img src="data:image/png;base64,{get_image_base64(image_name)}" 
+        <img src="{src}" 
              class="cat-image" alt="{cat_name}">
     </div>
     """
 
-def get_image_base64(image_name):
-    """Convert an image to base64 string for embedding in HTML"""
-    image_path = os.path.join(os.path.dirname(__file__), "images", image_name)
-    if not os.path.exists(image_path):
-        # Return empty string if image doesn't exist
-        return ""
-    
-    with open(image_path, "rb") as img_file:
-        return base64.b64encode(img_file.read()).decode()
-
 def setup_page():
     """Configure the Streamlit page settings."""
     st.set_page_config(
@@ -56,225 +158,9 @@ def setup_page():
         initial_sidebar_state="expanded"
     )
     
-    # Custom CSS
-    st.markdown("""
-    <style>
-        .main-header {
-            font-size: 2.5rem;
-            color: #1E88E5;
-            text-align: center;
-            margin-bottom: 1rem;
-        }
-        # .cat-card {
-        #     background-color: rgba(49, 51, 63, 0.7);
-        #     border-radius: 10px;
-        #     padding: 1.5rem;
-        #     margin-bottom: 1rem;
-        #     box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
-        #     border-left: 5px solid #1E88E5;
-        # }
-        .cat-header {
-            font-size: 1.8rem;
-            margin-bottom: 0.5rem;
-        }
-        .stat-card {
-            background-color: rgba(49, 51, 63, 0.7);
-            border-radius: 5px;
-            padding: 1rem;
-            box-shadow: 0 2px 4px rgba(0, 0, 0, 0.05);
-            margin-bottom: 0.5rem;
-            border: 1px solid rgba(255, 255, 255, 0.1);
-        }
-        .data-card {
-            background-color: rgba(49, 51, 63, 0.7);
-            border-radius: 8px;
-            padding: 1.2rem;
-            box-shadow: 0 2px 8px rgba(0, 0, 0, 0.1);
-            margin-top: 1rem;
-        }
-        .section-title {
-            font-size: 1.5rem;
-            margin-bottom: 1rem;
-            color: #ccc;
-            border-bottom: 2px solid rgba(255, 255, 255, 0.1);
-            padding-bottom: 0.5rem;
-        }
-        .cat-emoji {
-            font-size: 3rem;
-            text-align: center;
-            margin-bottom: 0.5rem;
-        }
-        # .input-section {
-        #     background-color: rgba(49, 51, 63, 0.7);
-        #     border-radius: 10px;
-        #     padding: 1rem;
-        #     margin-bottom: 2rem;
-        #     box-shadow: 0 4px 8px rgba(0, 0, 0, 0.2);
-        #     border: 1px solid rgba(250, 250, 250, 0.1);
-        # }
-        .weight-input-label {
-            font-weight: bold;
-            margin-bottom: 0.25rem;
-        }
-        .cat-name-header {
-            font-size: 1.2rem;
-            font-weight: bold;
-            text-align: center;
-            margin-bottom: 0.5rem;
-        }
-        .emoji-container {
-            text-align: center;
-            font-size: 2rem;
-            margin-bottom: 0.5rem;
-        }
-        
-        /* Cat image styling */
-        .cat-image-container {
-            text-align: center;
-            margin-bottom: 0.8rem;
-        }
-        .cat-image {
-            width: 90px;
-            height: 90px;
-            border-radius: 0;
-            object-fit: contain;
-            display: inline-block;
-            box-shadow: none;
-            border: none;
-            transition: none;
-        }
-        .cat-image:hover {
-            transform: none;
-            box-shadow: none;
-        }
-        
-        /* Override default Streamlit tab styling */
-        .stTabs [data-baseweb="tab-list"] {
-            gap: 2px;
-            background-color: rgba(49, 51, 63, 0.3);
-            border-radius: 8px 8px 0 0;
-            padding: 0 10px;
-        }
-
-        .stTabs [data-baseweb="tab"] {
-            height: 40px;
-            background-color: transparent;
-            border-radius: 8px 8px 0 0;
-            color: white;
-            padding: 0 20px;
-        }
-
-        .stTabs [aria-selected="true"] {
-            background-color: rgba(255, 255, 255, 0.1);
-            font-weight: bold;
-            color: #4287f5;
-        }
-        
-        /* Override Streamlit number input styling */
-        input[type="number"] {
-            border: 1px solid rgba(250, 250, 250, 0.2) !important;
-            background-color: rgba(49, 51, 63, 0.5) !important;
-            border-radius: 5px !important;
-            color: white !important;
-        }
-        
-        .stButton > button {
-            border-radius: 5px;
-            background-color: #4287f5;
-            color: white;
-            border: none;
-            padding: 4px 15px;
-            font-weight: bold;
-        }
-        
-        .stButton > button:hover {
-            background-color: #2d6ecf;
-        }
-        
-        /* Make the tab content section transparent */
-        .stTabs [data-baseweb="tab-panel"] {
-            background-color: transparent;
-            padding: 15px 5px;
-        }
-        
-        /* Fix for info boxes */
-        .stAlert {
-            background-color: rgba(38, 39, 48, 0.8) !important;
-            border: 1px solid rgba(250, 250, 250, 0.1) !important;
-        }
-        
-        /* Expander styling */
-        .streamlit-expanderHeader {
-            background-color: rgba(49, 51, 63, 0.5) !important;
-        }
-        
-        .streamlit-expanderContent {
-            background-color: rgba(38, 39, 48, 0.4) !important;
-        }
-        
-        /* Hide inline streamlit success/error messages */
-        [data-testid="stForm"] div[data-baseweb="notification"],
-        div[data-baseweb="notification"] {
-            display: none !important;
-            opacity: 0 !important;
-            height: 0 !important;
-            padding: 0 !important;
-            margin: 0 !important;
-        }
-        
-        /* Hide any cat emoji text that appears under buttons */
-        div.stButton + div:has(p:contains("🐱")),
-        div.stButton + div:has(p:contains("🐈")),
-        div.stButton + div:has(p:contains("😺")),
-        /* More aggressive selectors */
-        div.stButton + div p,
-        div.stButton + div div {
-            display: none !important;
-            height: 0 !important;
-            visibility: hidden !important;
-            opacity: 0 !important;
-            margin: 0 !important;
-            padding: 0 !important;
-            pointer-events: none !important;
-        }
-    </style>
-    
-    <script>
-    // Function to hide all inline success and error messages
-    function hideInlineMessages() {
-        const observer = new MutationObserver((mutations) => {
-            // Hide all notifications
-            document.querySelectorAll('[data-baseweb="notification"]').forEach(el => {
-                el.style.display = 'none';
-                el.style.height = '0';
-                el.style.opacity = '0';
-                el.style.margin = '0';
-                el.style.padding = '0';
-            });
-            
-            // Hide any elements after buttons - aggressive approach
-            document.querySelectorAll('div.stButton + div').forEach(div => {
-                div.style.display = 'none';
-                div.style.height = '0';
-                div.style.opacity = '0';
-                div.style.margin = '0';
-                div.style.padding = '0';
-            });
-        });
-        
-        observer.observe(document.body, { 
-            childList: true, 
-            subtree: true 
-        });
-    }
-    
-    // Run when DOM is loaded
-    document.addEventListener('DOMContentLoaded', hideInlineMessages);
-    setTimeout(hideInlineMessages, 100);
-    setTimeout(hideInlineMessages, 500);
-    setTimeout(hideInlineMessages, 1000);
-    </script>
-    """, unsafe_allow_html=True)
+    # Custom CSS; the stylesheet is read once per process and, as it is only a
+    # style tag, st.html adds it without taking up space in the layout
+    st.html(f"<style>{get_asset_cache().text(PAGE_STYLESHEET)}</style>")
 
 
 def display_header():
@@ -286,32 +172,69 @@ def display_header():
     )
 
 
-def create_quick_input_section(db):
-    """Create a condensed input section at the top for all cats."""
-    # st.markdown("<h2 class='section-title'>Quick Weight Entry</h2>", unsafe_allow_html=True)
+def rerun_dependents(changed, *also):
+    """
+    Rerun the fragments that show data a write changed, from a widget callback.
     
-    # Check for reset flags at the beginning - before any widgets are created
-    for cat_name in CATS:
-        # Check for initial weight reset flags
-        reset_key = f"reset_initial_{cat_name}"
-        if reset_key in st.session_state and st.session_state[reset_key]:
-            # Clear the input value by removing it from session state
-            if f"quick_initial_{cat_name}" in st.session_state:
-                del st.session_state[f"quick_initial_{cat_name}"]
-            # Reset the flag
-            st.session_state[reset_key] = False
-        
-        # Check for remaining weight reset flags
-        # Get open entries for this cat
-        open_entries = db.get_todays_open_entries(cat_name)
-        for entry in open_entries:
-            reset_key = f"reset_remaining_{cat_name}_{entry['id']}"
-            if reset_key in st.session_state and st.session_state[reset_key]:
-                # Clear the input value
-                if f"quick_remaining_{cat_name}_{entry['id']}" in st.session_state:
-                    del st.session_state[f"quick_remaining_{cat_name}_{entry['id']}"]
-                # Reset the flag
-                st.session_state[reset_key] = False
+    Args:
+        changed: Kinds of data the write changed, as used in FRAGMENT_DEPENDENCIES
+        also: Keys of further fragments to rerun, such as the one that wrote
+    """
+    keys = [key for key, dependencies in FRAGMENT_DEPENDENCIES.items() if dependencies & changed]
+    st.rerun(scope=keys + [key for key in also if key not in keys])
+
+
+def record_initial_weight(db, cat_name, date_str, input_key):
+    """Callback of the Record Initial button: add an entry from the input's value."""
+    initial_weight = st.session_state.get(input_key, 0.0)
+    if initial_weight <= 0:
+        st.session_state[f"input_error_{cat_name}"] = "Enter weight > 0"
+        return
+    
+    # Pass the selected date when adding a new entry
+    db.add_entry(cat_name, initial_weight, date_str)
+    # Callbacks run before widgets are created, so the input can be cleared directly
+    del st.session_state[input_key]
+    rerun_dependents({"entries"})
+
+
+def record_remaining_weight(db, cat_name, entry_id, input_key):
+    """Callback of the Record Remaining button: complete an entry from the input's value."""
+    if not db.update_remaining_weight(entry_id, st.session_state.get(input_key, 0.0)):
+        st.session_state[f"input_error_{cat_name}"] = "Failed to update"
+        return
+    
+    del st.session_state[input_key]
+    rerun_dependents({"entries", "consumption"})
+
+
+def set_confirmation(name, value):
+    """Callback of the buttons that open or cancel a confirmation prompt."""
+    st.session_state[name] = value
+
+
+def delete_selected_day(db):
+    """Callback of the day reset confirmation: delete the selected date's entries."""
+    st.session_state['confirm_day_reset'] = False
+    try:
+        db.delete_entries_by_date(st.session_state['selected_date'].isoformat())
+    except ValueError:
+        st.session_state["day_reset_error"] = "This day is archived and can no longer be reset"
+        return
+    rerun_dependents({"entries", "consumption"})
+
+
+def create_quick_input_section(db, data, cats=None):
+    """
+    Create a condensed input section at the top with a column per cat.
+    
+    Args:
+        db: The CatWeightDatabase to write to
+        data: The dashboard snapshot
+        cats: The cats to show, as returned by get_cats (defaults to all)
+    """
+    cats = data.cats if cats is None else cats
+    # st.markdown("<h2 class='section-title'>Quick Weight Entry</h2>", unsafe_allow_html=True)
     
     # st.markdown("<div class='input-section'>", unsafe_allow_html=True)
     
@@ -321,25 +244,23 @@ def create_quick_input_section(db):
         # Default to today
         if 'selected_date' not in st.session_state:
             st.session_state['selected_date'] = datetime.date.today()
-            
+        
+        # The widget writes the selected date to session state before the
+        # input panel reruns, so the panel loads its data for the new date
         selected_date = st.date_input(
             "Select Date", 
-            value=st.session_state['selected_date'],
-            max_value=datetime.date.today()
+            max_value=datetime.date.today(),
+            key='selected_date'
         )
-        
-        # Store the selected date in session state
-        if selected_date != st.session_state['selected_date']:
-            st.session_state['selected_date'] = selected_date
-            st.rerun()  # Rerun to refresh the UI based on the new date
     
     # Add reset day button
     with col_reset:
         st.markdown("<div style='margin-top: 32px;'></div>", unsafe_allow_html=True)  # Align with date input
-        if st.button("Reset Day", key="reset_day_button", type="secondary"):
-            # Confirm before deletion
-            st.session_state['confirm_day_reset'] = True
-            st.rerun()
+        # Confirm before deletion
+        st.button(
+            "Reset Day", key="reset_day_button", type="secondary",
+            on_click=set_confirmation, args=('confirm_day_reset', True)
+        )
     
     # Handle confirmation for day reset
     if 'confirm_day_reset' in st.session_state and st.session_state['confirm_day_reset']:
@@ -354,42 +275,39 @@ def create_quick_input_section(db):
         )
         
         with confirm_col1:
-            if st.button("Yes, Delete Day's Data", key="confirm_delete_day"):
-                # Delete all entries for the selected date
-                deleted_count = db.delete_entries_by_date(selected_date.isoformat())
-                if deleted_count > 0:
-                    st.success(f"Deleted {deleted_count} entries for {selected_date.strftime('%B %d, %Y')}")
-                else:
-                    st.info(f"No entries found for {selected_date.strftime('%B %d, %Y')}")
-                # Reset confirmation state
-                st.session_state['confirm_day_reset'] = False
-                st.rerun()
+            st.button("Yes, Delete Day's Data", key="confirm_delete_day", on_click=delete_selected_day, args=(db,))
         
         with confirm_col2:
-            if st.button("Cancel", key="cancel_delete_day"):
-                st.session_state['confirm_day_reset'] = False
-                st.rerun()
+            st.button(
+                "Cancel", key="cancel_delete_day",
+                on_click=set_confirmation, args=('confirm_day_reset', False)
+            )
+    
+    error = st.session_state.pop("day_reset_error", None)
+    if error:
+        st.error(error)
     
     # Format the selected date for database queries
     selected_date_str = selected_date.isoformat()
     is_today = selected_date == datetime.date.today()
     
-    # Create three columns for the cats
-    cols = st.columns(len(CATS))
+    # Batch mode records every cat's weights with one submission
+    if st.toggle("Record all cats at once", key="batch_entry_mode"):
+        create_batch_input_form(db, data, selected_date, cats)
+        st.markdown("</div>", unsafe_allow_html=True)
+        return
+    
+    # Create a column for each cat
+    cols = st.columns(len(cats))
     
-    for idx, cat_name in enumerate(CATS):
+    for idx, cat in enumerate(cats):
+        cat_name = cat["name"]
         with cols[idx]:
-            st.markdown(get_cat_icon_html(cat_name), unsafe_allow_html=True)
-            st.markdown(f"<div class='cat-name-header' style='color: {CAT_COLORS[cat_name]};'>{cat_name}</div>", unsafe_allow_html=True)
+            st.markdown(get_cat_icon_html(cat), unsafe_allow_html=True)
+            st.markdown(f"<div class='cat-name-header' style='color: {cat_color(cat)};'>{cat_name}</div>", unsafe_allow_html=True)
             
-            # Get entries for the selected date (not just today)
-            if is_today:
-                # Use existing function for today's entries
-                open_entries = db.get_todays_open_entries(cat_name)
-            else:
-                # Get entries for the specific date
-                all_entries = db.get_entries_by_date_range(selected_date_str, selected_date_str, cat_name)
-                open_entries = [e for e in all_entries if e['remaining_weight'] is None]
+            # Get open entries for the selected date (not just today)
+            open_entries = data.open_entries(cat_name, selected_date_str)
             
             # Dynamic input behavior based on whether there are open entries
             if open_entries:
@@ -411,57 +329,131 @@ def create_quick_input_section(db):
                     st.info(f"Initial: {entry['initial_weight']}g")
                 
                 # st.markdown("<div style='margin-top: 10px;'>", unsafe_allow_html=True)
-                remaining_weight = st.number_input(
+                input_key = f"quick_remaining_{cat_name}_{entry_id}_{selected_date_str}"
+                st.number_input(
                     "Remaining food (g)",
                     min_value=0.0,
                     max_value=float(entry['initial_weight']),
                     step=1.0,
-                    key=f"quick_remaining_{cat_name}_{entry_id}_{selected_date_str}"
+                    key=input_key
                 )
                 
-                if st.button(f"Record Remaining", key=f"quick_btn_remaining_{cat_name}_{entry_id}_{selected_date_str}"):
-                    if db.update_remaining_weight(entry_id, remaining_weight):
-                        consumed = entry['initial_weight'] - remaining_weight
-                        # Set reset flag
-                        st.session_state[f"reset_remaining_{cat_name}_{entry_id}"] = True
-                        st.rerun()
-                    else:
-                        st.error("Failed to update")
-                st.markdown("</div>", unsafe_allow_html=True)
+                st.button(
+                    f"Record Remaining", key=f"quick_btn_remaining_{cat_name}_{entry_id}_{selected_date_str}",
+                    on_click=record_remaining_weight, args=(db, cat_name, entry_id, input_key)
+                )
             else:
                 # If no open entries, show field for new initial weight
                 st.markdown("<div style='margin-top: 10px;'>", unsafe_allow_html=True)
-                initial_weight = st.number_input(
+                input_key = f"quick_initial_{cat_name}_{selected_date_str}"
+                st.number_input(
                     "Initial food weight (g)",
                     min_value=0.0,
                     max_value=1000.0,
                     step=1.0,
                     value=0.0,
-                    key=f"quick_initial_{cat_name}_{selected_date_str}"
+                    key=input_key
                 )
                 
                 record_button_label = "Record Initial"
                 if not is_today:
                     record_button_label = f"Record for {selected_date.strftime('%b %d')}"
                 
-                if st.button(record_button_label, key=f"quick_btn_initial_{cat_name}_{selected_date_str}"):
-                    if initial_weight > 0:
-                        # Pass the selected date when adding a new entry
-                        entry_id = db.add_entry(cat_name, initial_weight, selected_date_str)
-                        # Set a reset flag instead of directly modifying the session state
-                        st.session_state[f"reset_initial_{cat_name}"] = True
-                        st.rerun()
-                    else:
-                        st.error("Enter weight > 0")
-                st.markdown("</div>", unsafe_allow_html=True)
+                st.button(
+                    record_button_label, key=f"quick_btn_initial_{cat_name}_{selected_date_str}",
+                    on_click=record_initial_weight, args=(db, cat_name, selected_date_str, input_key)
+                )
+            
+            error = st.session_state.pop(f"input_error_{cat_name}", None)
+            if error:
+                st.error(error)
+            st.markdown("</div>", unsafe_allow_html=True)
     
     st.markdown("</div>", unsafe_allow_html=True)
 
 
-def create_cat_card(cat_name, db):
-    """Create a UI card for each cat with statistics."""
-    cat_color = CAT_COLORS[cat_name]
+def record_batch(db, date_str, cat_names, entry_ids):
+    """
+    Callback of the batch form: record every filled-in weight in one transaction.
+    
+    Args:
+        db: The CatWeightDatabase to write to
+        date_str: The selected date in YYYY-MM-DD format
+        cat_names: Names of the cats the form showed initial weight inputs for
+        entry_ids: IDs of the open entries the form showed inputs for
+    """
+    initial_keys = {cat_name: f"batch_initial_{cat_name}_{date_str}" for cat_name in cat_names}
+    remaining_keys = {entry_id: f"batch_remaining_{entry_id}" for entry_id in entry_ids}
+    
+    new_entries = [
+        {"cat_name": cat_name, "initial_weight": st.session_state[key], "date": date_str}
+        for cat_name, key in initial_keys.items()
+        if (st.session_state.get(key) or 0) > 0
+    ]
+    updates = [
+        (entry_id, st.session_state[key])
+        for entry_id, key in remaining_keys.items()
+        if st.session_state.get(key) is not None
+    ]
+    if not new_entries and not updates:
+        st.session_state["batch_error"] = "Enter at least one weight"
+        return
+    
+    # One commit for the whole feeding, and one cache invalidation
+    with db.transaction():
+        db.add_entries_bulk(new_entries)
+        db.update_remaining_weights_bulk(updates)
+    
+    for key in [*initial_keys.values(), *remaining_keys.values()]:
+        st.session_state.pop(key, None)
+    rerun_dependents({"entries", "consumption"} if updates else {"entries"})
+
+
+def create_batch_input_form(db, data, selected_date, cats=None):
+    """Create a form taking the weights of the shown cats, recorded with one submission."""
+    cats = data.cats if cats is None else cats
+    selected_date_str = selected_date.isoformat()
+    cat_names = [cat["name"] for cat in cats]
+    entry_ids = []
+    
+    with st.form("batch_entry_form", border=False):
+        cols = st.columns(len(cats))
+        for idx, cat in enumerate(cats):
+            cat_name = cat["name"]
+            with cols[idx]:
+                st.markdown(f"<div class='cat-name-header' style='color: {cat_color(cat)};'>{cat_name}</div>", unsafe_allow_html=True)
+                
+                # One remaining weight per open entry; left empty, the entry stays open
+                for entry in data.open_entries(cat_name, selected_date_str):
+                    entry_ids.append(entry["id"])
+                    st.number_input(
+                        f"Remaining food (g), served {entry['initial_weight']}g",
+                        min_value=0.0,
+                        max_value=float(entry['initial_weight']),
+                        step=1.0,
+                        value=None,
+                        key=f"batch_remaining_{entry['id']}"
+                    )
+                
+                # A new entry is added for every initial weight above zero
+                st.number_input(
+                    "New initial weight (g)",
+                    min_value=0.0,
+                    max_value=1000.0,
+                    step=1.0,
+                    value=0.0,
+                    key=f"batch_initial_{cat_name}_{selected_date_str}"
+                )
+        
+        st.form_submit_button("Record All", on_click=record_batch, args=(db, selected_date_str, cat_names, entry_ids))
     
+    error = st.session_state.pop("batch_error", None)
+    if error:
+        st.error(error)
+
+
+def create_cat_card(cat_name, data):
+    """Create a UI card for each cat with statistics."""
     st.markdown(
         f"<div class='cat-card'>",
         unsafe_allow_html=True
@@ -469,9 +461,9 @@ def create_cat_card(cat_name, db):
     
     # Recent statistics
     with st.expander("Recent Statistics", expanded=True):
-        today = datetime.date.today()
+        today = data.today
         start_date = (today - datetime.timedelta(days=7)).isoformat()
-        recent_entries = db.get_entries_by_date_range(start_date, today.isoformat(), cat_name)
+        recent_entries = data.entries(start_date, today.isoformat(), cat_name)
         
         if recent_entries:
             # Calculate average consumption for completed entries
@@ -497,157 +489,373 @@ def create_cat_card(cat_name, db):
     st.markdown("</div>", unsafe_allow_html=True)
 
 
-def display_history_chart(db):
-    """Display food consumption history with all cats in a single comparative chart."""
-    st.markdown("<h2 class='section-title'>Food Consumption History</h2>", unsafe_allow_html=True)
+def history_chart_series(data, num_days=HISTORY_CHART_DAYS, cats=None):
+    """
+    Get each cat's daily consumption for the last days shown in the history chart.
     
-    # Get data for all cats for the last 30 days
-    cat_data = db.get_last_30_days_data()
+    Args:
+        data: The dashboard snapshot
+        num_days: Number of days up to and including today
+        cats: The cats to chart, as returned by get_cats (defaults to all)
     
-    # Check if we have any data
-    has_data = any(cat_data[cat] for cat in CATS)
+    Returns:
+        The dates in YYYY-MM-DD format, oldest first, and a dictionary keyed by
+        cat name with one consumption value per date (0 for days without data)
+    """
+    today = data.today
+    date_strs = [(today - datetime.timedelta(days=i)).isoformat() for i in range(num_days - 1, -1, -1)]
+    cat_data = data.daily_consumption(date_strs[0], date_strs[-1])
+    
+    series = {}
+    for cat in data.cats if cats is None else cats:
+        cat_name = cat["name"]
+        cat_days = cat_data.get(cat_name, {})
+        series[cat_name] = [
+            cat_days[date_str]['consumed'] if cat_days.get(date_str, {}).get('complete_count') else 0
+            for date_str in date_strs
+        ]
+    return date_strs, series
+
+
+def render_history_chart(date_strs, series, colors, theme=HISTORY_CHART_THEME):
+    """
+    Draw the grouped bar chart of daily consumption and encode it as an image.
     
-    if not has_data:
-        st.info("No data available for the last 30 days. Start tracking to see the history chart!")
-        return
+    The figure is closed before returning, so rendering does not accumulate
+    figures in the process.
+    
+    Args:
+        date_strs: The dates in YYYY-MM-DD format, oldest first
+        series: Consumption per date keyed by cat name, in bar order
+        colors: Color of each cat's bars, keyed by cat name
+        theme: Appearance of the chart, as HISTORY_CHART_THEME
+    
+    Returns:
+        The encoded image in the theme's format
+    """
+    dates = [datetime.date.fromisoformat(date_str) for date_str in date_strs]
     
     # Create a single figure for all cats
-    fig, ax = plt.subplots(figsize=(14, 8))
-    fig.patch.set_facecolor('#262730')
-    ax.set_facecolor('#262730')
-    
-    # Use last 10 days for a clear daily view
-    num_days = 10
-    today = datetime.date.today()
-    date_range = [(today - datetime.timedelta(days=i)) for i in range(num_days-1, -1, -1)]
-    date_strs = [d.isoformat() for d in date_range]
-    
-    # Prepare data for each cat by day
-    all_cat_daily_consumption = {}
-    max_consumption = 0  # Track max for y-axis scaling
-    
-    # First collect and organize data
-    for cat_name in CATS:
-        cat_entries = cat_data[cat_name]
-        daily_consumption = []
+    fig, ax = plt.subplots(figsize=theme["figsize"])
+    try:
+        fig.patch.set_facecolor(theme["background"])
+        ax.set_facecolor(theme["background"])
+        
+        # Set up bar properties
+        num_cats = len(series)
+        bar_width = 0.8 / num_cats  # Width for each cat's bar
         
-        for date in date_range:
-            date_str = date.isoformat()
-            # Find all entries for this cat on this date
-            day_entries = [
-                e for e in cat_entries 
-                if e['date'].startswith(date_str) and e['remaining_weight'] is not None
-            ]
+        # Plot grouped bars for each cat
+        for i, cat_name in enumerate(series):
+            # Calculate bar positions
+            x = np.arange(len(dates))
+            offset = (i - num_cats/2 + 0.5) * bar_width
+            bar_positions = x + offset
             
-            if day_entries:
-                # Sum consumption for the day
-                total_consumed = sum(e['initial_weight'] - e['remaining_weight'] for e in day_entries)
-                daily_consumption.append(total_consumed)
-                max_consumption = max(max_consumption, total_consumed)
-            else:
-                # No data for this day
-                daily_consumption.append(0)
+            # Get cat's data and color
+            cat_consumption = series[cat_name]
+            cat_color = colors[cat_name]
+            
+            # Create bars for this cat
+            bars = ax.bar(
+                bar_positions,
+                cat_consumption,
+                width=bar_width,
+                color=cat_color,
+                alpha=0.85,
+                edgecolor='white',
+                linewidth=0.7,
+                label=f"{cat_name}"
+            )
+            
+            # Add values on top of bars that have non-zero data
+            for j, (bar, value) in enumerate(zip(bars, cat_consumption)):
+                if value > 0:  # Only add text for days with data
+                    height = bar.get_height()
+                    ax.text(
+                        bar.get_x() + bar.get_width() / 2,
+                        height + 2,
+                        f"{value:.1f}g",
+                        ha='center',
+                        va='bottom',
+                        color='white',
+                        fontsize=9,
+                        fontweight='bold',
+                        rotation=0 if len(dates) < 8 else 90
+                    )
+        
+        # Format x-axis with dates
+        formatted_dates = [d.strftime('%a\n%m/%d') for d in dates]  # Day of week + date
+        ax.set_xticks(np.arange(len(dates)))
+        ax.set_xticklabels(formatted_dates)
+        
+        # Set chart title and labels
+        ax.set_title(
+            'Daily Food Consumption - All Cats', 
+            fontsize=18, 
+            fontweight='bold', 
+            color='white',
+            pad=15
+        )
         
-        all_cat_daily_consumption[cat_name] = daily_consumption
-    
-    # Set up bar properties
-    num_cats = len(CATS)
-    bar_width = 0.8 / num_cats  # Width for each cat's bar
-    
-    # Plot grouped bars for each cat
-    for i, cat_name in enumerate(CATS):
-        # Calculate bar positions
-        x = np.arange(len(date_range))
-        offset = (i - num_cats/2 + 0.5) * bar_width
-        bar_positions = x + offset
+        # Customize y-axis
+        ax.set_ylabel('Consumed Food (grams)', fontsize=14, color='white', labelpad=10)
+        ax.tick_params(axis='y', colors='white', labelsize=12)
         
-        # Get cat's data and color
-        cat_consumption = all_cat_daily_consumption[cat_name]
-        cat_color = CAT_COLORS[cat_name]
+        # Customize x-axis
+        ax.tick_params(axis='x', colors='white', labelsize=12)
+        ax.set_axisbelow(True)
         
-        # Create bars for this cat
-        bars = ax.bar(
-            bar_positions,
-            cat_consumption,
-            width=bar_width,
-            color=cat_color,
-            alpha=0.85,
+        # Add horizontal grid lines
+        ax.grid(True, axis='y', linestyle='--', alpha=0.3, color='gray')
+        ax.set_axisbelow(True)  # Put grid below bars
+        
+        # Style spines
+        for spine in ax.spines.values():
+            spine.set_color('gray')
+            spine.set_alpha(0.2)
+        
+        # Add legend with cat colors
+        legend = ax.legend(
+            title="Cats", 
+            fontsize=12, 
+            title_fontsize=14,
+            loc='upper left',
+            framealpha=0.7,
+            facecolor=theme["background"],
             edgecolor='white',
-            linewidth=0.7,
-            label=f"{cat_name}"
+            labelcolor='white'
         )
+        legend.get_title().set_color('white')
         
-        # Add values on top of bars that have non-zero data
-        for j, (bar, value) in enumerate(zip(bars, cat_consumption)):
-            if value > 0:  # Only add text for days with data
-                height = bar.get_height()
-                ax.text(
-                    bar.get_x() + bar.get_width() / 2,
-                    height + 2,
-                    f"{value:.1f}g",
-                    ha='center',
-                    va='bottom',
-                    color='white',
-                    fontsize=9,
-                    fontweight='bold',
-                    rotation=0 if len(date_range) < 8 else 90
-                )
+        # Set y-axis limit with headroom
+        max_consumption = max((max(values) for values in series.values()), default=0)
+        if max_consumption > 0:
+            ax.set_ylim(0, max_consumption * 1.2)
+        
+        # Better padding
+        plt.tight_layout(pad=3.0)
+        
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format=theme["format"], dpi=theme["dpi"], bbox_inches="tight",
+                    facecolor=fig.get_facecolor())
+        return buffer.getvalue()
+    finally:
+        plt.close(fig)
+
+
+def history_chart_frame(cat_data, date_strs, cat_names):
+    """
+    Get the daily consumption shown by the interactive history chart in long form.
     
-    # Format x-axis with dates
-    formatted_dates = [d.strftime('%a\n%m/%d') for d in date_range]  # Day of week + date
-    ax.set_xticks(np.arange(len(date_range)))
-    ax.set_xticklabels(formatted_dates)
-    
-    # Set chart title and labels
-    ax.set_title(
-        'Daily Food Consumption - All Cats', 
-        fontsize=18, 
-        fontweight='bold', 
-        color='white',
-        pad=15
+    Returns:
+        A DataFrame with date, cat_name and consumed columns, one row per cat
+        in cat_names and day with completed entries within the dates
+    """
+    rows = [
+        (date_str, cat_name, day['consumed'])
+        for cat_name in cat_names
+        for date_str, day in sorted(cat_data.get(cat_name, {}).items())
+        if day['complete_count'] and date_strs[0] <= date_str <= date_strs[-1]
+    ]
+    return pd.DataFrame(rows, columns=["date", "cat_name", "consumed"])
+
+
+def matrix_history_chart_frame(matrix, date_strs, cats):
+    """
+    Get the same long-form frame as history_chart_frame from the consumption matrix.
+    
+    Each cat's days are a slice of its row in the mapped matrix, so no rows
+    are read from SQLite.
+    """
+    dates = np.array(date_strs)
+    frames = []
+    for cat in cats:
+        cells = matrix.cat(cat["id"], date_strs[0], date_strs[-1])
+        tracked = np.flatnonzero(cells["complete_count"])
+        frames.append(pd.DataFrame({
+            "date": dates[tracked],
+            "cat_name": cat["name"],
+            "consumed": cells["consumed"][tracked].astype(float),
+        }))
+    return pd.concat(frames, ignore_index=True) if frames else history_chart_frame({}, date_strs, [])
+
+
+def history_chart_spec(frame, date_strs, colors, show_labels=True, theme=HISTORY_CHART_THEME):
+    """
+    Build the interactive grouped bar chart of daily consumption.
+    
+    Mirrors the matplotlib chart: one group of bars per day, one bar per cat in
+    its color from colors (keyed by cat name, in bar order) and value labels on
+    top of the bars.
+    
+    Returns:
+        The Altair chart
+    """
+    import altair as alt
+    
+    max_consumption = frame["consumed"].max() if len(frame) else 0
+    rotate_labels = len(date_strs) >= 8
+    
+    bars = alt.Chart(frame).mark_bar(opacity=0.85, stroke="white", strokeWidth=0.7).encode(
+        x=alt.X(
+            "date:O",
+            title=None,
+            scale=alt.Scale(domain=date_strs),
+            # Day of week + date, as in the matplotlib chart
+            axis=alt.Axis(
+                labelAngle=0,
+                labelExpr="[utcFormat(toDate(datum.value), '%a'), utcFormat(toDate(datum.value), '%m/%d')]",
+            ),
+        ),
+        xOffset=alt.XOffset("cat_name:N", scale=alt.Scale(domain=list(colors))),
+        y=alt.Y(
+            "consumed:Q",
+            title="Consumed Food (grams)",
+            scale=alt.Scale(domain=[0, max_consumption * 1.2]) if max_consumption > 0 else alt.Undefined,
+        ),
+        color=alt.Color(
+            "cat_name:N",
+            scale=alt.Scale(domain=list(colors), range=list(colors.values())),
+            legend=alt.Legend(title="Cats", orient="top-left"),
+        ),
+        tooltip=[
+            alt.Tooltip("date:O", title="Date"),
+            alt.Tooltip("cat_name:N", title="Cat"),
+            alt.Tooltip("consumed:Q", title="Consumed (g)", format=".1f"),
+        ],
     )
     
-    # Customize y-axis
-    ax.set_ylabel('Consumed Food (grams)', fontsize=14, color='white', labelpad=10)
-    ax.tick_params(axis='y', colors='white', labelsize=12)
-    
-    # Customize x-axis
-    ax.tick_params(axis='x', colors='white', labelsize=12)
-    ax.set_axisbelow(True)
-    
-    # Add horizontal grid lines
-    ax.grid(True, axis='y', linestyle='--', alpha=0.3, color='gray')
-    ax.set_axisbelow(True)  # Put grid below bars
-    
-    # Style spines
-    for spine in ax.spines.values():
-        spine.set_color('gray')
-        spine.set_alpha(0.2)
-    
-    # Add legend with cat colors
-    legend = ax.legend(
-        title="Cats", 
-        fontsize=12, 
-        title_fontsize=14,
-        loc='upper left',
-        framealpha=0.7,
-        facecolor='#262730',
-        edgecolor='white',
-        labelcolor='white'
+    chart = bars
+    if show_labels:
+        labels = bars.mark_text(
+            color="white",
+            fontSize=9,
+            fontWeight="bold",
+            angle=270 if rotate_labels else 0,
+            align="left" if rotate_labels else "center",
+            baseline="middle" if rotate_labels else "bottom",
+            dx=2 if rotate_labels else 0,
+            dy=0 if rotate_labels else -2,
+        ).encode(
+            text="label:N",
+        ).transform_calculate(
+            label="format(datum.consumed, '.1f') + 'g'"
+        )
+        chart = alt.layer(bars, labels)
+    
+    return chart.properties(
+        title="Daily Food Consumption - All Cats",
+        height=500,
+        background=theme["background"],
+    ).configure_axis(
+        labelColor="white",
+        titleColor="white",
+        labelFontSize=12,
+        titleFontSize=14,
+        gridColor="gray",
+        gridOpacity=0.3,
+        gridDash=[4, 4],
+        domainColor="gray",
+        tickColor="gray",
+    ).configure_axisX(
+        grid=False,
+    ).configure_title(
+        color="white",
+        fontSize=18,
+    ).configure_legend(
+        labelColor="white",
+        titleColor="white",
+        labelFontSize=12,
+        titleFontSize=14,
+        fillColor=theme["background"],
+        strokeColor="white",
+        padding=8,
+    ).configure_view(
+        stroke=None,
     )
-    legend.get_title().set_color('white')
+
+
+def display_interactive_history_chart(db, data, cats):
+    """
+    Display the history chart as a Vega-Lite chart drawn in the browser.
     
-    # Set y-axis limit with headroom
-    if max_consumption > 0:
-        ax.set_ylim(0, max_consumption * 1.2)
+    Only the per-cat daily totals are sent. Ranges within the dashboard
+    snapshot are sliced from it; wider ones are sliced from the consumption
+    matrix, or read from the daily rollup without one.
+    """
+    range_label = st.radio(
+        "History range",
+        list(HISTORY_CHART_RANGES),
+        horizontal=True,
+        key="history_range",
+        label_visibility="collapsed",
+    )
+    num_days = HISTORY_CHART_RANGES[range_label]
+    
+    today = data.today
+    date_strs = [(today - datetime.timedelta(days=i)).isoformat() for i in range(num_days - 1, -1, -1)]
+    colors = {cat["name"]: cat_color(cat) for cat in cats}
+    if num_days <= DASHBOARD_WINDOW_DAYS:
+        frame = history_chart_frame(data.daily_consumption(date_strs[0], date_strs[-1]), date_strs, list(colors))
+    elif db.matrix is not None and all(cat["id"] is not None for cat in cats):
+        frame = matrix_history_chart_frame(db.matrix, date_strs, cats)
+    else:
+        frame = history_chart_frame(db.get_daily_consumption(date_strs[0], date_strs[-1]), date_strs, list(colors))
     
-    # Better padding
-    plt.tight_layout(pad=3.0)
+    # Value labels only stay readable for about a month of bars
+    chart = history_chart_spec(frame, date_strs, colors, show_labels=num_days <= 31)
+    st.altair_chart(chart, theme=None, width="stretch")
+
+
+def display_history_chart(data, cache=None, db=None, backend=None, cats=None):
+    """
+    Display food consumption history with all shown cats in a single comparative chart.
+    
+    Args:
+        data: The dashboard snapshot
+        cache: Cache of rendered chart images (defaults to the process-wide one)
+        db: The CatWeightDatabase, read for ranges beyond the snapshot
+        backend: "matplotlib" or "altair" (defaults to HISTORY_CHART_BACKEND)
+        cats: The cats to chart, as returned by get_cats (defaults to all)
+    """
+    cats = data.cats if cats is None else cats
+    st.markdown("<h2 class='section-title'>Food Consumption History</h2>", unsafe_allow_html=True)
+    
+    # Get per-day totals for all cats for the last 30 days
+    today = data.today
+    start_date = (today - datetime.timedelta(days=30)).isoformat()
+    cat_data = data.daily_consumption(start_date, today.isoformat())
+    
+    # Check if we have any data
+    has_data = any(cat_data.get(cat["name"]) for cat in cats)
+    
+    if not has_data:
+        st.info("No data available for the last 30 days. Start tracking to see the history chart!")
+        return
+    
+    if (backend or HISTORY_CHART_BACKEND) == "altair":
+        display_interactive_history_chart(db, data, cats)
+        return
     
-    st.pyplot(fig)
+    date_strs, series = history_chart_series(data, cats=cats)
+    colors = {cat["name"]: cat_color(cat) for cat in cats}
+    
+    # Reuse the rendered image while the chart inputs are unchanged
+    if cache is None:
+        cache = get_chart_cache()
+    key = fingerprint(date_strs, list(series.items()), list(colors.items()), sorted(HISTORY_CHART_THEME.items()))
+    image = cache.get(key)
+    if image is None:
+        image = render_history_chart(date_strs, series, colors)
+        cache.put(key, image)
+    
+    if HISTORY_CHART_THEME["format"] == "svg":
+        image = image.decode("utf-8")
+    st.image(image, width="stretch")
 
 
-def reset_database():
+def reset_database(db):
     """Add a database reset section with confirmation mechanism."""
     st.markdown("<h2 class='section-title'>Database Management</h2>", unsafe_allow_html=True)
     
@@ -679,28 +887,25 @@ def reset_database():
             
             confirm_col1, confirm_col2 = st.columns(2)
             with confirm_col1:
-                if st.button("Yes, Reset Everything", use_container_width=True):
-                    # Perform actual database reset
-                    db = CatWeightDatabase()
-                    db.reset_database()
-                    db.close()
-                    
-                    # Show success notification with standard Streamlit success message
-                    st.success("Database has been completely reset!")
-                    
-                    # Reset confirmation state
-                    st.session_state['confirm_reset'] = False
-                    
-                    # Rerun to refresh the page
-                    st.rerun()
+                st.button("Yes, Reset Everything", use_container_width=True, on_click=reset_all_data, args=(db,))
             
             with confirm_col2:
-                if st.button("Cancel", use_container_width=True):
-                    st.session_state['confirm_reset'] = False
-                    st.rerun()
+                st.button("Cancel", use_container_width=True, on_click=set_confirmation, args=('confirm_reset', False))
+
 
+def reset_all_data(db):
+    """Callback of the database reset confirmation: delete all weight data."""
+    # Perform actual database reset
+    db.reset_database()
+    
+    # Reset confirmation state
+    st.session_state['confirm_reset'] = False
+    
+    # Refresh every section showing data, and the reset section itself
+    rerun_dependents({"entries", "consumption"}, "database")
 
-def create_date_status_indicator(db):
+
+def create_date_status_indicator(data):
     """Create a 7-day calendar view with color-coded status indicators."""
     # st.markdown("<h2 class='section-title'>Last 7 Days Status</h2>", unsafe_allow_html=True)
         # Add a legend
@@ -731,13 +936,16 @@ def create_date_status_indicator(db):
             unsafe_allow_html=True
         )
     # Get the last 7 days
-    today = datetime.date.today()
+    today = data.today
     date_range = [(today - datetime.timedelta(days=i)) for i in range(6, -1, -1)]  # Last 7 days, most recent at the end
     
     # Query data for all cats in this date range
     start_date = date_range[0].isoformat()
     end_date = date_range[-1].isoformat()
     
+    # Per-day entry counts for all cats
+    daily_counts = data.daily_consumption(start_date, end_date)
+    
     # Initialize status dictionaries for each date
     date_status = {}
     
@@ -747,15 +955,15 @@ def create_date_status_indicator(db):
         cat_statuses = {}
         
         # Check status for each cat
-        for cat_name in CATS:
-            entries = db.get_entries_by_date_range(date_str, date_str, cat_name)
+        for cat_name in data.cat_names:
+            day = daily_counts.get(cat_name, {}).get(date_str)
             
-            if not entries:
+            if not day:
                 # No entries for this cat
                 cat_statuses[cat_name] = "none"
             else:
                 # Check if any entry has both initial and remaining weights
-                has_complete = any(entry['remaining_weight'] is not None for entry in entries)
+                has_complete = day['complete_count'] > 0
                 if has_complete:
                     cat_statuses[cat_name] = "complete"
                 else:
@@ -827,86 +1035,20 @@ def create_date_status_indicator(db):
             """, unsafe_allow_html=True)
     
 
-def display_fun_statistics(db):
+def display_fun_statistics(data):
     """Display fun statistics and trends based on the last 7 days of data."""
     st.markdown("<h2 class='section-title'>🎮 Fun Stats & Trends (Last 7 Days) 🎮</h2>", unsafe_allow_html=True)
     
     # Get data for the last 7 days
-    today = datetime.date.today()
+    today = data.today
     start_date = (today - datetime.timedelta(days=6)).isoformat()  # 7 days including today
     end_date = today.isoformat()
     
-    # Create a container with a slightly different background for the fun stats
-    # st.markdown("""
-    # <div style="background-color: rgba(60, 60, 80, 0.3); border-radius: 10px; padding: 20px; margin-top: 20px; border: 1px solid rgba(100, 100, 150, 0.2);">
-    # """, unsafe_allow_html=True)
-    
-    # Collect consumption data for all cats
-    all_cat_data = {}
-    has_data = False
-    
-    for cat_name in CATS:
-        entries = db.get_entries_by_date_range(start_date, end_date, cat_name)
-        completed_entries = [e for e in entries if e['remaining_weight'] is not None]
-        
-        if completed_entries:
-            has_data = True
-            all_cat_data[cat_name] = {
-                'entries': completed_entries,
-                'daily_consumption': {},
-                'total_consumed': 0,
-                'avg_consumed': 0,
-                'consistency': 0,
-                'trend': 'stable'
-            }
-            
-            # Calculate total and daily consumption
-            total_consumed = 0
-            day_consumptions = []
-            
-            for entry in completed_entries:
-                consumed = entry['initial_weight'] - entry['remaining_weight']
-                total_consumed += consumed
-                
-                # Extract date without time
-                date_only = entry['date'].split('T')[0]
-                
-                # Add to daily consumption
-                if date_only not in all_cat_data[cat_name]['daily_consumption']:
-                    all_cat_data[cat_name]['daily_consumption'][date_only] = 0
-                all_cat_data[cat_name]['daily_consumption'][date_only] += consumed
-                
-            # Calculate average consumption
-            all_cat_data[cat_name]['total_consumed'] = total_consumed
-            all_cat_data[cat_name]['avg_consumed'] = total_consumed / len(completed_entries)
-            
-            # Calculate consumption by day for consistency calculation
-            for date, amount in all_cat_data[cat_name]['daily_consumption'].items():
-                day_consumptions.append(amount)
-            
-            # Calculate consistency (standard deviation) if we have enough data
-            if len(day_consumptions) > 1:
-                all_cat_data[cat_name]['consistency'] = np.std(day_consumptions)
-            
-            # Determine trend (if we have at least 3 days of data)
-            if len(day_consumptions) >= 3:
-                # Sort by date
-                sorted_days = sorted(all_cat_data[cat_name]['daily_consumption'].items())
-                # Get just the consumption values in chronological order
-                chronological_consumption = [amount for _, amount in sorted_days]
-                
-                # Simple trend detection based on first half vs second half
-                midpoint = len(chronological_consumption) // 2
-                first_half_avg = sum(chronological_consumption[:midpoint]) / midpoint if midpoint > 0 else 0
-                second_half_avg = sum(chronological_consumption[midpoint:]) / (len(chronological_consumption) - midpoint) if (len(chronological_consumption) - midpoint) > 0 else 0
-                
-                if second_half_avg > first_half_avg * 1.1:  # 10% increase
-                    all_cat_data[cat_name]['trend'] = 'increasing'
-                elif second_half_avg < first_half_avg * 0.9:  # 10% decrease
-                    all_cat_data[cat_name]['trend'] = 'decreasing'
+    stats = compute_window_stats(data.daily, start_date, end_date, data.cat_names, data.running_stats(start_date, end_date))
+    per_cat = stats.per_cat
     
     # Display stats only if we have data
-    if not has_data:
+    if stats.empty:
         st.info("Not enough data yet! Complete some feeding records to see fun statistics.")
     else:
         # Create 2 rows of stats
@@ -914,56 +1056,43 @@ def display_fun_statistics(db):
         
         # Stat 1: Biggest Eater
         with row1_cols[0]:
-            # st.markdown("""<div class="stat-card" style="height: 160px;">""", unsafe_allow_html=True)
-            
             # Find the cat with the highest average consumption
-            if all_cat_data:
-                biggest_eater = max(all_cat_data.items(), key=lambda x: x[1]['avg_consumed'])
-                cat_name = biggest_eater[0]
-                avg_consumed = biggest_eater[1]['avg_consumed']
-                
-                st.markdown(f"""
-                <div style="text-align: center;">
-                    <h3 style="margin: 0; color: {CAT_COLORS[cat_name]};">👑 Biggest Appetite</h3>
-                </div>
-                """, unsafe_allow_html=True)
-                
-                # Display the cat icon separately with safe HTML
-                st.markdown(get_cat_icon_html(cat_name), unsafe_allow_html=True)
-                
-                st.markdown(f"""
-                <div style="text-align: center;">
-                    <div style="font-size: 0.9rem; color: #ccc;">
-                        Averaging <span style="color: white; font-weight: bold;">{avg_consumed:.1f}g</span> per feeding
-                    </div>
-                </div>
-                """, unsafe_allow_html=True)
-            else:
-                st.markdown("""<div style="text-align: center;"><p>Not enough data</p></div>""", unsafe_allow_html=True)
+            cat_name = stats.leader('avg_consumed')
+            avg_consumed = per_cat.at[cat_name, 'avg_consumed']
+            
+            st.markdown(f"""
+            <div style="text-align: center;">
+                <h3 style="margin: 0; color: {cat_color(data.cat(cat_name))};">👑 Biggest Appetite</h3>
+            </div>
+            """, unsafe_allow_html=True)
             
-            # st.markdown("""</div>""", unsafe_allow_html=True)
+            # Display the cat icon separately with safe HTML
+            st.markdown(get_cat_icon_html(data.cat(cat_name)), unsafe_allow_html=True)
+            
+            st.markdown(f"""
+            <div style="text-align: center;">
+                <div style="font-size: 0.9rem; color: #ccc;">
+                    Averaging <span style="color: white; font-weight: bold;">{avg_consumed:.1f}g</span> per feeding
+                </div>
+            </div>
+            """, unsafe_allow_html=True)
             
         # Stat 2: Most Consistent Eater
         with row1_cols[1]:
-            # st.markdown("""<div class="stat-card" style="height: 160px;">""", unsafe_allow_html=True)
-            
             # Find the cat with the lowest standard deviation (most consistent)
-            consistent_cats = [cat for cat, data in all_cat_data.items() if len(data['daily_consumption']) > 1]
+            cat_name = stats.leader('consistency', largest=False, min_days=2)
             
-            if consistent_cats:
-                most_consistent = min([cat for cat in all_cat_data.items() if cat[0] in consistent_cats], 
-                                      key=lambda x: x[1]['consistency'])
-                cat_name = most_consistent[0]
-                consistency = most_consistent[1]['consistency']
+            if cat_name:
+                consistency = per_cat.at[cat_name, 'consistency']
                 
                 st.markdown(f"""
                 <div style="text-align: center;">
-                    <h3 style="margin: 0; color: {CAT_COLORS[cat_name]};">⏱️ Clockwork Eater</h3>
+                    <h3 style="margin: 0; color: {cat_color(data.cat(cat_name))};">⏱️ Clockwork Eater</h3>
                 </div>
                 """, unsafe_allow_html=True)
                 
                 # Display the cat icon separately with safe HTML
-                st.markdown(get_cat_icon_html(cat_name), unsafe_allow_html=True)
+                st.markdown(get_cat_icon_html(data.cat(cat_name)), unsafe_allow_html=True)
                 
                 st.markdown(f"""
                 <div style="text-align: center;">
@@ -976,32 +1105,27 @@ def display_fun_statistics(db):
             else:
                 st.markdown("""<div style="text-align: center;"><p>Not enough data</p></div>""", unsafe_allow_html=True)
             
-            # st.markdown("""</div>""", unsafe_allow_html=True)
-            
         # Stat 3: Trending Cat
         with row1_cols[2]:
-            # st.markdown("""<div class="stat-card" style="height: 160px;">""", unsafe_allow_html=True)
-            
             # Find cats with clear trends
-            trending_cats = [cat for cat, data in all_cat_data.items() 
-                             if data['trend'] in ['increasing', 'decreasing'] and len(data['daily_consumption']) >= 3]
+            trending_cats = per_cat.index[per_cat['trend'] != 'stable']
             
-            if trending_cats:
+            if len(trending_cats):
                 # Prioritize cats with increasing or decreasing trends
                 trending_cat_name = trending_cats[0]
-                trend = all_cat_data[trending_cat_name]['trend']
+                trend = per_cat.at[trending_cat_name, 'trend']
                 
                 trend_icon = "📈" if trend == "increasing" else "📉"
                 trend_text = "Increasing appetite" if trend == "increasing" else "Decreasing appetite"
                 
                 st.markdown(f"""
                 <div style="text-align: center;">
-                    <h3 style="margin: 0; color: {CAT_COLORS[trending_cat_name]};">{trend_icon} Trending</h3>
+                    <h3 style="margin: 0; color: {cat_color(data.cat(trending_cat_name))};">{trend_icon} Trending</h3>
                 </div>
                 """, unsafe_allow_html=True)
                 
                 # Display the cat icon separately with safe HTML
-                st.markdown(get_cat_icon_html(trending_cat_name), unsafe_allow_html=True)
+                st.markdown(get_cat_icon_html(data.cat(trending_cat_name)), unsafe_allow_html=True)
                 
                 st.markdown(f"""
                 <div style="text-align: center;">
@@ -1012,17 +1136,16 @@ def display_fun_statistics(db):
                 """, unsafe_allow_html=True)
             else:
                 # Show the cat with most data points if no clear trends
-                most_data_cat = max(all_cat_data.items(), key=lambda x: len(x[1]['daily_consumption']))
-                cat_name = most_data_cat[0]
+                cat_name = stats.leader('days_tracked')
                 
                 st.markdown(f"""
                 <div style="text-align: center;">
-                    <h3 style="margin: 0; color: {CAT_COLORS[cat_name]};">🔄 Steady Eater</h3>
+                    <h3 style="margin: 0; color: {cat_color(data.cat(cat_name))};">🔄 Steady Eater</h3>
                 </div>
                 """, unsafe_allow_html=True)
                 
                 # Display the cat icon separately with safe HTML
-                st.markdown(get_cat_icon_html(cat_name), unsafe_allow_html=True)
+                st.markdown(get_cat_icon_html(data.cat(cat_name)), unsafe_allow_html=True)
                 
                 st.markdown(f"""
                 <div style="text-align: center;">
@@ -1031,74 +1154,48 @@ def display_fun_statistics(db):
                     </div>
                 </div>
                 """, unsafe_allow_html=True)
-            
-            # st.markdown("""</div>""", unsafe_allow_html=True)
         
         # Row 2: More stats
         row2_cols = st.columns(3)
         
         # Stat 4: Hungriest Day
         with row2_cols[0]:
-            # st.markdown("""<div class="stat-card" style="height: 160px;">""", unsafe_allow_html=True)
+            # Find the day with highest consumption across all cats
+            hungriest_day = stats.daily_totals.idxmax()
+            max_consumed = stats.daily_totals[hungriest_day]
             
-            # Aggregate consumption by day across all cats
-            daily_totals = {}
+            # Convert ISO date to readable format
+            hungriest_date = datetime.date.fromisoformat(hungriest_day)
+            formatted_date = hungriest_date.strftime("%A %b %d")
             
-            for cat_name, data in all_cat_data.items():
-                for date, amount in data['daily_consumption'].items():
-                    if date not in daily_totals:
-                        daily_totals[date] = 0
-                    daily_totals[date] += amount
-            
-            if daily_totals:
-                # Find the day with highest consumption
-                hungriest_day, max_consumed = max(daily_totals.items(), key=lambda x: x[1])
-                
-                # Convert ISO date to readable format
-                hungriest_date = datetime.date.fromisoformat(hungriest_day)
-                formatted_date = hungriest_date.strftime("%A %b %d")
-                
-                st.markdown(f"""
-                <div style="text-align: center;">
-                    <h3 style="margin: 0; color: #4CAF50;">🍽️ Hungriest Day</h3>
-                    <div style="font-size: 1.3rem; font-weight: bold; margin: 10px 0;">
-                        {formatted_date}
-                    </div>
-                    <div style="font-size: 0.9rem; color: #ccc;">
-                        Total consumption: <span style="color: white; font-weight: bold;">{max_consumed:.1f}g</span>
-                    </div>
+            st.markdown(f"""
+            <div style="text-align: center;">
+                <h3 style="margin: 0; color: #4CAF50;">🍽️ Hungriest Day</h3>
+                <div style="font-size: 1.3rem; font-weight: bold; margin: 10px 0;">
+                    {formatted_date}
                 </div>
-                """, unsafe_allow_html=True)
-            else:
-                st.markdown("""<div style="text-align: center;"><p>Not enough data</p></div>""", unsafe_allow_html=True)
-            
-            # st.markdown("""</div>""", unsafe_allow_html=True)
+                <div style="font-size: 0.9rem; color: #ccc;">
+                    Total consumption: <span style="color: white; font-weight: bold;">{max_consumed:.1f}g</span>
+                </div>
+            </div>
+            """, unsafe_allow_html=True)
         
         # Stat 5: Leftover Champion
         with row2_cols[1]:
-            # st.markdown("""<div class="stat-card" style="height: 160px;">""", unsafe_allow_html=True)
-            
             # Find the cat that leaves the most food (highest remaining percentage)
-            leftover_percentages = {}
-            
-            for cat_name, data in all_cat_data.items():
-                total_initial = sum(entry['initial_weight'] for entry in data['entries'])
-                total_remaining = sum(entry['remaining_weight'] for entry in data['entries'])
-                
-                if total_initial > 0:
-                    leftover_percentages[cat_name] = (total_remaining / total_initial) * 100
+            leftover_champion = stats.leader('leftover_pct')
             
-            if leftover_percentages:
-                leftover_champion, leftover_pct = max(leftover_percentages.items(), key=lambda x: x[1])
+            if leftover_champion:
+                leftover_pct = per_cat.at[leftover_champion, 'leftover_pct']
                 
                 st.markdown(f"""
                 <div style="text-align: center;">
-                    <h3 style="margin: 0; color: {CAT_COLORS[leftover_champion]};">🍱 Leftover Champion</h3>
+                    <h3 style="margin: 0; color: {cat_color(data.cat(leftover_champion))};">🍱 Leftover Champion</h3>
                 </div>
                 """, unsafe_allow_html=True)
                 
                 # Display the cat icon separately with safe HTML
-                st.markdown(get_cat_icon_html(leftover_champion), unsafe_allow_html=True)
+                st.markdown(get_cat_icon_html(data.cat(leftover_champion)), unsafe_allow_html=True)
                 
                 st.markdown(f"""
                 <div style="text-align: center;">
@@ -1109,39 +1206,29 @@ def display_fun_statistics(db):
                 """, unsafe_allow_html=True)
             else:
                 st.markdown("""<div style="text-align: center;"><p>Not enough data</p></div>""", unsafe_allow_html=True)
-            
-            # st.markdown("""</div>""", unsafe_allow_html=True)
         
         # Stat 6: Weekly Champion
         with row2_cols[2]:
-            # st.markdown("""<div class="stat-card" style="height: 160px;">""", unsafe_allow_html=True)
+            # Find the cat with the most complete entries this week
+            weekly_champion = stats.leader('meals')
+            entry_count = per_cat.at[weekly_champion, 'meals']
             
-            # Calculate which cat has the most complete entries this week
-            entry_counts = {cat_name: len(data['entries']) for cat_name, data in all_cat_data.items()}
+            st.markdown(f"""
+            <div style="text-align: center;">
+                <h3 style="margin: 0; color: {cat_color(data.cat(weekly_champion))};">🏆 Weekly Champion</h3>
+            </div>
+            """, unsafe_allow_html=True)
             
-            if entry_counts:
-                weekly_champion, entry_count = max(entry_counts.items(), key=lambda x: x[1])
-                
-                st.markdown(f"""
-                <div style="text-align: center;">
-                    <h3 style="margin: 0; color: {CAT_COLORS[weekly_champion]};">🏆 Weekly Champion</h3>
-                </div>
-                """, unsafe_allow_html=True)
-                
-                # Display the cat icon separately with safe HTML
-                st.markdown(get_cat_icon_html(weekly_champion), unsafe_allow_html=True)
-                
-                st.markdown(f"""
-                <div style="text-align: center;">
-                    <div style="font-size: 0.9rem; color: #ccc;">
-                        Most tracked meals this week: <span style="color: white; font-weight: bold;">{entry_count}</span>
-                    </div>
-                </div>
-                """, unsafe_allow_html=True)
-            else:
-                st.markdown("""<div style="text-align: center;"><p>Not enough data</p></div>""", unsafe_allow_html=True)
+            # Display the cat icon separately with safe HTML
+            st.markdown(get_cat_icon_html(data.cat(weekly_champion)), unsafe_allow_html=True)
             
-            # st.markdown("""</div>""", unsafe_allow_html=True)
+            st.markdown(f"""
+            <div style="text-align: center;">
+                <div style="font-size: 0.9rem; color: #ccc;">
+                    Most tracked meals this week: <span style="color: white; font-weight: bold;">{entry_count}</span>
+                </div>
+            </div>
+            """, unsafe_allow_html=True)
         
         # Fun fact or tip at the bottom
         fun_facts = [
@@ -1164,12 +1251,12 @@ def display_fun_statistics(db):
     st.markdown("</div>", unsafe_allow_html=True)
 
 
-def display_fun_statistics_30days(db):
+def display_fun_statistics_30days(data):
     """Display fun statistics and trends based on the last 30 days of data."""
     st.markdown("<h2 class='section-title'>📊 Monthly Insights (Last 30 Days) 📊</h2>", unsafe_allow_html=True)
     
     # Get data for the last 30 days
-    today = datetime.date.today()
+    today = data.today
     start_date = (today - datetime.timedelta(days=29)).isoformat()  # 30 days including today
     end_date = today.isoformat()
     
@@ -1178,75 +1265,11 @@ def display_fun_statistics_30days(db):
     <div style="background-color: rgba(60, 70, 90, 0.3); border-radius: 10px; padding: 20px; margin-top: 20px; margin-bottom: 30px; border: 1px solid rgba(100, 120, 150, 0.2);">
     """, unsafe_allow_html=True)
     
-    # Collect consumption data for all cats
-    all_cat_data = {}
-    has_data = False
-    
-    for cat_name in CATS:
-        entries = db.get_entries_by_date_range(start_date, end_date, cat_name)
-        completed_entries = [e for e in entries if e['remaining_weight'] is not None]
-        
-        if completed_entries:
-            has_data = True
-            all_cat_data[cat_name] = {
-                'entries': completed_entries,
-                'daily_consumption': {},
-                'weekday_consumption': {0: 0, 1: 0, 2: 0, 3: 0, 4: 0, 5: 0, 6: 0},  # Mon-Sun
-                'weekday_counts': {0: 0, 1: 0, 2: 0, 3: 0, 4: 0, 5: 0, 6: 0},
-                'total_consumed': 0,
-                'avg_consumed': 0,
-                'consistency': 0,
-                'days_tracked': set(),
-                'most_recent_trend': []  # Last 10 entries for trend analysis
-            }
-            
-            # Calculate total and daily consumption
-            total_consumed = 0
-            day_consumptions = []
-            
-            for entry in completed_entries:
-                consumed = entry['initial_weight'] - entry['remaining_weight']
-                total_consumed += consumed
-                
-                # Extract date without time
-                date_only = entry['date'].split('T')[0]
-                entry_date = datetime.date.fromisoformat(date_only)
-                
-                # Add to daily consumption
-                if date_only not in all_cat_data[cat_name]['daily_consumption']:
-                    all_cat_data[cat_name]['daily_consumption'][date_only] = 0
-                    all_cat_data[cat_name]['days_tracked'].add(date_only)
-                
-                all_cat_data[cat_name]['daily_consumption'][date_only] += consumed
-                
-                # Track consumption by day of week
-                weekday = entry_date.weekday()
-                all_cat_data[cat_name]['weekday_consumption'][weekday] += consumed
-                all_cat_data[cat_name]['weekday_counts'][weekday] += 1
-                
-                # Add to recent trend (last 10 entries)
-                all_cat_data[cat_name]['most_recent_trend'].append({
-                    'date': entry_date,
-                    'consumed': consumed
-                })
-            
-            # Sort recent entries by date
-            all_cat_data[cat_name]['most_recent_trend'].sort(key=lambda x: x['date'])
-            
-            # Calculate average consumption
-            all_cat_data[cat_name]['total_consumed'] = total_consumed
-            all_cat_data[cat_name]['avg_consumed'] = total_consumed / len(completed_entries)
-            
-            # Calculate consumption by day for consistency calculation
-            for date, amount in all_cat_data[cat_name]['daily_consumption'].items():
-                day_consumptions.append(amount)
-            
-            # Calculate consistency (standard deviation) if we have enough data
-            if len(day_consumptions) > 1:
-                all_cat_data[cat_name]['consistency'] = np.std(day_consumptions)
+    stats = compute_window_stats(data.daily, start_date, end_date, data.cat_names, data.running_stats(start_date, end_date))
+    per_cat = stats.per_cat
     
     # Display stats only if we have data
-    if not has_data:
+    if stats.empty:
         st.info("Not enough data yet! Complete some feeding records over multiple weeks to see monthly insights.")
     else:
         # Create 2 rows of stats
@@ -1254,92 +1277,71 @@ def display_fun_statistics_30days(db):
         
         # Stat 1: Monthly Food Champion
         with row1_cols[0]:
-            # st.markdown("""<div class="stat-card" style="height: 160px;">""", unsafe_allow_html=True)
-            
             # Find the cat with the highest total consumption
-            if all_cat_data:
-                food_champion = max(all_cat_data.items(), key=lambda x: x[1]['total_consumed'])
-                cat_name = food_champion[0]
-                total_consumed = food_champion[1]['total_consumed']
-                
-                st.markdown(f"""
-                <div style="text-align: center;">
-                    <h3 style="margin: 0; color: {CAT_COLORS[cat_name]};">🏅 Monthly Food Champion</h3>
-                </div>
-                """, unsafe_allow_html=True)
-                
-                # Display the cat icon separately with safe HTML
-                st.markdown(get_cat_icon_html(cat_name), unsafe_allow_html=True)
-                
-                st.markdown(f"""
-                <div style="text-align: center;">
-                    <div style="font-size: 0.9rem; color: #ccc;">
-                        Consumed <span style="color: white; font-weight: bold;">{total_consumed:.1f}g</span> this month
-                    </div>
-                </div>
-                """, unsafe_allow_html=True)
-            else:
-                st.markdown("""<div style="text-align: center;"><p>Not enough data</p></div>""", unsafe_allow_html=True)
+            cat_name = stats.leader('total_consumed')
+            total_consumed = per_cat.at[cat_name, 'total_consumed']
+            
+            st.markdown(f"""
+            <div style="text-align: center;">
+                <h3 style="margin: 0; color: {cat_color(data.cat(cat_name))};">🏅 Monthly Food Champion</h3>
+            </div>
+            """, unsafe_allow_html=True)
             
-            # st.markdown("""</div>""", unsafe_allow_html=True)
+            # Display the cat icon separately with safe HTML
+            st.markdown(get_cat_icon_html(data.cat(cat_name)), unsafe_allow_html=True)
+            
+            st.markdown(f"""
+            <div style="text-align: center;">
+                <div style="font-size: 0.9rem; color: #ccc;">
+                    Consumed <span style="color: white; font-weight: bold;">{total_consumed:.1f}g</span> this month
+                </div>
+            </div>
+            """, unsafe_allow_html=True)
             
         # Stat 2: Most Dedicated Tracking
         with row1_cols[1]:
-            # st.markdown("""<div class="stat-card" style="height: 160px;">""", unsafe_allow_html=True)
-            
             # Find the cat with the most days tracked
-            if all_cat_data:
-                most_tracked = max(all_cat_data.items(), key=lambda x: len(x[1]['days_tracked']))
-                cat_name = most_tracked[0]
-                days_count = len(most_tracked[1]['days_tracked'])
-                
-                # Calculate percentage of the month
-                days_percentage = (days_count / 30) * 100
-                
-                st.markdown(f"""
-                <div style="text-align: center;">
-                    <h3 style="margin: 0; color: {CAT_COLORS[cat_name]};">📝 Most Tracked</h3>
-                </div>
-                """, unsafe_allow_html=True)
-                
-                # Display the cat icon separately with safe HTML
-                st.markdown(get_cat_icon_html(cat_name), unsafe_allow_html=True)
-                
-                st.markdown(f"""
-                <div style="text-align: center;">
-                    <div style="font-size: 0.9rem; color: #ccc;">
-                        Tracked for <span style="color: white; font-weight: bold;">{days_count}</span> days<br>
-                        <span style="color: white; font-weight: bold;">({days_percentage:.0f}%)</span> of the month
-                    </div>
-                </div>
-                """, unsafe_allow_html=True)
-            else:
-                st.markdown("""<div style="text-align: center;"><p>Not enough data</p></div>""", unsafe_allow_html=True)
+            cat_name = stats.leader('days_tracked')
+            days_count = per_cat.at[cat_name, 'days_tracked']
+            
+            # Calculate percentage of the month
+            days_percentage = (days_count / 30) * 100
+            
+            st.markdown(f"""
+            <div style="text-align: center;">
+                <h3 style="margin: 0; color: {cat_color(data.cat(cat_name))};">📝 Most Tracked</h3>
+            </div>
+            """, unsafe_allow_html=True)
             
-            # st.markdown("""</div>""", unsafe_allow_html=True)
+            # Display the cat icon separately with safe HTML
+            st.markdown(get_cat_icon_html(data.cat(cat_name)), unsafe_allow_html=True)
+            
+            st.markdown(f"""
+            <div style="text-align: center;">
+                <div style="font-size: 0.9rem; color: #ccc;">
+                    Tracked for <span style="color: white; font-weight: bold;">{days_count}</span> days<br>
+                    <span style="color: white; font-weight: bold;">({days_percentage:.0f}%)</span> of the month
+                </div>
+            </div>
+            """, unsafe_allow_html=True)
             
         # Stat 3: Most Consistent Overall
         with row1_cols[2]:
-            # st.markdown("""<div class="stat-card" style="height: 160px;">""", unsafe_allow_html=True)
-            
             # Find the most consistent cat (minimum standard deviation with enough data points)
-            consistent_cats = {cat_name: data for cat_name, data in all_cat_data.items() 
-                               if len(data['daily_consumption']) >= 5}
+            cat_name = stats.leader('consistency', largest=False, min_days=5)
             
-            if consistent_cats:
-                most_consistent = min(consistent_cats.items(), key=lambda x: x[1]['consistency'])
-                cat_name = most_consistent[0]
-                consistency = most_consistent[1]['consistency']
-                avg_consumed = most_consistent[1]['avg_consumed']
+            if cat_name:
+                consistency = per_cat.at[cat_name, 'consistency']
+                avg_consumed = per_cat.at[cat_name, 'avg_consumed']
                 
                 st.markdown(f"""
                 <div style="text-align: center;">
-                    <h3 style="margin: 0; color: {CAT_COLORS[cat_name]};">🏆 Most Consistent</h3>
+                    <h3 style="margin: 0; color: {cat_color(data.cat(cat_name))};">🏆 Most Consistent</h3>
                 </div>
                 """, unsafe_allow_html=True)
                 
                 # Display the cat icon separately with safe HTML
-                st.markdown(get_cat_icon_html(cat_name), unsafe_allow_html=True)
+                st.markdown(get_cat_icon_html(data.cat(cat_name)), unsafe_allow_html=True)
                 
                 st.markdown(f"""
                 <div style="text-align: center;">
@@ -1351,38 +1353,20 @@ def display_fun_statistics_30days(db):
                 """, unsafe_allow_html=True)
             else:
                 st.markdown("""<div style="text-align: center;"><p>Not enough data</p></div>""", unsafe_allow_html=True)
-            
-            # st.markdown("""</div>""", unsafe_allow_html=True)
         
         # Row 2: More stats
         row2_cols = st.columns(3)
         
         # Stat 4: Favorite Day of the Week
         with row2_cols[0]:
-            # st.markdown("""<div class="stat-card" style="height: 160px;">""", unsafe_allow_html=True)
-            
-            # Aggregate consumption by day of week across all cats
-            weekday_totals = {0: 0, 1: 0, 2: 0, 3: 0, 4: 0, 5: 0, 6: 0}
-            weekday_counts = {0: 0, 1: 0, 2: 0, 3: 0, 4: 0, 5: 0, 6: 0}
+            # Find the weekday with the highest average consumption per meal
+            weekday_avgs = stats.weekday['avg_consumed'].dropna()
             
-            for cat_name, data in all_cat_data.items():
-                for weekday, amount in data['weekday_consumption'].items():
-                    weekday_totals[weekday] += amount
-                    weekday_counts[weekday] += data['weekday_counts'][weekday]
-            
-            # Calculate average consumption by day with enough data
-            weekday_avgs = {}
-            for day, total in weekday_totals.items():
-                if weekday_counts[day] >= 3:  # Only include days with enough data
-                    weekday_avgs[day] = total / weekday_counts[day] if weekday_counts[day] > 0 else 0
-            
-            if weekday_avgs:
-                # Find the day with highest average consumption
-                favorite_day, avg_consumed = max(weekday_avgs.items(), key=lambda x: x[1])
-                
-                # Convert weekday number to name
-                weekday_names = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-                day_name = weekday_names[favorite_day]
+            if not weekday_avgs.empty:
+                favorite_day = weekday_avgs.idxmax()
+                avg_consumed = weekday_avgs[favorite_day]
+                meal_count = stats.weekday.at[favorite_day, 'meals']
+                day_name = WEEKDAY_NAMES[favorite_day]
                 
                 st.markdown(f"""
                 <div style="text-align: center;">
@@ -1392,36 +1376,29 @@ def display_fun_statistics_30days(db):
                     </div>
                     <div style="font-size: 0.9rem; color: #ccc;">
                         Cats eat <span style="color: white; font-weight: bold;">{avg_consumed:.1f}g</span> on average<br>
-                        <span style="color: white; font-weight: bold;">{weekday_counts[favorite_day]}</span> meals tracked
+                        <span style="color: white; font-weight: bold;">{meal_count}</span> meals tracked
                     </div>
                 </div>
                 """, unsafe_allow_html=True)
             else:
                 st.markdown("""<div style="text-align: center;"><p>Not enough data</p></div>""", unsafe_allow_html=True)
-            
-            # st.markdown("""</div>""", unsafe_allow_html=True)
         
         # Stat 5: Most Variable Eater
         with row2_cols[1]:
-            # st.markdown("""<div class="stat-card" style="height: 160px;">""", unsafe_allow_html=True)
-            
             # Find the cat with the highest standard deviation (most variable eating)
-            variable_cats = {cat_name: data for cat_name, data in all_cat_data.items() 
-                             if len(data['daily_consumption']) >= 5}
+            cat_name = stats.leader('consistency', min_days=5)
             
-            if variable_cats:
-                most_variable = max(variable_cats.items(), key=lambda x: x[1]['consistency'])
-                cat_name = most_variable[0]
-                variability = most_variable[1]['consistency']
+            if cat_name:
+                variability = per_cat.at[cat_name, 'consistency']
                 
                 st.markdown(f"""
                 <div style="text-align: center;">
-                    <h3 style="margin: 0; color: {CAT_COLORS[cat_name]};">🎭 Moody Eater</h3>
+                    <h3 style="margin: 0; color: {cat_color(data.cat(cat_name))};">🎭 Moody Eater</h3>
                 </div>
                 """, unsafe_allow_html=True)
                 
                 # Display the cat icon separately with safe HTML
-                st.markdown(get_cat_icon_html(cat_name), unsafe_allow_html=True)
+                st.markdown(get_cat_icon_html(data.cat(cat_name)), unsafe_allow_html=True)
                 
                 st.markdown(f"""
                 <div style="text-align: center;">
@@ -1433,43 +1410,14 @@ def display_fun_statistics_30days(db):
                 """, unsafe_allow_html=True)
             else:
                 st.markdown("""<div style="text-align: center;"><p>Not enough data</p></div>""", unsafe_allow_html=True)
-            
-            # st.markdown("""</div>""", unsafe_allow_html=True)
         
         # Stat 6: Trend Setter (Most clear long-term trend)
         with row2_cols[2]:
-            # st.markdown("""<div class="stat-card" style="height: 160px;">""", unsafe_allow_html=True)
+            # Find the cat with the strongest trend relative to its average day
+            cat_name = stats.leader('trend_strength')
             
-            # Analyze trends for cats with enough data points
-            trend_data = {}
-            for cat_name, data in all_cat_data.items():
-                if len(data['daily_consumption']) >= 10:
-                    # Get chronological consumption data
-                    dates = sorted(data['daily_consumption'].keys())
-                    values = [data['daily_consumption'][date] for date in dates]
-                    
-                    # Calculate slope using numpy polyfit
-                    if len(dates) >= 2:
-                        x = range(len(values))
-                        slope, _ = np.polyfit(x, values, 1)
-                        
-                        # Normalized slope (percentage change over the period)
-                        avg_value = np.mean(values)
-                        if avg_value > 0:
-                            normalized_slope = (slope * len(values)) / avg_value
-                            
-                            # Store the absolute normalized slope for ranking
-                            trend_data[cat_name] = {
-                                'slope': slope,
-                                'abs_slope': abs(normalized_slope),
-                                'trend': 'increasing' if slope > 0 else 'decreasing'
-                            }
-            
-            if trend_data:
-                # Find the cat with the strongest trend (highest absolute slope)
-                trendsetter = max(trend_data.items(), key=lambda x: x[1]['abs_slope'])
-                cat_name = trendsetter[0]
-                trend = trendsetter[1]['trend']
+            if cat_name:
+                trend = "increasing" if per_cat.at[cat_name, 'slope'] > 0 else "decreasing"
                 
                 # Determine icon and description based on trend
                 trend_icon = "📈" if trend == "increasing" else "📉"
@@ -1477,12 +1425,12 @@ def display_fun_statistics_30days(db):
                 
                 st.markdown(f"""
                 <div style="text-align: center;">
-                    <h3 style="margin: 0; color: {CAT_COLORS[cat_name]};">{trend_icon} Trend Setter</h3>
+                    <h3 style="margin: 0; color: {cat_color(data.cat(cat_name))};">{trend_icon} Trend Setter</h3>
                 </div>
                 """, unsafe_allow_html=True)
                 
                 # Display the cat icon separately with safe HTML
-                st.markdown(get_cat_icon_html(cat_name), unsafe_allow_html=True)
+                st.markdown(get_cat_icon_html(data.cat(cat_name)), unsafe_allow_html=True)
                 
                 st.markdown(f"""
                 <div style="text-align: center;">
@@ -1494,8 +1442,6 @@ def display_fun_statistics_30days(db):
                 """, unsafe_allow_html=True)
             else:
                 st.markdown("""<div style="text-align: center;"><p>Not enough data for trend analysis</p></div>""", unsafe_allow_html=True)
-            
-            # st.markdown("""</div>""", unsafe_allow_html=True)
         
         # Monthly fun fact
         monthly_facts = [
@@ -1518,59 +1464,176 @@ def display_fun_statistics_30days(db):
     st.markdown("</div>", unsafe_allow_html=True)
 
 
-def main():
-    """Main application function."""
-    # Initialize the database
-    db = CatWeightDatabase()
-    
-    # Setup page configuration and styling
-    setup_page()
-    
-    # Display the header
-    # display_header()
-    
-    # Display the 7-day status indicators
-    create_date_status_indicator(db)
+def load_dashboard_data(db, **kwargs):
+    """Load the dashboard data for the date selected in the input panel."""
+    selected_date = st.session_state.get('selected_date', datetime.date.today())
+    return DashboardData.load(db, selected_date=selected_date, **kwargs)
+
+
+# Dashboard data of the full run in progress on this thread, if any
+_full_run = threading.local()
+
+
+@contextmanager
+def full_run_data(db):
+    """
+    Load the dashboard data once for a full run and share it with its fragments.
     
-    # Display the quick input section at the top
-    create_quick_input_section(db)
+    Yields:
+        The loaded DashboardData
+    """
+    _full_run.data = load_dashboard_data(db)
+    try:
+        yield _full_run.data
+    finally:
+        _full_run.data = None
+
+
+def fragment_data(db, **kwargs):
+    """
+    Get the dashboard data a fragment renders from.
     
-    # Create a section for each cat with statistics
-    # st.markdown("<h2 class='section-title'>Cat Statistics</h2>", unsafe_allow_html=True)
+    During a full run every fragment gets the data loaded by full_run_data,
+    so all sections show the same snapshot. A fragment rerunning on its own
+    loads fresh data instead; its arguments are those of the last full run,
+    so the data cannot be passed in.
+    """
+    data = getattr(_full_run, "data", None)
+    return data if data is not None else load_dashboard_data(db, **kwargs)
+
+
+def cat_pages(cats, per_page=CATS_PER_PAGE):
+    """Split the cats into pages of the per-cat sections, keeping their order."""
+    return [cats[start:start + per_page] for start in range(0, len(cats), per_page)] or [[]]
+
+
+def page_cats(data):
+    """Get the cats on the page selected in the sidebar, or the first page if it no longer exists."""
+    pages = cat_pages(data.cats)
+    page = st.session_state.get("cat_page", 1)
+    return pages[page - 1] if 1 <= page <= len(pages) else pages[0]
+
+
+def cat_pager(db):
+    """Show a control in the sidebar to page through the cats when they don't fit on one page."""
+    pages = cat_pages(db.get_cats())
+    if len(pages) > 1:
+        st.sidebar.selectbox(
+            "Cats",
+            range(1, len(pages) + 1),
+            format_func=lambda page: " – ".join(dict.fromkeys(cat["name"] for cat in (pages[page - 1][0], pages[page - 1][-1]))),
+            key="cat_page",
+        )
+
+
+@st.fragment(key="status")
+def status_section(db):
+    """Fragment with the 7-day status indicators."""
+    create_date_status_indicator(fragment_data(db))
+
+
+@st.fragment(key="input_panel")
+def input_panel(db):
+    """Fragment with the quick input section, rerun on its own by its widgets."""
+    # Only the selected date's open entries are shown, so skip the window
+    # and the running statistics
+    data = fragment_data(db, window_days=0, stats_windows=())
+    create_quick_input_section(db, data, page_cats(data))
+
+
+@st.fragment(key="cat_cards")
+def cat_cards_section(db):
+    """Fragment with a statistics card for each cat."""
+    data = fragment_data(db)
+    cat_names = [cat["name"] for cat in page_cats(data)]
     
     # Use columns instead of sequential rendering to avoid dividers
-    cat_cols = st.columns(len(CATS))
+    cat_cols = st.columns(len(cat_names))
     
     # Handle both normal operation and testing environment
     if cat_cols:  # Check if cat_cols is not empty
-        for idx, cat_name in enumerate(CATS):
+        for idx, cat_name in enumerate(cat_names):
             if idx < len(cat_cols):  # Safe access
                 with cat_cols[idx]:
                     # Add small header with cat name and color for reference
-                    # st.markdown(f"<div class='cat-name-header' style='color: {CAT_COLORS[cat_name]};'>{cat_name}</div>", unsafe_allow_html=True)
-                    create_cat_card(cat_name, db)
+                    # st.markdown(f"<div class='cat-name-header' style='color: {cat_color(data.cat(cat_name))};'>{cat_name}</div>", unsafe_allow_html=True)
+                    create_cat_card(cat_name, data)
             else:
-                create_cat_card(cat_name, db)
+                create_cat_card(cat_name, data)
     else:
         # Fallback for testing environment
-        for cat_name in CATS:
-            create_cat_card(cat_name, db)
+        for cat_name in cat_names:
+            create_cat_card(cat_name, data)
+
+
+@st.fragment(key="history")
+def history_section(db):
+    """Fragment with the history chart."""
+    data = fragment_data(db)
+    display_history_chart(data, db=db, cats=page_cats(data))
+
+
+@st.fragment(key="stats_7days")
+def statistics_7days_section(db):
+    """Fragment with the 7-day fun statistics."""
+    display_fun_statistics(fragment_data(db))
+
+
+@st.fragment(key="stats_30days")
+def statistics_30days_section(db):
+    """Fragment with the 30-day fun statistics."""
+    display_fun_statistics_30days(fragment_data(db))
+
+
+@st.fragment(key="database")
+def database_section(db):
+    """Fragment with the database reset controls."""
+    reset_database(db)
+
+
+def main():
+    """Main application function."""
+    # Get the shared database handle, reused across reruns and sessions
+    db = get_database()
     
-    # Display the 30-day history chart
-    display_history_chart(db)
+    # Setup page configuration and styling
+    setup_page()
     
-    # Display fun statistics section - 7 days
-    display_fun_statistics(db)
+    # Display the header
+    # display_header()
     
-    # Display fun statistics section - 30 days
-    display_fun_statistics_30days(db)
+    # Each section is a fragment. Widgets rerun only their own fragment, and
+    # writes rerun the fragments listed for what they changed in
+    # FRAGMENT_DEPENDENCIES, so entering a weight never redraws the rest of
+    # the dashboard.
     
-    # Add database reset functionality
-    reset_database()
+    # Page through the cats in the sidebar when there are too many to show at once
+    cat_pager(db)
     
-    # Close the database connection when the app is done
-    db.close()
+    # Load the data once for all sections, so they render one snapshot
+    with full_run_data(db):
+        # Display the 7-day status indicators
+        status_section(db)
+        
+        # Display the quick input section at the top
+        input_panel(db)
+        
+        # Create a section for each cat with statistics
+        # st.markdown("<h2 class='section-title'>Cat Statistics</h2>", unsafe_allow_html=True)
+        cat_cards_section(db)
+        
+        # Display the 30-day history chart
+        history_section(db)
+        
+        # Display fun statistics section - 7 days
+        statistics_7days_section(db)
+        
+        # Display fun statistics section - 30 days
+        statistics_30days_section(db)
+        
+        # Add database reset functionality
+        database_section(db)
 
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -0,0 +1,117 @@
+"""
+Process-wide cache of the static files shown by the app.
+"""
+import base64
+import mimetypes
+import os
+import threading
+from typing import Callable, Dict, Optional, Tuple
+
+
+# Directory Streamlit serves at STATIC_URL_PREFIX when
+# server.enableStaticServing is on; it has to sit next to app.py
+STATIC_DIR = os.path.join(os.path.dirname(__file__), "static")
+STATIC_URL_PREFIX = "app/static"
+
+
+class AssetCache:
+    """
+    Static files read for embedding in the page, loaded once per process.
+
+    Loaded files are keyed on their path and modification time, so a file
+    is read again only after it changes on disk. Every lookup still stats
+    the file, which is cheap next to reading and encoding it.
+    """
+
+    def __init__(self, directory: str = STATIC_DIR):
+        """
+        Initialize an empty cache.
+
+        Args:
+            directory: Directory the asset names are relative to
+        """
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[Tuple[str, str], Tuple[int, str]] = {}
+        self._lock = threading.Lock()
+
+    def data_uri(self, name: str) -> str:
+        """
+        Get a file as a base64 data URI.
+
+        Args:
+            name: File name relative to the asset directory
+
+        Returns:
+            The data URI, or an empty string if the file does not exist
+        """
+        def encode(content: bytes) -> str:
+            mime_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+            return f"data:{mime_type};base64,{base64.b64encode(content).decode()}"
+
+        return self._load(name, "data_uri", encode)
+
+    def text(self, name: str) -> str:
+        """
+        Get the contents of a UTF-8 text file, such as a stylesheet.
+
+        Args:
+            name: File name relative to the asset directory
+
+        Returns:
+            The file contents, or an empty string if the file does not exist
+        """
+        return self._load(name, "text", lambda content: content.decode("utf-8"))
+
+    def static_url(self, name: str) -> str:
+        """
+        Get the URL Streamlit's static file serving publishes a file under.
+
+        The modification time is added as a query string, so browsers can keep
+        the file cached and still fetch it again once it changes.
+
+        Args:
+            name: File name relative to the asset directory
+
+        Returns:
+            The relative URL, or an empty string if the file does not exist
+        """
+        mtime = self._mtime(os.path.join(self.directory, name))
+        if mtime is None:
+            return ""
+        return f"{STATIC_URL_PREFIX}/{name}?v={mtime}"
+
+    def clear(self):
+        """Drop every loaded file."""
+        with self._lock:
+            self._entries.clear()
+
+    def _load(self, name: str, kind: str, encode: Callable[[bytes], str]) -> str:
+        """Read and encode a file, or reuse the result while its mtime is unchanged."""
+        path = os.path.join(self.directory, name)
+        mtime = self._mtime(path)
+        if mtime is None:
+            return ""
+
+        key = (path, kind)
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None and cached[0] == mtime:
+                self.hits += 1
+                return cached[1]
+            self.misses += 1
+
+        with open(path, "rb") as asset_file:
+            value = encode(asset_file.read())
+
+        with self._lock:
+            self._entries[key] = (mtime, value)
+        return value
+
+    @staticmethod
+    def _mtime(path: str) -> Optional[int]:
+        try:
+            return os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return None
@@ -0,0 +1,120 @@
+"""
+Process-wide query result cache for the cat weight database.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+
+class QueryCache:
+    """
+    Bounded LRU cache of query results with a TTL and write invalidation.
+
+    Results are stored per namespace (normally the database path) together
+    with the namespace's generation at the time the query started. Every
+    committed write bumps the generation, which makes all earlier results
+    unreachable at once. The TTL bounds how stale a result can get when a
+    change goes unnoticed.
+
+    Cached values are shared between all callers and must be treated as
+    read-only.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: float = 60.0, clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize an empty cache.
+
+        Args:
+            max_entries: Maximum number of results kept; the least recently
+                used result is evicted first
+            ttl: Seconds a result may be served after it was stored
+            clock: Monotonic time source, replaceable in tests
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[str, Hashable], Tuple[int, float, Any]]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def generation(self, namespace: str) -> int:
+        """
+        Get the current generation of a namespace.
+
+        Args:
+            namespace: The namespace, normally a database path
+
+        Returns:
+            A counter that increases on every invalidation
+        """
+        with self._lock:
+            return self._generations.get(namespace, 0)
+
+    def get(self, namespace: str, key: Hashable) -> Tuple[bool, Any]:
+        """
+        Look up a result.
+
+        Args:
+            namespace: The namespace the result belongs to
+            key: The key the result was stored under
+
+        Returns:
+            A (found, value) pair; value is None when nothing usable is cached
+        """
+        with self._lock:
+            item = self._entries.get((namespace, key))
+            if item is not None:
+                generation, expires_at, value = item
+                if generation == self._generations.get(namespace, 0) and self.clock() < expires_at:
+                    self._entries.move_to_end((namespace, key))
+                    self.hits += 1
+                    return True, value
+                del self._entries[(namespace, key)]
+            self.misses += 1
+            return False, None
+
+    def put(self, namespace: str, key: Hashable, value: Any, generation: int):
+        """
+        Store a result computed while the namespace was at the given generation.
+
+        Results from a generation that has since been invalidated are dropped,
+        so a query racing with a write can never repopulate the cache with
+        data from before the write.
+
+        Args:
+            namespace: The namespace the result belongs to
+            key: The key to store the result under
+            value: The result
+            generation: The namespace generation read before running the query
+        """
+        with self._lock:
+            if generation != self._generations.get(namespace, 0):
+                return
+            self._entries[(namespace, key)] = (generation, self.clock() + self.ttl, value)
+            self._entries.move_to_end((namespace, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, namespace: str):
+        """
+        Invalidate every result of a namespace by bumping its generation.
+
+        Args:
+            namespace: The namespace to invalidate
+        """
+        with self._lock:
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+            for cache_key in [k for k in self._entries if k[0] == namespace]:
+                del self._entries[cache_key]
+
+    def clear(self):
+        """Drop every cached result."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
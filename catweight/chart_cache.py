@@ -0,0 +1,87 @@
+"""
+Process-wide cache of rendered chart images.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+
+def fingerprint(*parts: Any) -> str:
+    """
+    Hash the inputs of a chart into a cache key.
+
+    Args:
+        parts: Everything the rendered image depends on (data series, theme,
+            image format), made of plain values whose repr is stable
+
+    Returns:
+        A hex digest identifying the inputs
+    """
+    return hashlib.sha256(repr(parts).encode("utf-8")).hexdigest()
+
+
+class ChartCache:
+    """
+    Bounded LRU cache of rendered chart images keyed by input fingerprint.
+
+    Keys are derived from the chart inputs rather than from the database, so
+    entries never go stale and are shared by every session that would draw
+    the same chart.
+    """
+
+    def __init__(self, max_entries: int = 16):
+        """
+        Initialize an empty cache.
+
+        Args:
+            max_entries: Maximum number of images kept; the least recently
+                used image is evicted first
+        """
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._images: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        Look up a rendered image.
+
+        Args:
+            key: The fingerprint of the chart inputs
+
+        Returns:
+            The image bytes, or None if the chart has not been rendered
+        """
+        with self._lock:
+            image = self._images.get(key)
+            if image is None:
+                self.misses += 1
+                return None
+            self._images.move_to_end(key)
+            self.hits += 1
+            return image
+
+    def put(self, key: str, image: bytes):
+        """
+        Store a rendered image.
+
+        Args:
+            key: The fingerprint of the chart inputs
+            image: The encoded image
+        """
+        with self._lock:
+            self._images[key] = image
+            self._images.move_to_end(key)
+            while len(self._images) > self.max_entries:
+                self._images.popitem(last=False)
+
+    def clear(self):
+        """Drop every cached image."""
+        with self._lock:
+            self._images.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._images)
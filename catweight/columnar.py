@@ -0,0 +1,90 @@
+"""
+Columnar conversions for cat_weights query results.
+
+Turns raw result tuples into typed NumPy arrays or a pandas DataFrame, so
+analysis code can work on whole columns instead of one dict per row.
+"""
+from typing import Any, Dict, Sequence
+
+import numpy as np
+
+
+# Columns of an entry, in the order db.ENTRY_SELECT selects them
+ENTRY_COLUMNS = ("id", "cat_name", "date", "initial_weight", "remaining_weight", "created_at")
+
+# NumPy dtype of each column in the "arrays" result format. Missing remaining
+# weights become NaN.
+ENTRY_DTYPES = {
+    "id": np.int64,
+    "cat_name": np.str_,
+    "date": "datetime64[D]",
+    "initial_weight": np.float64,
+    "remaining_weight": np.float64,
+    "created_at": "datetime64[us]",
+}
+
+RESULT_FORMATS = ("records", "arrays", "dataframe")
+
+
+def rows_to_arrays(rows: Sequence[Sequence[Any]], columns: Sequence[str] = ENTRY_COLUMNS) -> Dict[str, np.ndarray]:
+    """
+    Convert result tuples to a dictionary of typed NumPy arrays.
+
+    Args:
+        rows: Result tuples, one value per column
+        columns: Column names matching the tuple positions
+
+    Returns:
+        A dictionary with one array per column
+    """
+    values = list(zip(*rows)) if rows else [()] * len(columns)
+    return {
+        name: np.array(column, dtype=ENTRY_DTYPES.get(name, object))
+        for name, column in zip(columns, values)
+    }
+
+
+def rows_to_frame(rows: Sequence[Sequence[Any]], columns: Sequence[str] = ENTRY_COLUMNS):
+    """
+    Convert result tuples to a pandas DataFrame with typed columns.
+
+    Dates are datetime64, weights float64 and cat_name is categorical.
+
+    Args:
+        rows: Result tuples, one value per column
+        columns: Column names matching the tuple positions
+
+    Returns:
+        A pandas DataFrame with one column per result column
+    """
+    import pandas as pd
+
+    frame = pd.DataFrame(rows_to_arrays(rows, columns), columns=list(columns))
+    if "cat_name" in frame:
+        frame["cat_name"] = frame["cat_name"].astype("category")
+    return frame
+
+
+def convert_rows(rows: Sequence[Any], result_format: str, columns: Sequence[str] = ENTRY_COLUMNS):
+    """
+    Convert query results to the requested result format.
+
+    Args:
+        rows: Result tuples, one value per column
+        result_format: "records" for a list of dictionaries, "arrays" for a
+            dictionary of NumPy arrays or "dataframe" for a pandas DataFrame
+        columns: Column names matching the tuple positions
+
+    Returns:
+        The rows in the requested format
+
+    Raises:
+        ValueError: If result_format is not one of RESULT_FORMATS
+    """
+    if result_format == "records":
+        return [dict(zip(columns, row)) for row in rows]
+    if result_format == "arrays":
+        return rows_to_arrays(rows, columns)
+    if result_format == "dataframe":
+        return rows_to_frame(rows, columns)
+    raise ValueError(f"Unknown result format: {result_format} (expected one of {', '.join(RESULT_FORMATS)})")
@@ -0,0 +1,185 @@
+"""
+Request-scoped data for one run of the dashboard.
+"""
+import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from online_stats import RunningStats
+
+
+# Widest window any dashboard section looks back over, in days before today
+DASHBOARD_WINDOW_DAYS = 30
+
+# Lengths in days, including today, of the windows the statistics sections summarize
+STATS_WINDOWS = (7, 30)
+
+
+class DashboardData:
+    """
+    Snapshot of the data shown by one dashboard run.
+
+    Loaded with a constant number of queries inside a single read transaction,
+    so every section renders from the same consistent view of the database
+    instead of querying it again. Sections slice the snapshot with the same
+    arguments they previously passed to CatWeightDatabase.
+    """
+
+    def __init__(
+        self,
+        today: datetime.date,
+        selected_date: datetime.date,
+        daily: Dict[str, Dict[str, Dict[str, Any]]],
+        entries: List[Dict[str, Any]],
+        running: Optional[Dict[Tuple[str, str], Dict[str, RunningStats]]] = None,
+        cats: Optional[List[Dict[str, Any]]] = None,
+    ):
+        """
+        Initialize the snapshot from already loaded data.
+
+        Args:
+            today: The date the dashboard treats as today
+            selected_date: The date selected in the input section
+            daily: Per-cat, per-day totals as returned by get_daily_consumption
+            entries: Entries for the dashboard window and the selected date,
+                most recent date first
+            running: Running statistics as returned by get_running_stats,
+                keyed by (start_date, end_date) of their window
+            cats: All cats as returned by get_cats (defaults to the cats that
+                appear in the daily totals or entries, by name)
+        """
+        self.today = today
+        self.selected_date = selected_date
+        self.daily = daily
+        self._entries = entries
+        self._running = running or {}
+        if cats is None:
+            names = sorted(set(daily) | {entry["cat_name"] for entry in entries})
+            cats = [{"id": None, "name": name, "color": None, "image": None} for name in names]
+        self.cats = cats
+        self._cats_by_name = {cat["name"]: cat for cat in cats}
+
+    @classmethod
+    def load(
+        cls,
+        db,
+        today: Optional[datetime.date] = None,
+        selected_date: Optional[datetime.date] = None,
+        window_days: int = DASHBOARD_WINDOW_DAYS,
+        stats_windows: Tuple[int, ...] = STATS_WINDOWS,
+    ) -> "DashboardData":
+        """
+        Load the dashboard data from the database.
+
+        Args:
+            db: The CatWeightDatabase to read from
+            today: The date to treat as today (defaults to the current date)
+            selected_date: The date selected in the input section (defaults to today)
+            window_days: How many days before today to load
+            stats_windows: Lengths in days, including today, of the windows
+                to load running statistics for
+
+        Returns:
+            The loaded DashboardData
+        """
+        today = today or datetime.date.today()
+        selected_date = selected_date or today
+        start_date = (today - datetime.timedelta(days=window_days)).isoformat()
+        end_date = today.isoformat()
+        selected_date_str = selected_date.isoformat()
+
+        stats_ranges = [((today - datetime.timedelta(days=days - 1)).isoformat(), end_date) for days in stats_windows]
+
+        with db.snapshot():
+            cats = db.get_cats()
+            daily = db.get_daily_consumption(start_date, end_date)
+            entries = db.get_entries_by_date_range(start_date, end_date)
+            if not start_date <= selected_date_str <= end_date:
+                entries = entries + db.get_entries_by_date_range(selected_date_str, selected_date_str)
+            running = {stats_range: db.get_running_stats(*stats_range) for stats_range in stats_ranges}
+
+        return cls(today, selected_date, daily, entries, running, cats)
+
+    @property
+    def cat_names(self) -> List[str]:
+        """Names of all cats, in the order of get_cats."""
+        return [cat["name"] for cat in self.cats]
+
+    def cat(self, name: str) -> Dict[str, Any]:
+        """
+        Get a cat by name.
+
+        Args:
+            name: The name of the cat
+
+        Returns:
+            The cat's dictionary as returned by get_cats, with no color or
+            image for a cat that is not in the snapshot
+        """
+        return self._cats_by_name.get(name) or {"id": None, "name": name, "color": None, "image": None}
+
+    def entries(self, start_date: str, end_date: str, cat_name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Get entries within a date range, optionally filtered by cat name.
+
+        Args:
+            start_date: Start date in YYYY-MM-DD format
+            end_date: End date in YYYY-MM-DD format
+            cat_name: Optional cat name filter
+
+        Returns:
+            A list of dictionaries with entry data, most recent date first
+        """
+        return [
+            entry for entry in self._entries
+            if start_date <= entry["date"] <= end_date and (cat_name is None or entry["cat_name"] == cat_name)
+        ]
+
+    def open_entries(self, cat_name: str, date: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Get entries for a day that don't have a remaining weight recorded yet.
+
+        Args:
+            cat_name: The name of the cat
+            date: The date in YYYY-MM-DD format (defaults to today)
+
+        Returns:
+            A list of dictionaries with entry data
+        """
+        date = date or self.today.isoformat()
+        return [entry for entry in self.entries(date, date, cat_name) if entry["remaining_weight"] is None]
+
+    def daily_consumption(self, start_date: str, end_date: str, cat_name: Optional[str] = None) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """
+        Get per-cat, per-day totals within a date range.
+
+        Args:
+            start_date: Start date in YYYY-MM-DD format
+            end_date: End date in YYYY-MM-DD format
+            cat_name: Optional cat name filter
+
+        Returns:
+            A dictionary keyed by cat name, then by date, as returned by
+            CatWeightDatabase.get_daily_consumption
+        """
+        result = {}
+        for cat, days in self.daily.items():
+            if cat_name is not None and cat != cat_name:
+                continue
+            in_range = {date: day for date, day in days.items() if start_date <= date <= end_date}
+            if in_range:
+                result[cat] = in_range
+        return result
+
+    def running_stats(self, start_date: str, end_date: str) -> Optional[Dict[str, RunningStats]]:
+        """
+        Get the running statistics loaded for a window.
+
+        Args:
+            start_date: Start date in YYYY-MM-DD format
+            end_date: End date in YYYY-MM-DD format
+
+        Returns:
+            A dictionary keyed by cat name as returned by get_running_stats, or
+            None if the window was not loaded
+        """
+        return self._running.get((start_date, end_date))
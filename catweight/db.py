@@ -3,21 +3,543 @@ Database operations for the cat weight tracking app.
 """
 import sqlite3
 import os
+import copy
 import datetime
-from typing import List, Tuple, Optional, Dict, Any
+import functools
+import itertools
+import threading
+import time
+import urllib.parse
+from contextlib import contextmanager
+from typing import List, Tuple, Optional, Dict, Any, Iterable, Iterator, Mapping, Union
+
+from tuning import ConnectionProfile, get_profile
+from pool import ConnectionPool
+from cache import QueryCache
+from matrix import ConsumptionMatrix, MATRIX_ROLLUP_COLUMNS
+from online_stats import RunningStats, WEEKDAY_KEYS, BUCKET_DAYS, bucket_start
+
+
+def _daily_rollup_select(cat_key: str = "cat_id", table: str = "cat_weights") -> str:
+    """
+    Query aggregating cat_weights into daily_consumption rows, before GROUP BY.
+    
+    Only completed entries (with a remaining weight) contribute to the weights.
+    
+    Args:
+        cat_key: Column identifying the cat; migrations written before the
+            cats table pass "cat_name"
+        table: Table or view to aggregate, for example the union with the archives
+    """
+    return (
+        f"SELECT {cat_key}, date, "
+        "COALESCE(SUM(initial_weight - remaining_weight), 0), "
+        "COALESCE(SUM(CASE WHEN remaining_weight IS NOT NULL THEN initial_weight END), 0), "
+        "COALESCE(SUM(remaining_weight), 0), "
+        "SUM(remaining_weight IS NOT NULL), "
+        "SUM(remaining_weight IS NULL), "
+        "MIN(initial_weight - remaining_weight), "
+        "MAX(initial_weight - remaining_weight) "
+        f"FROM {table}"
+    )
+
+
+def _daily_rollup_columns(cat_key: str = "cat_id") -> str:
+    """Columns of daily_consumption, in the order of _daily_rollup_select."""
+    return (
+        f"{cat_key}, date, consumed, initial_total, remaining_total, "
+        "complete_count, open_count, min_consumed, max_consumed"
+    )
+
+
+# Aggregates of one cat's entries on one day, as stored in daily_consumption
+DAILY_ROLLUP_SELECT = _daily_rollup_select()
+DAILY_ROLLUP_COLUMNS = _daily_rollup_columns()
+
+
+def _refresh_rollup_sql(row: str, cat_key: str = "cat_id") -> str:
+    """Trigger statements recomputing the daily_consumption row for OLD or NEW."""
+    return (
+        f"DELETE FROM daily_consumption WHERE {cat_key} = {row}.{cat_key} AND date = {row}.date; "
+        f"INSERT INTO daily_consumption ({_daily_rollup_columns(cat_key)}) {_daily_rollup_select(cat_key)} "
+        f"WHERE {cat_key} = {row}.{cat_key} AND date = {row}.date GROUP BY {cat_key}, date;"
+    )
+
+
+def _rollup_triggers(cat_key: str = "cat_id") -> List[str]:
+    """Statements creating the triggers that keep daily_consumption current."""
+    return [
+        "CREATE TRIGGER IF NOT EXISTS trg_cat_weights_rollup_insert AFTER INSERT ON cat_weights "
+        f"BEGIN {_refresh_rollup_sql('NEW', cat_key)} END",
+        "CREATE TRIGGER IF NOT EXISTS trg_cat_weights_rollup_delete AFTER DELETE ON cat_weights "
+        f"BEGIN {_refresh_rollup_sql('OLD', cat_key)} END",
+        "CREATE TRIGGER IF NOT EXISTS trg_cat_weights_rollup_update "
+        f"AFTER UPDATE OF {cat_key}, date, initial_weight, remaining_weight ON cat_weights "
+        f"BEGIN {_refresh_rollup_sql('OLD', cat_key)} {_refresh_rollup_sql('NEW', cat_key)} END",
+    ]
+
+
+# Columns of running_stats after (cat_id, bucket), in RunningStats field order
+RUNNING_STATS_COLUMNS = (
+    ["days", "mean", "m2", "consumed", "sum_x", "sum_xx", "sum_xy", "meals", "initial_total", "remaining_total"]
+    + [f"{key}_consumed" for key in WEEKDAY_KEYS]
+    + [f"{key}_meals" for key in WEEKDAY_KEYS]
+    + ["last_date"]
+)
+
+# Monday-based weekday of the date column (0 = Monday)
+_WEEKDAY_SQL = "((CAST(strftime('%w', date) AS INTEGER) + 6) % 7)"
+
+
+def _running_stats_select(where: str = "", cat_key: str = "cat_id") -> str:
+    """
+    Query computing running_stats rows from the daily_consumption rollup.
+    
+    Args:
+        where: Extra conditions on the daily_consumption rows, starting with AND
+        cat_key: Column identifying the cat, as for _daily_rollup_select
+    """
+    weekday_sums = (
+        [f"SUM(CASE WHEN weekday = {i} THEN consumed ELSE 0 END)" for i in range(7)]
+        + [f"SUM(CASE WHEN weekday = {i} THEN complete_count ELSE 0 END)" for i in range(7)]
+    )
+    return (
+        "WITH days AS ("
+        f"SELECT {cat_key}, date, consumed, complete_count, initial_total, remaining_total, "
+        f"{_WEEKDAY_SQL} AS weekday, date(date, '-' || {_WEEKDAY_SQL} || ' days') AS bucket "
+        f"FROM daily_consumption WHERE complete_count > 0 {where}"
+        "), indexed AS ("
+        f"SELECT *, ROW_NUMBER() OVER (PARTITION BY {cat_key}, bucket ORDER BY date) - 1 AS x, "
+        f"AVG(consumed) OVER (PARTITION BY {cat_key}, bucket) AS bucket_mean "
+        "FROM days"
+        ") "
+        f"SELECT {cat_key}, bucket, COUNT(*), AVG(consumed), "
+        "SUM((consumed - bucket_mean) * (consumed - bucket_mean)), SUM(consumed), "
+        "SUM(x), SUM(x * x), SUM(x * consumed), SUM(complete_count), SUM(initial_total), SUM(remaining_total), "
+        f"{', '.join(weekday_sums)}, MAX(date) "
+        f"FROM indexed GROUP BY {cat_key}, bucket"
+    )
+
+
+def _running_stats_from_row(values: Iterable[Any]) -> RunningStats:
+    """Build RunningStats from running_stats values in RUNNING_STATS_COLUMNS order."""
+    values = list(values)
+    return RunningStats(*values[:10], weekday_consumed=values[10:17], weekday_meals=values[17:24], last_date=values[24])
+
+
+def _running_stats_to_row(stats: RunningStats) -> List[Any]:
+    """Get the running_stats values of RunningStats in RUNNING_STATS_COLUMNS order."""
+    return [
+        stats.days, stats.mean, stats.m2, stats.consumed, stats.sum_x, stats.sum_xx, stats.sum_xy,
+        stats.meals, stats.initial_total, stats.remaining_total,
+        *stats.weekday_consumed, *stats.weekday_meals, stats.last_date,
+    ]
+
+
+# Cats every new database starts with: (name, color, image in the static directory)
+DEFAULT_CATS = [
+    ("Mittens", "#FF9671", "mittens.png"),
+    ("Cheddar", "#FFC75F", "cheddar.png"),
+    ("Lola", "#D65DB1", "lola.png"),
+]
+
+
+# Ordered schema migrations. Entry N upgrades the schema from version N to
+# N + 1; the version a database is at is stored in PRAGMA user_version.
+# Never edit a released migration, append a new one instead.
+MIGRATIONS: List[List[str]] = [
+    # 1: base table
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS cat_weights (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            cat_name TEXT NOT NULL,
+            date TEXT NOT NULL,
+            initial_weight REAL NOT NULL,
+            remaining_weight REAL,
+            created_at TEXT NOT NULL
+        )
+        ''',
+    ],
+    # 2: indexes for date range lookups, with and without a cat filter
+    [
+        "CREATE INDEX IF NOT EXISTS idx_cat_weights_cat_date ON cat_weights (cat_name, date)",
+        "CREATE INDEX IF NOT EXISTS idx_cat_weights_date ON cat_weights (date)",
+    ],
+    # 3: partial index covering only entries still waiting for a remaining weight
+    [
+        "CREATE INDEX IF NOT EXISTS idx_cat_weights_open ON cat_weights (cat_name, date) "
+        "WHERE remaining_weight IS NULL",
+    ],
+    # 4: per-cat, per-day rollup kept current by triggers. Each trigger
+    # recomputes only the (cat_name, date) buckets the changed row belongs to.
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS daily_consumption (
+            cat_name TEXT NOT NULL,
+            date TEXT NOT NULL,
+            consumed REAL NOT NULL,
+            initial_total REAL NOT NULL,
+            remaining_total REAL NOT NULL,
+            complete_count INTEGER NOT NULL,
+            open_count INTEGER NOT NULL,
+            min_consumed REAL,
+            max_consumed REAL,
+            PRIMARY KEY (cat_name, date)
+        ) WITHOUT ROWID
+        ''',
+        "CREATE INDEX IF NOT EXISTS idx_daily_consumption_date ON daily_consumption (date)",
+        f"INSERT OR REPLACE INTO daily_consumption ({_daily_rollup_columns('cat_name')}) "
+        f"{_daily_rollup_select('cat_name')} GROUP BY cat_name, date",
+        *_rollup_triggers("cat_name"),
+    ],
+    # 5: running statistics of tracked days per cat and week, see online_stats.py.
+    # Kept current by the write methods of CatWeightDatabase.
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS running_stats (
+            cat_name TEXT NOT NULL,
+            bucket TEXT NOT NULL,
+            days INTEGER NOT NULL,
+            mean REAL NOT NULL,
+            m2 REAL NOT NULL,
+            consumed REAL NOT NULL,
+            sum_x REAL NOT NULL,
+            sum_xx REAL NOT NULL,
+            sum_xy REAL NOT NULL,
+            meals INTEGER NOT NULL,
+            initial_total REAL NOT NULL,
+            remaining_total REAL NOT NULL,
+            mon_consumed REAL NOT NULL,
+            tue_consumed REAL NOT NULL,
+            wed_consumed REAL NOT NULL,
+            thu_consumed REAL NOT NULL,
+            fri_consumed REAL NOT NULL,
+            sat_consumed REAL NOT NULL,
+            sun_consumed REAL NOT NULL,
+            mon_meals INTEGER NOT NULL,
+            tue_meals INTEGER NOT NULL,
+            wed_meals INTEGER NOT NULL,
+            thu_meals INTEGER NOT NULL,
+            fri_meals INTEGER NOT NULL,
+            sat_meals INTEGER NOT NULL,
+            sun_meals INTEGER NOT NULL,
+            last_date TEXT NOT NULL,
+            PRIMARY KEY (cat_name, bucket)
+        ) WITHOUT ROWID
+        ''',
+        f"INSERT OR REPLACE INTO running_stats (cat_name, bucket, {', '.join(RUNNING_STATS_COLUMNS)}) "
+        f"{_running_stats_select(cat_key='cat_name')}",
+    ],
+    # 6: raw bowl scale samples (Unix seconds, centigrams) and the state of
+    # the feeding detector per bowl, see scale.py
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS scale_readings (
+            cat_name TEXT NOT NULL,
+            ts INTEGER NOT NULL,
+            weight_cg INTEGER NOT NULL,
+            PRIMARY KEY (cat_name, ts)
+        ) WITHOUT ROWID
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS scale_detector_state (
+            cat_name TEXT PRIMARY KEY,
+            phase TEXT NOT NULL,
+            entry_id INTEGER,
+            initial_cg INTEGER NOT NULL,
+            last_ts INTEGER,
+            last_cg INTEGER,
+            last_change_ts INTEGER,
+            settled_cg INTEGER,
+            rise_cg INTEGER NOT NULL
+        )
+        ''',
+    ],
+    # 7: cats table; every per-cat table references cats by integer id instead
+    # of repeating the name. Tables are rebuilt with the id in place of the
+    # name, and the derived rollups are recomputed.
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS cats (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE,
+            color TEXT,
+            image TEXT
+        )
+        ''',
+        "INSERT OR IGNORE INTO cats (name, color, image) VALUES "
+        + ", ".join(f"('{name}', '{color}', '{image}')" for name, color, image in DEFAULT_CATS),
+        "INSERT OR IGNORE INTO cats (name) SELECT cat_name FROM cat_weights "
+        "UNION SELECT cat_name FROM scale_readings UNION SELECT cat_name FROM scale_detector_state",
+        '''
+        CREATE TABLE cat_weights_v7 (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            cat_id INTEGER NOT NULL REFERENCES cats (id),
+            date TEXT NOT NULL,
+            initial_weight REAL NOT NULL,
+            remaining_weight REAL,
+            created_at TEXT NOT NULL
+        )
+        ''',
+        "INSERT INTO cat_weights_v7 (id, cat_id, date, initial_weight, remaining_weight, created_at) "
+        "SELECT w.id, c.id, w.date, w.initial_weight, w.remaining_weight, w.created_at "
+        "FROM cat_weights w JOIN cats c ON c.name = w.cat_name",
+        # Carry the AUTOINCREMENT counter over, so ids of deleted entries stay unused
+        "DELETE FROM sqlite_sequence WHERE name = 'cat_weights_v7'",
+        "UPDATE sqlite_sequence SET name = 'cat_weights_v7' WHERE name = 'cat_weights'",
+        "DROP TABLE cat_weights",
+        "ALTER TABLE cat_weights_v7 RENAME TO cat_weights",
+        "CREATE INDEX IF NOT EXISTS idx_cat_weights_cat_date ON cat_weights (cat_id, date)",
+        "CREATE INDEX IF NOT EXISTS idx_cat_weights_date ON cat_weights (date)",
+        "CREATE INDEX IF NOT EXISTS idx_cat_weights_open ON cat_weights (cat_id, date) "
+        "WHERE remaining_weight IS NULL",
+        "DROP TABLE daily_consumption",
+        '''
+        CREATE TABLE daily_consumption (
+            cat_id INTEGER NOT NULL REFERENCES cats (id),
+            date TEXT NOT NULL,
+            consumed REAL NOT NULL,
+            initial_total REAL NOT NULL,
+            remaining_total REAL NOT NULL,
+            complete_count INTEGER NOT NULL,
+            open_count INTEGER NOT NULL,
+            min_consumed REAL,
+            max_consumed REAL,
+            PRIMARY KEY (cat_id, date)
+        ) WITHOUT ROWID
+        ''',
+        "CREATE INDEX IF NOT EXISTS idx_daily_consumption_date ON daily_consumption (date)",
+        f"INSERT INTO daily_consumption ({DAILY_ROLLUP_COLUMNS}) {DAILY_ROLLUP_SELECT} GROUP BY cat_id, date",
+        *_rollup_triggers(),
+        "DROP TABLE running_stats",
+        '''
+        CREATE TABLE running_stats (
+            cat_id INTEGER NOT NULL REFERENCES cats (id),
+            bucket TEXT NOT NULL,
+            days INTEGER NOT NULL,
+            mean REAL NOT NULL,
+            m2 REAL NOT NULL,
+            consumed REAL NOT NULL,
+            sum_x REAL NOT NULL,
+            sum_xx REAL NOT NULL,
+            sum_xy REAL NOT NULL,
+            meals INTEGER NOT NULL,
+            initial_total REAL NOT NULL,
+            remaining_total REAL NOT NULL,
+            mon_consumed REAL NOT NULL,
+            tue_consumed REAL NOT NULL,
+            wed_consumed REAL NOT NULL,
+            thu_consumed REAL NOT NULL,
+            fri_consumed REAL NOT NULL,
+            sat_consumed REAL NOT NULL,
+            sun_consumed REAL NOT NULL,
+            mon_meals INTEGER NOT NULL,
+            tue_meals INTEGER NOT NULL,
+            wed_meals INTEGER NOT NULL,
+            thu_meals INTEGER NOT NULL,
+            fri_meals INTEGER NOT NULL,
+            sat_meals INTEGER NOT NULL,
+            sun_meals INTEGER NOT NULL,
+            last_date TEXT NOT NULL,
+            PRIMARY KEY (cat_id, bucket)
+        ) WITHOUT ROWID
+        ''',
+        f"INSERT INTO running_stats (cat_id, bucket, {', '.join(RUNNING_STATS_COLUMNS)}) {_running_stats_select()}",
+        '''
+        CREATE TABLE scale_readings_v7 (
+            cat_id INTEGER NOT NULL REFERENCES cats (id),
+            ts INTEGER NOT NULL,
+            weight_cg INTEGER NOT NULL,
+            PRIMARY KEY (cat_id, ts)
+        ) WITHOUT ROWID
+        ''',
+        "INSERT INTO scale_readings_v7 (cat_id, ts, weight_cg) "
+        "SELECT c.id, r.ts, r.weight_cg FROM scale_readings r JOIN cats c ON c.name = r.cat_name",
+        "DROP TABLE scale_readings",
+        "ALTER TABLE scale_readings_v7 RENAME TO scale_readings",
+        '''
+        CREATE TABLE scale_detector_state_v7 (
+            cat_id INTEGER PRIMARY KEY REFERENCES cats (id),
+            phase TEXT NOT NULL,
+            entry_id INTEGER,
+            initial_cg INTEGER NOT NULL,
+            last_ts INTEGER,
+            last_cg INTEGER,
+            last_change_ts INTEGER,
+            settled_cg INTEGER,
+            rise_cg INTEGER NOT NULL
+        )
+        ''',
+        "INSERT INTO scale_detector_state_v7 "
+        "SELECT c.id, s.phase, s.entry_id, s.initial_cg, s.last_ts, s.last_cg, s.last_change_ts, s.settled_cg, s.rise_cg "
+        "FROM scale_detector_state s JOIN cats c ON c.name = s.cat_name",
+        "DROP TABLE scale_detector_state",
+        "ALTER TABLE scale_detector_state_v7 RENAME TO scale_detector_state",
+    ],
+]
+
+def _entry_select(table: str = "cat_weights") -> str:
+    """Query of entries with the name of their cat, from cat_weights or an archive's copy of it."""
+    return (
+        "SELECT w.id AS id, c.name AS cat_name, w.date, w.initial_weight, w.remaining_weight, w.created_at "
+        f"FROM {table} w JOIN cats c ON c.id = w.cat_id"
+    )
+
+
+# Entries with the name of their cat, in the column order of columnar.ENTRY_COLUMNS
+ENTRY_SELECT = _entry_select()
+
+# Columns of cat_weights, also stored by the archives
+ENTRY_TABLE_COLUMNS = "id, cat_id, date, initial_weight, remaining_weight, created_at"
+
+# Schema of a yearly archive of cat_weights rows. Archives are written only by
+# archive_entries and use a rollback journal, so readers can attach them read-only.
+ARCHIVE_SCHEMA = [
+    "PRAGMA journal_mode = DELETE",
+    '''
+    CREATE TABLE IF NOT EXISTS cat_weights (
+        id INTEGER PRIMARY KEY,
+        cat_id INTEGER NOT NULL,
+        date TEXT NOT NULL,
+        initial_weight REAL NOT NULL,
+        remaining_weight REAL,
+        created_at TEXT NOT NULL
+    )
+    ''',
+    "CREATE INDEX IF NOT EXISTS idx_cat_weights_cat_date ON cat_weights (cat_id, date)",
+    "CREATE INDEX IF NOT EXISTS idx_cat_weights_date ON cat_weights (date)",
+]
+
+# Entries older than this many days are moved to the archives by archive_entries
+ARCHIVE_AFTER_DAYS = 365
+
+# Most archives attached to one connection at a time, SQLite's default limit
+# on attached databases. archive_entries merges the oldest archives together
+# to keep at most this many, so every read can attach all it needs.
+MAX_ATTACHED_ARCHIVES = 10
+
+# Temporary view on every connection that attached archives: cat_weights and
+# the attached archives' rows in one table
+ARCHIVE_VIEW = "cat_weights_all"
+
+# Id of the cat whose name is the query parameter
+CAT_ID_SQL = "(SELECT id FROM cats WHERE name = ?)"
+
+# Columns of scale_detector_state after cat_id
+SCALE_STATE_COLUMNS = [
+    "phase", "entry_id", "initial_cg", "last_ts", "last_cg", "last_change_ts", "settled_cg", "rise_cg"
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+DEFAULT_DB_PATH = "/opt/db/fatcat.db"
+
+# Day range marking every day for a refresh of the consumption matrix, which rebuilds it
+MATRIX_ALL_DAYS = ("0000-01-01", "9999-12-31")
+
+
+def _add_days(date: str, days: int) -> str:
+    """Shift a YYYY-MM-DD date by a number of days."""
+    return (datetime.date.fromisoformat(date) + datetime.timedelta(days=days)).isoformat()
+
+
+def cached_query(method):
+    """
+    Serve a read method from the instance's QueryCache, if it has one.
+    
+    Results are keyed by method name and arguments. Reads inside
+    transaction() bypass the cache so they see the transaction's own writes,
+    and reads inside snapshot() so they all see the snapshot rather than
+    results cached from other points in time. Every caller gets its own copy
+    of the result, so changing it does not change what others are served.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if (self.cache is None or getattr(self._local, "in_transaction", False)
+                or getattr(self._local, "in_snapshot", False)):
+            return method(self, *args, **kwargs)
+        
+        self._check_data_version()
+        namespace = self._cache_namespace
+        key = (method.__name__, args, tuple(sorted(kwargs.items())))
+        found, value = self.cache.get(namespace, key)
+        if found:
+            return copy.deepcopy(value)
+        
+        generation = self.cache.generation(namespace)
+        value = method(self, *args, **kwargs)
+        self.cache.put(namespace, key, value, generation)
+        return copy.deepcopy(value)
+    return wrapper
 
 
 class CatWeightDatabase:
     """Database handler for cat food weight tracking."""
     
-    def __init__(self, db_path="/opt/db/fatcat.db"):
-        """Initialize the database connection and create tables if they don't exist."""
-        self.db_path = db_path
+    def __init__(
+        self,
+        db_path: str = DEFAULT_DB_PATH,
+        profile: Optional[Union[str, ConnectionProfile]] = None,
+        pool: Optional[ConnectionPool] = None,
+        cache: Optional[QueryCache] = None,
+        data_version_interval: float = 1.0,
+        archive_dir: Optional[str] = None,
+        matrix: Optional[ConsumptionMatrix] = None,
+    ):
+        """
+        Initialize the database connection and create tables if they don't exist.
+        
+        Without a pool the instance owns a single connection and must stay on
+        the thread that created it. With a pool, every call checks out a
+        connection for its duration, so one instance can be shared by many
+        threads (for example all Streamlit sessions of a server process).
+        
+        Args:
+            db_path: Path to the SQLite database file (ignored when a pool is given)
+            profile: Connection tuning profile, either a ConnectionProfile or the
+                name of a preset in tuning.PROFILES (defaults to "balanced";
+                ignored when a pool is given)
+            pool: Optional connection pool to draw connections from
+            cache: Optional query cache for read results; can be shared by
+                instances on the same database, whose writes then invalidate
+                each other's results
+            data_version_interval: Minimum seconds between checks of PRAGMA
+                data_version for writes made by other processes while a cache
+                is in use
+            archive_dir: Directory of the yearly archives written by
+                archive_entries (defaults to <database name>_archive next to
+                the database file)
+            matrix: Optional consumption matrix to keep current with every
+                write; built from daily_consumption if its file does not
+                exist yet
+        """
+        self.pool = pool
+        self.db_path = pool.db_path if pool else db_path
+        self.profile = pool.profile if pool else get_profile(profile)
         self.conn = None
         self.cursor = None
+        # Per-thread state: the connection checked out by the outermost call
+        # and whether it is inside transaction()
+        self._local = threading.local()
+        self.cache = cache
+        self.data_version_interval = data_version_interval
+        self._cache_namespace = os.path.abspath(self.db_path)
+        self._data_versions: Dict[int, int] = {}
+        self._last_data_version_check = float("-inf")
+        self.archive_dir = archive_dir or os.path.splitext(self.db_path)[0] + "_archive"
+        # Date bounds of each archive, keyed by year, and the file stats they
+        # were read at; and the last result of archive_years with the
+        # modification time of the archive directory it was listed at
+        self._archive_bounds: Dict[str, Tuple[str, str]] = {}
+        self._archive_stats: Dict[str, Tuple[int, int]] = {}
+        self._archive_listing: Tuple[Optional[int], Dict[str, Tuple[str, str]]] = (None, {})
+        self.matrix = matrix
         self._ensure_db_directory_exists()
         self.connect()
         self.create_tables()
+        if self.matrix is not None and not self.matrix.is_built():
+            self.rebuild_consumption_matrix()
         
     def _ensure_db_directory_exists(self):
         """Ensure the directory for the database file exists."""
@@ -26,31 +548,258 @@ class CatWeightDatabase:
             os.makedirs(db_dir, exist_ok=True)
             
     def connect(self):
-        """Connect to the SQLite database."""
-        self.conn = sqlite3.connect(self.db_path)
-        self.conn.row_factory = sqlite3.Row
-        self.cursor = self.conn.cursor()
+        """
+        Connect to the SQLite database and apply the connection profile.
+        
+        Pooled instances do not hold a connection of their own; they check one
+        out of the pool for each call instead.
+        """
+        if self.pool is None:
+            self.conn = self.profile.connect(self.db_path)
+            self.cursor = self.conn.cursor()
+    
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        """
+        Get the connection to run the current call on.
+        
+        Reentrant per thread: calls nested inside another call or inside
+        transaction() reuse the connection the outermost call checked out.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            yield conn
+            return
+        
+        conn = self.pool.acquire() if self.pool else self.conn
+        self._local.conn = conn
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            if self.pool:
+                self.pool.release(conn)
+    
+    def _invalidate_cache(self):
+        """Invalidate cached reads after a committed write."""
+        if self.cache is not None:
+            self.cache.invalidate(self._cache_namespace)
+    
+    def _mark_matrix_days(self, start_date: str, end_date: str):
+        """Mark days written by the current transaction for a refresh of the consumption matrix."""
+        if self.matrix is None:
+            return
+        days = getattr(self._local, "matrix_days", None)
+        if days is not None:
+            start_date, end_date = min(start_date, days[0]), max(end_date, days[1])
+        self._local.matrix_days = (start_date, end_date)
+    
+    def _refresh_matrix(self, conn: sqlite3.Connection, days: Optional[Tuple[str, str]]):
+        """Write the daily_consumption rows of a day range into the consumption matrix."""
+        if self.matrix is None or days is None:
+            return
+        if days != MATRIX_ALL_DAYS:
+            rows = conn.execute(
+                f"SELECT {MATRIX_ROLLUP_COLUMNS} FROM daily_consumption WHERE date BETWEEN ? AND ?", days
+            )
+            try:
+                self.matrix.update(*days, rows)
+                return
+            except FileNotFoundError:
+                pass
+        # Every day was written, or the file was removed since the matrix was built
+        self.matrix.rebuild(conn.execute(f"SELECT {MATRIX_ROLLUP_COLUMNS} FROM daily_consumption"))
+    
+    def _check_data_version(self):
+        """
+        Invalidate cached reads if another connection wrote to the database.
+        
+        PRAGMA data_version changes whenever a different connection, in this
+        process or another one, commits to the database file. The value is
+        only comparable on the same connection, so the first check on each
+        pooled connection invalidates as well. The check runs at most once per
+        data_version_interval.
+        """
+        now = time.monotonic()
+        if now - self._last_data_version_check < self.data_version_interval:
+            return
+        self._last_data_version_check = now
+        
+        with self._connection() as conn:
+            version = conn.execute("PRAGMA data_version").fetchone()[0]
+            last_version = self._data_versions.get(id(conn))
+            self._data_versions[id(conn)] = version
+        
+        if version != last_version:
+            self._invalidate_cache()
         
     def create_tables(self):
-        """Create necessary tables if they don't exist."""
-        self.cursor.execute('''
-        CREATE TABLE IF NOT EXISTS cat_weights (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            cat_name TEXT NOT NULL,
-            date TEXT NOT NULL,
-            initial_weight REAL NOT NULL,
-            remaining_weight REAL,
-            created_at TEXT NOT NULL
-        )
-        ''')
-        self.conn.commit()
+        """Create necessary tables if they don't exist and apply pending migrations."""
+        self.migrate()
+        
+    def get_schema_version(self) -> int:
+        """
+        Get the schema version of the connected database.
+        
+        Returns:
+            The number of migrations applied to the database
+        """
+        with self._connection() as conn:
+            return conn.execute("PRAGMA user_version").fetchone()[0]
+        
+    def migrate(self) -> int:
+        """
+        Apply any pending schema migrations in order.
+        
+        Each migration runs in its own write transaction together with the
+        version bump, so a failed migration leaves the database at the last
+        fully applied version. The version is re-read once the write lock is
+        held, which keeps concurrent startups from applying a migration twice.
+        
+        Returns:
+            The schema version after migrating
+        """
+        migrated = False
+        while True:
+            with self.transaction() as cursor:
+                version = self.get_schema_version()
+                if version >= SCHEMA_VERSION:
+                    if migrated:
+                        self._mark_matrix_days(*MATRIX_ALL_DAYS)
+                    return version
+                
+                migrated = True
+                for statement in MIGRATIONS[version]:
+                    cursor.execute(statement)
+                cursor.execute(f"PRAGMA user_version = {version + 1}")
+    
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Cursor]:
+        """
+        Run a block of statements in a single write transaction.
+        
+        The write lock is taken up front with BEGIN IMMEDIATE. The transaction
+        is committed when the block exits normally and rolled back if it raises.
+        Methods of this class called inside the block join the transaction
+        instead of committing on their own, and so do nested transaction() blocks.
+        
+        The consumption matrix cells of the days written in the block are
+        refreshed just before the commit, while the write lock still keeps
+        other writers out.
+        
+        Yields:
+            The cursor to execute statements on
+        """
+        with self._connection() as conn:
+            if getattr(self._local, "in_transaction", False):
+                yield conn.cursor()
+                return
+            
+            conn.execute("BEGIN IMMEDIATE")
+            self._local.in_transaction = True
+            self._local.matrix_days = None
+            refreshed = False
+            try:
+                yield conn.cursor()
+                matrix_days = self._local.matrix_days
+                self._refresh_matrix(conn, matrix_days)
+                refreshed = True
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                if refreshed:
+                    # The matrix already holds the rolled back totals; put
+                    # back the committed ones
+                    self._refresh_matrix(conn, matrix_days)
+                raise
+            finally:
+                self._local.in_transaction = False
+                self._local.matrix_days = None
+            self._invalidate_cache()
+    
+    @contextmanager
+    def snapshot(self) -> Iterator[None]:
+        """
+        Run a block of reads against one consistent snapshot of the database.
+        
+        Opens a read transaction that every method of this class called inside
+        the block joins, so they all see the database as of the first read even
+        if other connections commit in the meantime. The block must not write.
+        Nested inside transaction() or another snapshot(), the outer
+        transaction is reused.
+        """
+        with self._connection() as conn:
+            if conn.in_transaction:
+                yield
+                return
+            
+            conn.execute("BEGIN")
+            self._local.in_snapshot = True
+            try:
+                yield
+            finally:
+                self._local.in_snapshot = False
+                conn.rollback()
+        
+    def _cat_id(self, cursor: sqlite3.Cursor, cat_name: str) -> int:
+        """Get the id of a cat by name, adding the cat if it is not in the cats table yet."""
+        row = cursor.execute("SELECT id FROM cats WHERE name = ?", (cat_name,)).fetchone()
+        if row:
+            return row[0]
+        cursor.execute("INSERT INTO cats (name) VALUES (?)", (cat_name,))
+        return cursor.lastrowid
+    
+    def add_cat(self, name: str, color: Optional[str] = None, image: Optional[str] = None) -> int:
+        """
+        Add a cat, or update the color and image of an existing one.
+        
+        Args:
+            name: Name of the cat
+            color: CSS color the dashboard shows the cat in
+            image: File name of the cat's picture in the static asset directory
+            
+        Returns:
+            The ID of the cat
+        """
+        with self.transaction() as cursor:
+            cat_id = self._cat_id(cursor, name)
+            cursor.execute(
+                "UPDATE cats SET color = COALESCE(?, color), image = COALESCE(?, image) WHERE id = ?",
+                (color, image, cat_id)
+            )
+            return cat_id
+    
+    @cached_query
+    def get_cats(self, offset: int = 0, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Get the cats in the order they were added.
+        
+        Args:
+            offset: Number of cats to skip
+            limit: Maximum number of cats to return (defaults to all)
+            
+        Returns:
+            A list of dictionaries with the keys id, name, color and image
+        """
+        with self._connection() as conn:
+            rows = conn.execute(
+                "SELECT id, name, color, image FROM cats ORDER BY id LIMIT ? OFFSET ?",
+                (-1 if limit is None else limit, offset)
+            ).fetchall()
+        return [dict(row) for row in rows]
+    
+    @cached_query
+    def count_cats(self) -> int:
+        """Get the number of cats."""
+        with self._connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM cats").fetchone()[0]
         
     def add_entry(self, cat_name: str, initial_weight: float, date: Optional[str] = None) -> int:
         """
         Add a new food weight entry for a cat.
         
         Args:
-            cat_name: Name of the cat (Mittens, Cheddar, or Lola)
+            cat_name: Name of the cat; cats not in the cats table yet are added
             initial_weight: Initial weight of the food bowl in grams
             date: Date of the entry in YYYY-MM-DD format (defaults to today)
             
@@ -62,32 +811,354 @@ class CatWeightDatabase:
         
         created_at = datetime.datetime.now().isoformat()
         
-        self.cursor.execute(
-            "INSERT INTO cat_weights (cat_name, date, initial_weight, created_at) "
-            "VALUES (?, ?, ?, ?)",
-            (cat_name, date, initial_weight, created_at)
-        )
-        self.conn.commit()
-        return self.cursor.lastrowid
+        with self.transaction() as cursor:
+            cursor.execute(
+                "INSERT INTO cat_weights (cat_id, date, initial_weight, created_at) "
+                "VALUES (?, ?, ?, ?)",
+                (self._cat_id(cursor, cat_name), date, initial_weight, created_at)
+            )
+            entry_id = cursor.lastrowid
+            self._merge_archived_rollup(cursor, date, date)
+            self._mark_matrix_days(date, date)
+            return entry_id
     
     def update_remaining_weight(self, entry_id: int, remaining_weight: float) -> bool:
         """
         Update the remaining weight for an existing entry.
         
+        The running statistics of the entry's week are updated in the same
+        transaction.
+        
         Args:
             entry_id: The ID of the entry to update
             remaining_weight: The remaining weight in the bowl in grams
             
         Returns:
-            True if the update was successful, False otherwise
+            True if the update was successful, False if there is no such entry
+        
+        Raises:
+            ValueError: If the entry was archived
+        """
+        with self.transaction() as cursor:
+            row = cursor.execute("SELECT cat_id, date FROM cat_weights WHERE id = ?", (entry_id,)).fetchone()
+            if row is None:
+                self._check_not_archived(cursor.connection, "w.id = ?", [entry_id])
+                return False
+            
+            cat_id, date = row
+            before = self._tracked_day(cursor, cat_id, date)
+            cursor.execute(
+                "UPDATE cat_weights SET remaining_weight = ? WHERE id = ?",
+                (remaining_weight, entry_id)
+            )
+            self._merge_archived_rollup(cursor, date, date)
+            self._update_running_stats(cursor, cat_id, date, before)
+            self._mark_matrix_days(date, date)
+            return True
+    
+    def add_entries_bulk(self, entries: Iterable[Mapping[str, Any]], chunk_size: int = 1000) -> List[int]:
+        """
+        Add many food weight entries in a single transaction.
+        
+        Entries are consumed lazily in chunks of chunk_size and inserted with
+        executemany, so generators of any length can be ingested with bounded
+        memory and a single commit.
+        
+        Args:
+            entries: Mappings with the keys cat_name and initial_weight, and
+                optionally date (defaults to today), remaining_weight and
+                created_at (defaults to now); unknown cats are added
+            chunk_size: Number of entries passed to each executemany call
+            
+        Returns:
+            The IDs of the newly created entries, in input order
         """
-        self.cursor.execute(
-            "UPDATE cat_weights SET remaining_weight = ? WHERE id = ?",
-            (remaining_weight, entry_id)
+        today = datetime.date.today().isoformat()
+        created_at = datetime.datetime.now().isoformat()
+        entry_ids = []
+        completed_dates = []
+        
+        def to_row(entry):
+            return (
+                entry["cat_name"],
+                entry.get("date") or today,
+                entry["initial_weight"],
+                entry.get("remaining_weight"),
+                entry.get("created_at") or created_at,
+            )
+        
+        iterator = iter(entries)
+        with self.transaction() as cursor:
+            while True:
+                chunk = [to_row(entry) for entry in itertools.islice(iterator, chunk_size)]
+                if not chunk:
+                    break
+                completed_dates.extend(row[1] for row in chunk if row[3] is not None)
+                self._mark_matrix_days(min(row[1] for row in chunk), max(row[1] for row in chunk))
+                cat_ids = {name: self._cat_id(cursor, name) for name in {row[0] for row in chunk}}
+                
+                # The write lock is held, so AUTOINCREMENT hands out the next
+                # len(chunk) ids in order after the current sequence value.
+                cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'cat_weights'")
+                row = cursor.fetchone()
+                first_id = (row[0] if row else 0) + 1
+                
+                cursor.executemany(
+                    "INSERT INTO cat_weights (cat_id, date, initial_weight, remaining_weight, created_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    ((cat_ids[row[0]],) + row[1:] for row in chunk)
+                )
+                self._merge_archived_rollup(cursor, min(row[1] for row in chunk), max(row[1] for row in chunk))
+                entry_ids.extend(range(first_id, first_id + len(chunk)))
+            
+            if completed_dates:
+                self._refresh_running_stats(cursor, min(completed_dates), max(completed_dates))
+                
+        return entry_ids
+    
+    def update_remaining_weights_bulk(self, updates: Iterable[Tuple[int, float]], chunk_size: int = 1000) -> int:
+        """
+        Update the remaining weight of many entries in a single transaction.
+        
+        Args:
+            updates: Pairs of (entry_id, remaining_weight)
+            chunk_size: Number of updates passed to each executemany call
+            
+        Returns:
+            The number of entries that were updated
+        
+        Raises:
+            ValueError: If any of the entries was archived; nothing is updated then
+        """
+        updated = 0
+        dates = []
+        iterator = iter(updates)
+        with self.transaction() as cursor:
+            while True:
+                chunk = [(remaining, entry_id) for entry_id, remaining in itertools.islice(iterator, chunk_size)]
+                if not chunk:
+                    break
+                cursor.executemany(
+                    "UPDATE cat_weights SET remaining_weight = ? WHERE id = ?",
+                    chunk
+                )
+                placeholders = ", ".join("?" * len(chunk))
+                if cursor.rowcount < len(chunk):
+                    self._check_not_archived(cursor.connection, f"w.id IN ({placeholders})", [entry_id for _, entry_id in chunk])
+                updated += cursor.rowcount
+                
+                cursor.execute(
+                    f"SELECT MIN(date), MAX(date) FROM cat_weights WHERE id IN ({placeholders})",
+                    [entry_id for _, entry_id in chunk]
+                )
+                chunk_dates = [date for date in cursor.fetchone() if date is not None]
+                if chunk_dates:
+                    self._merge_archived_rollup(cursor, *chunk_dates)
+                dates.extend(chunk_dates)
+            
+            if dates:
+                self._refresh_running_stats(cursor, min(dates), max(dates))
+                self._mark_matrix_days(min(dates), max(dates))
+                
+        return updated
+    
+    def _archive_path(self, year: str) -> str:
+        """Get the path of the archive holding a year's entries."""
+        return os.path.join(self.archive_dir, f"{year}.db")
+    
+    def _archive_uri(self, year: str) -> str:
+        """Get the URI opening a year's archive read-only."""
+        return f"file:{urllib.parse.quote(os.path.abspath(self._archive_path(year)))}?mode=ro"
+    
+    def archive_years(self) -> Dict[str, Tuple[str, str]]:
+        """
+        Get the archives written by archive_entries with the dates they cover.
+        
+        Writing to an archive creates and removes its rollback journal next to
+        it, which changes the directory's modification time. While that time
+        stays the same, the archives are not listed again, so checking for
+        them costs one stat call.
+        
+        Returns:
+            The first and last date of the entries in each archive, keyed by
+            year, oldest first
+        """
+        try:
+            modified = os.stat(self.archive_dir).st_mtime_ns
+        except FileNotFoundError:
+            return {}
+        if self._archive_listing[0] == modified:
+            return self._archive_listing[1]
+        
+        try:
+            files = {
+                entry.name[:-3]: entry.stat() for entry in os.scandir(self.archive_dir)
+                if entry.name.endswith(".db") and entry.name[:-3].isdigit()
+            }
+        except FileNotFoundError:
+            return {}
+        
+        years = {}
+        for year, stat in sorted(files.items()):
+            key = (stat.st_mtime_ns, stat.st_size)
+            if self._archive_stats.get(year) != key:
+                conn = sqlite3.connect(self._archive_uri(year), uri=True)
+                try:
+                    bounds = conn.execute("SELECT MIN(date), MAX(date) FROM cat_weights").fetchone()
+                except sqlite3.OperationalError:
+                    # Created by a run of archive_entries that has not committed yet
+                    continue
+                finally:
+                    conn.close()
+                self._archive_bounds[year] = bounds
+                self._archive_stats[year] = key
+            if self._archive_bounds[year][0] is not None:
+                years[year] = self._archive_bounds[year]
+        self._archive_listing = (modified, years)
+        return years
+    
+    def _attach_archives(self, conn: sqlite3.Connection, years: Iterable[str]):
+        """
+        Attach archives read-only to a connection, as archive_<year>.
+        
+        Archives stay attached for later calls on the connection. When more
+        than MAX_ATTACHED_ARCHIVES would be attached, the ones not asked for
+        are detached first, which SQLite only allows outside a transaction.
+        Whenever the attached archives change, ARCHIVE_VIEW is recreated as the
+        union of cat_weights and their rows.
+        
+        Raises:
+            ValueError: If the archives cannot all be attached at once
+        """
+        years = set(years)
+        attached = {name[8:] for _, name, _ in conn.execute("PRAGMA database_list") if name.startswith("archive_")}
+        if years <= attached:
+            return
+        
+        if len(attached | years) > MAX_ATTACHED_ARCHIVES:
+            if len(years) > MAX_ATTACHED_ARCHIVES or conn.in_transaction:
+                raise ValueError(
+                    f"Cannot read {len(years)} archives at once (at most {MAX_ATTACHED_ARCHIVES}, "
+                    f"and {len(attached)} already attached inside this transaction); narrow the date range"
+                )
+            for year in attached - years:
+                conn.execute(f"DETACH DATABASE archive_{year}")
+            attached &= years
+        
+        for year in sorted(years - attached):
+            conn.execute(f"ATTACH DATABASE ? AS archive_{year}", (self._archive_uri(year),))
+        
+        conn.execute(f"DROP VIEW IF EXISTS temp.{ARCHIVE_VIEW}")
+        conn.execute(
+            f"CREATE TEMP VIEW {ARCHIVE_VIEW} AS "
+            + " UNION ".join(
+                f"SELECT {ENTRY_TABLE_COLUMNS} FROM {schema}.cat_weights"
+                for schema in ["main"] + [f"archive_{year}" for year in sorted(attached | years)]
+            )
         )
-        self.conn.commit()
-        return self.cursor.rowcount > 0
     
+    def _detach_archives(self, conn: sqlite3.Connection):
+        """
+        Detach every archive from a connection, unless it is inside a transaction.
+        
+        A write transaction locks the archives attached to its connection, so
+        methods writing to archives detach them first.
+        """
+        if conn.in_transaction:
+            return
+        for _, name, _ in conn.execute("PRAGMA database_list").fetchall():
+            if name.startswith("archive_"):
+                conn.execute(f"DETACH DATABASE {name}")
+        conn.execute(f"DROP VIEW IF EXISTS temp.{ARCHIVE_VIEW}")
+    
+    def _entry_tables(self, conn: sqlite3.Connection, start_date: str, end_date: str) -> List[str]:
+        """Get cat_weights and the archives overlapping a date range, attaching the archives to the connection."""
+        years = [year for year, (first, last) in self.archive_years().items() if first <= end_date and last >= start_date]
+        if years:
+            self._attach_archives(conn, years)
+        return ["cat_weights"] + [f"archive_{year}.cat_weights" for year in years]
+    
+    def _all_entries_table(self, conn: sqlite3.Connection) -> str:
+        """Get the table or view holding every entry, cat_weights or ARCHIVE_VIEW once archives exist."""
+        years = self.archive_years()
+        if not years:
+            return "cat_weights"
+        self._attach_archives(conn, years)
+        return ARCHIVE_VIEW
+    
+    def _archived_entries(self, conn: sqlite3.Connection, where: str, params: List[Any],
+                          start_date: str = "0000-01-01", end_date: str = "9999-12-31") -> List[sqlite3.Row]:
+        """Get the archived entries matching a condition on columns of w, from the archives overlapping a date range."""
+        tables = self._entry_tables(conn, start_date, end_date)[1:]
+        if not tables:
+            return []
+        query, params = self._entry_union(tables, where, params, "id")
+        return conn.execute(query, params).fetchall()
+    
+    def _check_not_archived(self, conn: sqlite3.Connection, where: str, params: List[Any],
+                            start_date: str = "0000-01-01", end_date: str = "9999-12-31"):
+        """
+        Refuse a write to entries matching a condition if any of them was archived.
+        
+        Archives are read-only history, so updating or deleting archived entries
+        fails loudly rather than silently changing nothing.
+        
+        Raises:
+            ValueError: If archived entries match the condition
+        """
+        ids = [row["id"] for row in self._archived_entries(conn, where, params, start_date, end_date)]
+        if ids:
+            raise ValueError(f"Archived entries cannot be changed (entry ids {', '.join(map(str, ids))})")
+    
+    def _merge_archived_rollup(self, cursor: sqlite3.Cursor, start_date: str, end_date: str):
+        """
+        Recompute the daily_consumption rows of archived days in a date range.
+        
+        The rollup triggers only see cat_weights, so a write on a day that also
+        has archived entries leaves its row without them. Write methods call
+        this after changing entries of the range, before reading the rollup,
+        to aggregate the day from cat_weights and the archives together.
+        """
+        archived = [(first, last) for first, last in self.archive_years().values() if first <= end_date and last >= start_date]
+        if not archived:
+            return
+        start_date = max(start_date, min(first for first, _ in archived))
+        end_date = min(end_date, max(last for _, last in archived))
+        
+        tables = self._entry_tables(cursor.connection, start_date, end_date)
+        entries = " UNION ".join(f"SELECT {ENTRY_TABLE_COLUMNS} FROM {table} WHERE date BETWEEN ? AND ?" for table in tables)
+        cursor.execute("DELETE FROM daily_consumption WHERE date BETWEEN ? AND ?", (start_date, end_date))
+        cursor.execute(
+            f"INSERT INTO daily_consumption ({DAILY_ROLLUP_COLUMNS}) "
+            f"{_daily_rollup_select(table=f'({entries})')} GROUP BY cat_id, date",
+            [start_date, end_date] * len(tables)
+        )
+    
+    @staticmethod
+    def _entry_union(tables: List[str], where: str, params: List[Any], order: str) -> Tuple[str, List[Any]]:
+        """
+        Build the query of the entries matching a condition in several tables.
+        
+        The tables are combined with UNION rather than UNION ALL, which drops
+        the copies of rows an interrupted archive_entries left in both
+        cat_weights and an archive.
+        
+        Args:
+            tables: Tables of entries, as returned by _entry_tables
+            where: Condition on the entries, on columns of w
+            params: Parameters of the condition
+            order: ORDER BY terms on entry columns, for example "date DESC"
+        
+        Returns:
+            The query and its parameters
+        """
+        if len(tables) == 1:
+            # A single query orders by the table's columns, keeping the index order
+            order = ", ".join(f"w.{term}" for term in order.split(", "))
+        query = " UNION ".join(f"{_entry_select(table)} WHERE {where}" for table in tables)
+        return f"{query} ORDER BY {order}", params * len(tables)
+    
+    @cached_query
     def get_entry(self, entry_id: int) -> Optional[Dict[str, Any]]:
         """
         Get a specific weight entry by ID.
@@ -96,18 +1167,23 @@ class CatWeightDatabase:
             entry_id: The ID of the entry to retrieve
             
         Returns:
-            A dictionary with the entry data or None if not found
+            A dictionary with the entry data or None if not found; archived
+            entries are found as well
         """
-        self.cursor.execute(
-            "SELECT * FROM cat_weights WHERE id = ?",
-            (entry_id,)
-        )
-        row = self.cursor.fetchone()
+        with self._connection() as conn:
+            row = conn.execute(
+                f"{ENTRY_SELECT} WHERE w.id = ?",
+                (entry_id,)
+            ).fetchone()
+            if row is None:
+                row = next(iter(self._archived_entries(conn, "w.id = ?", [entry_id])), None)
         if row:
             return dict(row)
         return None
     
-    def get_entries_by_date_range(self, start_date: str, end_date: str, cat_name: Optional[str] = None) -> List[Dict[str, Any]]:
+    @cached_query
+    def get_entries_by_date_range(self, start_date: str, end_date: str, cat_name: Optional[str] = None,
+                                  result_format: str = "records") -> Any:
         """
         Get entries within a specific date range, optionally filtered by cat name.
         
@@ -115,41 +1191,460 @@ class CatWeightDatabase:
             start_date: Start date in YYYY-MM-DD format
             end_date: End date in YYYY-MM-DD format
             cat_name: Optional cat name filter
+            result_format: "records" for a list of dictionaries, "arrays" for a
+                dictionary of typed NumPy arrays, or "dataframe" for a pandas
+                DataFrame (see columnar.py)
             
         Returns:
-            A list of dictionaries with entry data
+            The entries in the requested format, most recent date first
         """
-        query = "SELECT * FROM cat_weights WHERE date BETWEEN ? AND ?"
+        where = "w.date BETWEEN ? AND ?"
         params = [start_date, end_date]
         
         if cat_name:
-            query += " AND cat_name = ?"
+            where += f" AND w.cat_id = {CAT_ID_SQL}"
             params.append(cat_name)
+        
+        with self._connection() as conn:
+            # Only archives whose dates overlap the range are read
+            tables = self._entry_tables(conn, start_date, end_date)
+            query, params = self._entry_union(tables, where, params, "date DESC")
+            
+            if result_format == "records":
+                return [dict(row) for row in conn.execute(query, params).fetchall()]
+            
+            # Skip building sqlite3.Row objects for the columnar formats
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            rows = cursor.execute(query, params).fetchall()
+        
+        from columnar import convert_rows
+        return convert_rows(rows, result_format)
+    
+    def get_entries_after_id(self, after_id: int, limit: int = 10000, result_format: str = "records") -> Any:
+        """
+        Get entries with an id above after_id in id order, archived ones included.
+        
+        Lets incremental exports page through every entry with the id as a
+        high-water mark; each page is a separate short read.
+        
+        cat_weights and each archive are read on their own, up to limit rows
+        by primary key, and the pages are merged, so a page costs the same
+        however much history there is. cat_weights is read first: an entry
+        archived in the meantime is then read twice, and the copy dropped,
+        rather than missed.
+        
+        Args:
+            after_id: The last id already processed (0 for all entries)
+            limit: Maximum number of entries returned
+            result_format: "records", "arrays" or "dataframe", as for
+                get_entries_by_date_range
             
-        query += " ORDER BY date DESC"
+        Returns:
+            The entries in the requested format, in id order
+        """
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            if result_format != "records":
+                # Skip building sqlite3.Row objects for the columnar formats
+                cursor.row_factory = None
+            rows = {}
+            for table in self._entry_tables(conn, "0000-01-01", "9999-12-31"):
+                query = f"{_entry_select(table)} WHERE w.id > ? ORDER BY w.id LIMIT ?"
+                for row in cursor.execute(query, (after_id, limit)).fetchall():
+                    rows.setdefault(row[0], row)
+        rows = [rows[entry_id] for entry_id in sorted(rows)[:limit]]
         
-        self.cursor.execute(query, params)
-        return [dict(row) for row in self.cursor.fetchall()]
+        if result_format == "records":
+            return [dict(row) for row in rows]
+        from columnar import convert_rows
+        return convert_rows(rows, result_format)
     
-    def get_last_30_days_data(self) -> Dict[str, List[Dict[str, Any]]]:
+    def iter_entries(self, start_date: str, end_date: str, cat_name: Optional[str] = None,
+                     batch_size: int = 500, after: Optional[Tuple[str, int]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Stream entries within a date range in bounded memory.
+        
+        Entries are read in pages of batch_size using keyset pagination on
+        (date, id), so memory use does not grow with the size of the range.
+        No connection or read transaction is held between pages, which keeps
+        a slow consumer from pinning a pooled connection or holding back WAL
+        checkpoints. Rows committed while iterating are picked up if they sort
+        after the current position.
+        
+        Args:
+            start_date: Start date in YYYY-MM-DD format
+            end_date: End date in YYYY-MM-DD format
+            cat_name: Optional cat name filter
+            batch_size: Number of entries fetched per page
+            after: Optional (date, id) of the last entry already processed, to
+                resume an interrupted scan
+            
+        Yields:
+            Dictionaries with entry data, ordered by date and then id
+        """
+        where = "w.date BETWEEN ? AND ?"
+        params = [start_date, end_date]
+        
+        if cat_name:
+            where += f" AND w.cat_id = {CAT_ID_SQL}"
+            params.append(cat_name)
+        
+        where += " AND (w.date, w.id) > (?, ?)"
+        position = after or ("", 0)
+        
+        while True:
+            with self._connection() as conn:
+                tables = self._entry_tables(conn, max(start_date, position[0]), end_date)
+                query, page_params = self._entry_union(tables, where, params + list(position), "date, id")
+                cursor = conn.execute(f"{query} LIMIT ?", page_params + [batch_size])
+                rows = cursor.fetchmany(batch_size)
+            
+            for row in rows:
+                yield dict(row)
+            
+            if len(rows) < batch_size:
+                return
+            position = (rows[-1]["date"], rows[-1]["id"])
+    
+    def get_last_30_days_data(self, result_format: str = "records") -> Dict[str, Any]:
         """
         Get data for the last 30 days grouped by cat.
         
+        The entries of all cats are read with one query, however many cats
+        there are, and split by cat afterwards. Archives overlapping the last
+        30 days are read as well, as in get_entries_by_date_range.
+        
+        Args:
+            result_format: Format of each cat's entries, as for get_entries_by_date_range
+        
+        Returns:
+            A dictionary with the name of every cat as keys, in the order of
+            get_cats, and the entries as values
+        """
+        # Today's date is part of the cache key, so a result cached before
+        # midnight is not served for the next day's window
+        return self._get_last_30_days_data(datetime.date.today().isoformat(), result_format)
+    
+    @cached_query
+    def _get_last_30_days_data(self, end_date: str, result_format: str) -> Dict[str, Any]:
+        """Get the entries of the 30 days up to end_date grouped by cat."""
+        start_date = (datetime.date.fromisoformat(end_date) - datetime.timedelta(days=30)).isoformat()
+        
+        with self.snapshot(), self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            names = [row[0] for row in cursor.execute("SELECT name FROM cats ORDER BY id")]
+            tables = self._entry_tables(conn, start_date, end_date)
+            query, params = self._entry_union(tables, "w.date BETWEEN ? AND ?", [start_date, end_date], "date DESC")
+            rows = cursor.execute(query, params).fetchall()
+        
+        by_cat = {name: [] for name in names}
+        for row in rows:
+            by_cat[row[1]].append(row)
+        
+        from columnar import convert_rows
+        return {name: convert_rows(cat_rows, result_format) for name, cat_rows in by_cat.items()}
+    
+    @cached_query
+    def get_daily_consumption(self, start_date: str, end_date: str, cat_name: Optional[str] = None) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """
+        Get per-cat, per-day consumption totals and entry counts for a date range.
+        
+        Reads the trigger-maintained daily_consumption rollup, so the cost
+        grows with the number of days in the range rather than the number of
+        entries.
+        
+        Args:
+            start_date: Start date in YYYY-MM-DD format
+            end_date: End date in YYYY-MM-DD format
+            cat_name: Optional cat name filter
+            
         Returns:
-            A dictionary with cat names as keys and lists of entries as values
+            A dictionary keyed by cat name, then by date, with the keys
+            consumed, entry_count, open_count, complete_count, initial_total,
+            remaining_total, min_consumed and max_consumed. Weights only cover
+            completed entries. Days without entries are omitted.
         """
-        today = datetime.date.today()
-        start_date = (today - datetime.timedelta(days=30)).isoformat()
-        end_date = today.isoformat()
+        query = (
+            "SELECT c.name AS cat_name, date, consumed, complete_count + open_count AS entry_count, "
+            "open_count, complete_count, initial_total, remaining_total, min_consumed, max_consumed "
+            "FROM daily_consumption d JOIN cats c ON c.id = d.cat_id WHERE date BETWEEN ? AND ?"
+        )
+        params = [start_date, end_date]
+        
+        if cat_name:
+            query += f" AND d.cat_id = {CAT_ID_SQL}"
+            params.append(cat_name)
+        
+        with self._connection() as conn:
+            rows = conn.execute(query, params).fetchall()
         
-        cats = ["Mittens", "Cheddar", "Lola"]
         result = {}
+        for row in rows:
+            day = dict(row)
+            result.setdefault(day.pop("cat_name"), {})[day.pop("date")] = day
+        return result
+    
+    def rebuild_daily_consumption(self) -> int:
+        """
+        Recompute the daily_consumption rollup from the raw entries.
+        
+        Archived entries are included. The running statistics derived from the
+        rollup are rebuilt as well.
+        
+        Returns:
+            The number of rollup rows written
+        """
+        with self._connection() as conn:
+            # Archives attached earlier may leave no room for all of them
+            self._detach_archives(conn)
+            with self.transaction() as cursor:
+                table = self._all_entries_table(cursor.connection)
+                cursor.execute("DELETE FROM daily_consumption")
+                cursor.execute(
+                    f"INSERT INTO daily_consumption ({DAILY_ROLLUP_COLUMNS}) "
+                    f"{_daily_rollup_select(table=table)} GROUP BY cat_id, date"
+                )
+                rows = cursor.rowcount
+                self.rebuild_running_stats()
+                self._mark_matrix_days(*MATRIX_ALL_DAYS)
+                return rows
+    
+    def check_daily_consumption(self, tolerance: float = 1e-6) -> List[Dict[str, Any]]:
+        """
+        Compare the daily_consumption rollup against the raw entries, archived ones included.
         
-        for cat in cats:
-            result[cat] = self.get_entries_by_date_range(start_date, end_date, cat)
+        Args:
+            tolerance: Maximum absolute difference allowed between weights
             
+        Returns:
+            One dictionary per inconsistent (cat_name, date) bucket with the
+            keys cat_name, date, expected and actual. Expected or actual is None
+            when the bucket is missing on that side. An empty list means the
+            rollup is consistent.
+        """
+        with self._connection() as conn:
+            table = self._all_entries_table(conn)
+            cat_names = dict(conn.execute("SELECT id, name FROM cats").fetchall())
+            expected_rows = conn.execute(f"{_daily_rollup_select(table=table)} GROUP BY cat_id, date").fetchall()
+            actual_rows = conn.execute(f"SELECT {DAILY_ROLLUP_COLUMNS} FROM daily_consumption").fetchall()
+        
+        names = [name.strip() for name in DAILY_ROLLUP_COLUMNS.split(",")]
+        expected = {(cat_names.get(row[0]), row[1]): dict(zip(names, row)) for row in expected_rows}
+        actual = {(cat_names.get(row[0]), row[1]): dict(zip(names, row)) for row in actual_rows}
+        
+        def matches(a, b):
+            for name in names[2:]:
+                if a[name] is None or b[name] is None:
+                    if a[name] is not b[name]:
+                        return False
+                elif abs(a[name] - b[name]) > tolerance:
+                    return False
+            return True
+        
+        mismatches = []
+        for key in sorted(expected.keys() | actual.keys()):
+            want, got = expected.get(key), actual.get(key)
+            if want is None or got is None or not matches(want, got):
+                mismatches.append({"cat_name": key[0], "date": key[1], "expected": want, "actual": got})
+        return mismatches
+    
+    def rebuild_consumption_matrix(self) -> int:
+        """
+        Rewrite the consumption matrix from the daily_consumption rollup.
+        
+        Returns:
+            The number of cells written
+        
+        Raises:
+            ValueError: If the database has no consumption matrix
+        """
+        if self.matrix is None:
+            raise ValueError("The database was opened without a consumption matrix")
+        with self.transaction() as cursor:
+            return self.matrix.rebuild(cursor.execute(f"SELECT {MATRIX_ROLLUP_COLUMNS} FROM daily_consumption"))
+    
+    def check_consumption_matrix(self) -> List[Dict[str, Any]]:
+        """
+        Compare the consumption matrix against the daily_consumption rollup.
+        
+        Returns:
+            One dictionary per inconsistent cell with the keys cat_name and
+            date. An empty list means the matrix is consistent.
+        
+        Raises:
+            ValueError: If the database has no consumption matrix
+        """
+        if self.matrix is None:
+            raise ValueError("The database was opened without a consumption matrix")
+        with self.snapshot():
+            with self._connection() as conn:
+                cat_names = dict(conn.execute("SELECT id, name FROM cats").fetchall())
+                mismatches = self.matrix.mismatches(conn.execute(f"SELECT {MATRIX_ROLLUP_COLUMNS} FROM daily_consumption"))
+        return [{"cat_name": cat_names.get(cat_id), "date": date} for cat_id, date in mismatches]
+    
+    @cached_query
+    def get_running_stats(self, start_date: str, end_date: str, cat_name: Optional[str] = None) -> Dict[str, RunningStats]:
+        """
+        Get running statistics of each cat's tracked days within a date range.
+        
+        Weeks that lie entirely within the range are read from running_stats
+        as one row per cat; only the days before the first and after the last
+        whole week are read from daily_consumption. The cost therefore grows
+        with the length of the range, never with the amount of history.
+        
+        Args:
+            start_date: Start date in YYYY-MM-DD format
+            end_date: End date in YYYY-MM-DD format
+            cat_name: Optional cat name filter
+            
+        Returns:
+            A dictionary keyed by cat name with RunningStats for each cat that
+            has a tracked day in the range
+        """
+        first_bucket = bucket_start(start_date)
+        if first_bucket < start_date:
+            first_bucket = _add_days(first_bucket, BUCKET_DAYS)
+        last_bucket = bucket_start(end_date)
+        if _add_days(last_bucket, BUCKET_DAYS - 1) > end_date:
+            last_bucket = _add_days(last_bucket, -BUCKET_DAYS)
+        
+        cat_filter = f" AND cat_id = {CAT_ID_SQL}" if cat_name else ""
+        cat_params = [cat_name] if cat_name else []
+        
+        if first_bucket <= last_bucket:
+            edges = [(start_date, _add_days(first_bucket, -1)), (_add_days(last_bucket, BUCKET_DAYS), end_date)]
+        else:
+            # No whole week in the range; the bucket query below finds nothing
+            edges = [(start_date, end_date), ("", "")]
+        
+        with self._connection() as conn:
+            bucket_rows = conn.execute(
+                f"SELECT c.name, bucket, {', '.join(RUNNING_STATS_COLUMNS)} "
+                f"FROM running_stats r JOIN cats c ON c.id = r.cat_id WHERE bucket BETWEEN ? AND ?{cat_filter}",
+                [first_bucket, last_bucket] + cat_params
+            ).fetchall()
+            day_rows = conn.execute(
+                "SELECT c.name, date, consumed, complete_count, initial_total, remaining_total "
+                "FROM daily_consumption d JOIN cats c ON c.id = d.cat_id WHERE complete_count > 0 "
+                f"AND (date BETWEEN ? AND ? OR date BETWEEN ? AND ?){cat_filter}",
+                [*edges[0], *edges[1]] + cat_params
+            ).fetchall()
+        
+        # Combine single days and whole weeks per cat in chronological order
+        parts: Dict[str, List[Tuple[str, RunningStats]]] = {}
+        for row in bucket_rows:
+            parts.setdefault(row[0], []).append((row[1], _running_stats_from_row(row[2:])))
+        for row in day_rows:
+            day = RunningStats()
+            day.add_day(*row[1:])
+            parts.setdefault(row[0], []).append((row[1], day))
+        
+        result = {}
+        for cat, cat_parts in parts.items():
+            stats = RunningStats()
+            for _, part in sorted(cat_parts, key=lambda item: item[0]):
+                stats = stats.merge(part)
+            result[cat] = stats
         return result
     
+    def rebuild_running_stats(self) -> int:
+        """
+        Recompute the running_stats table from the daily_consumption rollup.
+        
+        Returns:
+            The number of running_stats rows written
+        """
+        with self.transaction() as cursor:
+            cursor.execute("DELETE FROM running_stats")
+            cursor.execute(
+                f"INSERT INTO running_stats (cat_id, bucket, {', '.join(RUNNING_STATS_COLUMNS)}) "
+                f"{_running_stats_select()}"
+            )
+            return cursor.rowcount
+    
+    def _tracked_day(self, cursor: sqlite3.Cursor, cat_id: int, date: str) -> Optional[Tuple[float, int, float, float]]:
+        """Get (consumed, meals, initial_total, remaining_total) of a tracked day, or None."""
+        row = cursor.execute(
+            "SELECT consumed, complete_count, initial_total, remaining_total FROM daily_consumption "
+            "WHERE cat_id = ? AND date = ? AND complete_count > 0",
+            (cat_id, date)
+        ).fetchone()
+        return tuple(row) if row else None
+    
+    def _update_running_stats(self, cursor: sqlite3.Cursor, cat_id: int, date: str,
+                              before: Optional[Tuple[float, int, float, float]]):
+        """
+        Apply the change of one day's totals to the running statistics of its week.
+        
+        Changing a tracked day or tracking a day after the week's last tracked
+        day is applied incrementally. Anything else shifts the tracked-day
+        indexes within the week, which is then recomputed from its at most
+        seven days.
+        
+        Args:
+            cursor: Cursor of the enclosing write transaction
+            cat_id: ID of the cat whose day changed
+            date: The day in YYYY-MM-DD format
+            before: The day's totals before the change, as returned by _tracked_day
+        """
+        after = self._tracked_day(cursor, cat_id, date)
+        if after == before:
+            return
+        
+        bucket = bucket_start(date)
+        row = cursor.execute(
+            f"SELECT {', '.join(RUNNING_STATS_COLUMNS)} FROM running_stats WHERE cat_id = ? AND bucket = ?",
+            (cat_id, bucket)
+        ).fetchone()
+        stats = _running_stats_from_row(row) if row else RunningStats()
+        
+        if before and after:
+            index = cursor.execute(
+                "SELECT COUNT(*) FROM daily_consumption "
+                "WHERE cat_id = ? AND date >= ? AND date < ? AND complete_count > 0",
+                (cat_id, bucket, date)
+            ).fetchone()[0]
+            stats.replace_day(index, date, before, after)
+        elif after and (stats.last_date is None or date > stats.last_date):
+            stats.add_day(date, *after)
+        else:
+            self._refresh_running_stats(cursor, date, date, cat_id)
+            return
+        
+        cursor.execute(
+            f"INSERT OR REPLACE INTO running_stats (cat_id, bucket, {', '.join(RUNNING_STATS_COLUMNS)}) "
+            f"VALUES ({', '.join('?' * (len(RUNNING_STATS_COLUMNS) + 2))})",
+            [cat_id, bucket] + _running_stats_to_row(stats)
+        )
+    
+    def _refresh_running_stats(self, cursor: sqlite3.Cursor, start_date: str, end_date: str,
+                               cat_id: Optional[int] = None):
+        """
+        Recompute the running statistics of every week overlapping a date range.
+        
+        Args:
+            cursor: Cursor of the enclosing write transaction
+            start_date: Start date in YYYY-MM-DD format
+            end_date: End date in YYYY-MM-DD format
+            cat_id: Optional cat ID filter
+        """
+        first_bucket = bucket_start(start_date)
+        last_bucket = bucket_start(end_date)
+        cat_filter = " AND cat_id = ?" if cat_id is not None else ""
+        cat_params = [cat_id] if cat_id is not None else []
+        
+        cursor.execute(
+            f"DELETE FROM running_stats WHERE bucket BETWEEN ? AND ?{cat_filter}",
+            [first_bucket, last_bucket] + cat_params
+        )
+        cursor.execute(
+            f"INSERT INTO running_stats (cat_id, bucket, {', '.join(RUNNING_STATS_COLUMNS)}) "
+            f"{_running_stats_select(f'AND date BETWEEN ? AND ?{cat_filter}')}",
+            [first_bucket, _add_days(last_bucket, BUCKET_DAYS - 1)] + cat_params
+        )
+    
     def get_todays_open_entries(self, cat_name: str) -> List[Dict[str, Any]]:
         """
         Get entries for today that don't have a remaining weight recorded yet.
@@ -162,15 +1657,21 @@ class CatWeightDatabase:
         """
         today = datetime.date.today().isoformat()
         
-        self.cursor.execute(
-            "SELECT * FROM cat_weights WHERE cat_name = ? AND date = ? AND remaining_weight IS NULL",
-            (cat_name, today)
-        )
+        with self._connection() as conn:
+            rows = conn.execute(
+                f"{ENTRY_SELECT} WHERE w.cat_id = {CAT_ID_SQL} AND w.date = ? AND w.remaining_weight IS NULL",
+                (cat_name, today)
+            ).fetchall()
         
-        return [dict(row) for row in self.cursor.fetchall()]
+        return [dict(row) for row in rows]
     
     def close(self):
-        """Close the database connection."""
+        """
+        Close the database connection.
+        
+        Pooled instances have no connection of their own; the pool stays open
+        and is closed by its owner.
+        """
         if self.conn:
             self.conn.close()
             self.conn = None
@@ -180,26 +1681,299 @@ class CatWeightDatabase:
         """
         Reset the database by deleting all entries.
         
-        This is a destructive operation that removes all data from the cat_weights table.
-        It does not delete the table structure itself.
+        This is a destructive operation that removes all data from the cat_weights table,
+        the yearly archives and the tables derived from them. It does not delete the
+        table structure itself, nor the cats.
+        
+        The archives are emptied rather than removed, since other connections
+        may still have them attached. They are emptied last, while the write
+        lock is held, just before the rest of the reset commits.
         """
-        self.cursor.execute("DELETE FROM cat_weights")
-        self.conn.commit()
+        with self._connection() as conn:
+            self._detach_archives(conn)
+            with self.transaction() as cursor:
+                cursor.execute("DELETE FROM cat_weights")
+                cursor.execute("DELETE FROM daily_consumption")
+                cursor.execute("DELETE FROM running_stats")
+                cursor.execute("DELETE FROM scale_readings")
+                cursor.execute("DELETE FROM scale_detector_state")
+                self._mark_matrix_days(*MATRIX_ALL_DAYS)
+                for year in self.archive_years():
+                    self._clear_archive(year)
         print("Database has been reset - all cat weight entries have been deleted.")
         
     def delete_entries_by_date(self, date: str) -> int:
         """
         Delete all entries for a specific date.
         
+        The running statistics of the date's week are recomputed.
+        
         Args:
             date: The date in YYYY-MM-DD format for which to delete entries
             
         Returns:
             The number of entries deleted
+        
+        Raises:
+            ValueError: If entries of the date were archived; nothing is deleted then
         """
-        self.cursor.execute(
-            "DELETE FROM cat_weights WHERE date = ?",
-            (date,)
-        )
-        self.conn.commit()
-        return self.cursor.rowcount 
\ No newline at end of file
+        with self.transaction() as cursor:
+            self._check_not_archived(cursor.connection, "w.date = ?", [date], date, date)
+            cursor.execute(
+                "DELETE FROM cat_weights WHERE date = ?",
+                (date,)
+            )
+            deleted = cursor.rowcount
+            self._merge_archived_rollup(cursor, date, date)
+            self._refresh_running_stats(cursor, date, date)
+            self._mark_matrix_days(date, date)
+            return deleted
+    
+    def archive_entries(self, older_than_days: int = ARCHIVE_AFTER_DAYS, today: Optional[datetime.date] = None) -> int:
+        """
+        Move old completed entries out of cat_weights into yearly archives.
+        
+        Entries are copied into the archive of their year, <archive_dir>/<year>.db,
+        and then deleted from cat_weights, which keeps the database written by
+        the daily input small. Beyond MAX_ATTACHED_ARCHIVES archives, the
+        oldest two are merged into the file of the older one, which then holds
+        several years; years it covers are added to it from then on. Reads attach the archives their date range
+        overlaps. Archived entries cannot be updated or deleted any more, so
+        open entries, still waiting for their remaining weight, stay in
+        cat_weights. The daily_consumption rows of the moved days are
+        recomputed from both, and the running statistics are left as they are.
+        
+        The write lock is held throughout. Every archive is written before any
+        is read back, since the open transaction locks the archives it reads.
+        If the deletion does not commit after an archive did, the archive
+        holds copies of rows still in cat_weights; reads drop the duplicates
+        and the next run replaces them.
+        
+        Args:
+            older_than_days: Entries dated at least this many days before today are moved
+            today: The date to count from (defaults to the current date)
+            
+        Returns:
+            The number of entries moved
+        """
+        cutoff = ((today or datetime.date.today()) - datetime.timedelta(days=older_than_days)).isoformat()
+        moved = 0
+        
+        completed = "date >= ? AND date < ? AND remaining_weight IS NOT NULL"
+        
+        with self._connection() as conn:
+            self._detach_archives(conn)
+            with self.transaction() as cursor:
+                years = [row[0] for row in cursor.execute(
+                    "SELECT DISTINCT substr(date, 1, 4) FROM cat_weights "
+                    "WHERE date < ? AND remaining_weight IS NOT NULL ORDER BY 1", (cutoff,)
+                ).fetchall()]
+                bounds = {year: (f"{year}-01-01", min(cutoff, f"{int(year) + 1}-01-01")) for year in years}
+                
+                for year in years:
+                    rows = cursor.execute(
+                        f"SELECT {ENTRY_TABLE_COLUMNS} FROM cat_weights WHERE {completed}", bounds[year]
+                    ).fetchall()
+                    self._write_archive(self._archive_for_year(year), rows)
+                    moved += len(rows)
+                
+                archives = list(self.archive_years())
+                while len(archives) > MAX_ATTACHED_ARCHIVES:
+                    self._merge_archives(archives[0], archives[1])
+                    archives = list(self.archive_years())
+                
+                for year in years:
+                    cursor.execute(f"DELETE FROM cat_weights WHERE {completed}", bounds[year])
+                    self._merge_archived_rollup(cursor, bounds[year][0], _add_days(bounds[year][1], -1))
+                    self._mark_matrix_days(*bounds[year])
+        return moved
+    
+    def _write_archive(self, year: str, rows: List[sqlite3.Row]):
+        """Add cat_weights rows to a year's archive in one transaction."""
+        os.makedirs(self.archive_dir, exist_ok=True)
+        conn = sqlite3.connect(self._archive_path(year), timeout=self.profile.busy_timeout / 1000, isolation_level=None)
+        try:
+            for statement in ARCHIVE_SCHEMA:
+                conn.execute(statement)
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                f"INSERT OR REPLACE INTO cat_weights ({ENTRY_TABLE_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?)",
+                [tuple(row) for row in rows]
+            )
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+            # List the archives again, with this one's new bounds
+            self._archive_listing = (None, {})
+    
+    def _archive_for_year(self, year: str) -> str:
+        """Get the archive a year's entries go to: one merged archive already covering the year, or the year's own."""
+        for archive, (first, last) in self.archive_years().items():
+            if archive <= year <= last[:4]:
+                return archive
+        return year
+    
+    def _merge_archives(self, target: str, source: str):
+        """
+        Move every entry of one archive into another.
+        
+        The source archive is emptied rather than removed, as in reset_database.
+        If the emptying does not commit, both archives hold the entries; reads
+        drop the duplicates and the next merge replaces them.
+        """
+        conn = sqlite3.connect(self._archive_path(target), timeout=self.profile.busy_timeout / 1000, isolation_level=None)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("ATTACH DATABASE ? AS source", (self._archive_uri(source),))
+            conn.execute(
+                f"INSERT OR REPLACE INTO cat_weights ({ENTRY_TABLE_COLUMNS}) "
+                f"SELECT {ENTRY_TABLE_COLUMNS} FROM source.cat_weights"
+            )
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        self._clear_archive(source)
+    
+    def _clear_archive(self, year: str):
+        """Delete every entry from a year's archive in one transaction."""
+        conn = sqlite3.connect(self._archive_path(year), timeout=self.profile.busy_timeout / 1000, isolation_level=None)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM cat_weights")
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+            self._archive_listing = (None, {})
+    
+    def add_scale_readings(self, cat_name: str, timestamps: Iterable[int], weights_cg: Iterable[int]) -> int:
+        """
+        Store raw samples of a cat's bowl scale.
+        
+        Samples at a timestamp that is already stored are ignored.
+        
+        Args:
+            cat_name: Name of the cat the bowl belongs to
+            timestamps: Sample times in Unix seconds
+            weights_cg: Sample weights in centigrams, in timestamp order
+            
+        Returns:
+            The number of samples stored
+        """
+        with self.transaction() as cursor:
+            cat_id = self._cat_id(cursor, cat_name)
+            cursor.executemany(
+                "INSERT OR IGNORE INTO scale_readings (cat_id, ts, weight_cg) VALUES (?, ?, ?)",
+                ((cat_id, int(ts), int(weight)) for ts, weight in zip(timestamps, weights_cg))
+            )
+            return cursor.rowcount
+    
+    def get_scale_readings(self, cat_name: str, start_ts: int, end_ts: int) -> Tuple[Any, Any]:
+        """
+        Get the samples of a cat's bowl scale in a time range.
+        
+        Args:
+            cat_name: Name of the cat the bowl belongs to
+            start_ts: First sample time in Unix seconds
+            end_ts: Last sample time in Unix seconds
+            
+        Returns:
+            NumPy int64 arrays of the timestamps and the weights in centigrams,
+            in timestamp order
+        """
+        import numpy as np
+        
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            rows = cursor.execute(
+                f"SELECT ts, weight_cg FROM scale_readings WHERE cat_id = {CAT_ID_SQL} AND ts BETWEEN ? AND ? ORDER BY ts",
+                (cat_name, start_ts, end_ts)
+            ).fetchall()
+        
+        readings = np.array(rows, dtype=np.int64).reshape(-1, 2)
+        return readings[:, 0], readings[:, 1]
+    
+    def count_scale_readings(self) -> int:
+        """Get the number of stored scale samples of all bowls."""
+        with self._connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM scale_readings").fetchone()[0]
+    
+    def downsample_scale_readings(self, before_ts: int, bucket_seconds: int) -> int:
+        """
+        Replace the scale samples before a time with one average sample per bucket.
+        
+        Buckets are aligned to multiples of bucket_seconds and keep the time of
+        their start. Buckets that already hold a single sample at their start
+        are left alone, so downsampling again is cheap.
+        
+        Args:
+            before_ts: Samples before this Unix time are downsampled; it is
+                rounded down to a bucket boundary
+            bucket_seconds: Length of a bucket in seconds
+            
+        Returns:
+            The number of samples removed
+        """
+        cutoff = before_ts // bucket_seconds * bucket_seconds
+        with self.transaction() as cursor:
+            buckets = cursor.execute(
+                "SELECT cat_id, ts / :b * :b AS bucket, CAST(ROUND(AVG(weight_cg)) AS INTEGER), COUNT(*) "
+                "FROM scale_readings WHERE ts < :cutoff GROUP BY cat_id, bucket "
+                "HAVING COUNT(*) > 1 OR MIN(ts) <> bucket",
+                {"b": bucket_seconds, "cutoff": cutoff}
+            ).fetchall()
+            cursor.executemany(
+                "DELETE FROM scale_readings WHERE cat_id = ? AND ts >= ? AND ts < ?",
+                ((cat_id, bucket, bucket + bucket_seconds) for cat_id, bucket, _, _ in buckets)
+            )
+            cursor.executemany(
+                "INSERT INTO scale_readings (cat_id, ts, weight_cg) VALUES (?, ?, ?)",
+                ((cat_id, bucket, weight) for cat_id, bucket, weight, _ in buckets)
+            )
+            return sum(count - 1 for _, _, _, count in buckets)
+    
+    def delete_scale_readings(self, before_ts: int) -> int:
+        """
+        Delete the scale samples before a time.
+        
+        Args:
+            before_ts: Unix time of the first sample to keep
+            
+        Returns:
+            The number of samples deleted
+        """
+        with self.transaction() as cursor:
+            cursor.execute("DELETE FROM scale_readings WHERE ts < ?", (before_ts,))
+            return cursor.rowcount
+    
+    def get_scale_state(self, cat_name: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the saved feeding detector state of a cat's bowl.
+        
+        Args:
+            cat_name: Name of the cat the bowl belongs to
+            
+        Returns:
+            A dictionary with the SCALE_STATE_COLUMNS, or None if none was saved
+        """
+        with self._connection() as conn:
+            row = conn.execute(
+                f"SELECT {', '.join(SCALE_STATE_COLUMNS)} FROM scale_detector_state WHERE cat_id = {CAT_ID_SQL}",
+                (cat_name,)
+            ).fetchone()
+        return dict(zip(SCALE_STATE_COLUMNS, row)) if row else None
+    
+    def save_scale_state(self, cat_name: str, state: Mapping[str, Any]):
+        """
+        Save the feeding detector state of a cat's bowl.
+        
+        Args:
+            cat_name: Name of the cat the bowl belongs to
+            state: Values of the SCALE_STATE_COLUMNS
+        """
+        with self.transaction() as cursor:
+            cursor.execute(
+                f"INSERT OR REPLACE INTO scale_detector_state (cat_id, {', '.join(SCALE_STATE_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * (len(SCALE_STATE_COLUMNS) + 1))})",
+                [self._cat_id(cursor, cat_name)] + [state[column] for column in SCALE_STATE_COLUMNS]
+            )
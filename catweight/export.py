@@ -0,0 +1,254 @@
+"""
+Columnar export of the history to Parquet or Arrow IPC files.
+
+Entries and daily totals are appended to datasets partitioned by month and
+cat, laid out as <out_dir>/<table>/month=YYYY-MM/cat_name=<name>/part-*.
+Each export continues from a high-water mark kept in the dataset's
+_export_state.json: the last exported entry id, or the last exported day.
+Reports and long-horizon analytics read the datasets with read_history
+instead of querying the live database.
+
+Requires pyarrow, installed with the "export" extra.
+"""
+import datetime
+import json
+import os
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from columnar import ENTRY_COLUMNS
+
+# Formats a dataset can be written in, with their file extensions
+FILE_FORMATS = {"parquet": "parquet", "arrow": "arrow"}
+
+# Days before today that are still being recorded and are not exported yet
+SETTLE_DAYS = 2
+
+# Entries read from the database per page
+EXPORT_BATCH_SIZE = 50_000
+
+STATE_FILE = "_export_state.json"
+
+ENTRIES, DAILY = "entries", "daily"
+
+DAILY_COLUMNS = (
+    "cat_name", "date", "consumed", "entry_count", "open_count", "complete_count",
+    "initial_total", "remaining_total", "min_consumed", "max_consumed",
+)
+
+
+def _pyarrow():
+    """Import pyarrow and its dataset module, which the export needs."""
+    try:
+        import pyarrow
+        import pyarrow.dataset
+    except ImportError as e:
+        raise ImportError("Exporting the history needs pyarrow: pip install 'catweight[export]'") from e
+    return pyarrow, pyarrow.dataset
+
+
+def _partitioning():
+    """Hive-style partitioning of the datasets by month and cat."""
+    pa, ds = _pyarrow()
+    return ds.partitioning(pa.schema([("month", pa.string()), ("cat_name", pa.string())]), flavor="hive")
+
+
+def read_state(path: str) -> Dict[str, Any]:
+    """
+    Read the export state of a dataset.
+
+    Args:
+        path: Directory of the dataset
+
+    Returns:
+        A dictionary with the keys format and high_water_mark, empty if
+        nothing was exported to the directory yet
+    """
+    try:
+        with open(os.path.join(path, STATE_FILE)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def _write_state(path: str, state: Dict[str, Any]):
+    """Replace the export state of a dataset atomically."""
+    os.makedirs(path, exist_ok=True)
+    temp_path = os.path.join(path, STATE_FILE + ".tmp")
+    with open(temp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(temp_path, os.path.join(path, STATE_FILE))
+
+
+def _check_format(path: str, file_format: str) -> Dict[str, Any]:
+    """Get a dataset's state, checking that it is written in file_format."""
+    if file_format not in FILE_FORMATS:
+        raise ValueError(f"Unknown file format: {file_format} (expected one of {', '.join(FILE_FORMATS)})")
+    state = read_state(path)
+    if state and state["format"] != file_format:
+        raise ValueError(f"{path} holds {state['format']} files, not {file_format}")
+    return state
+
+
+def _write_partitions(path: str, table, file_format: str, part: str):
+    """
+    Write a table into the dataset's month and cat partitions.
+
+    Files are named after the high-water mark the export started from, so
+    repeating an export whose state was not saved overwrites its files
+    instead of adding duplicates.
+    """
+    _, ds = _pyarrow()
+    ds.write_dataset(
+        table, path,
+        format="ipc" if file_format == "arrow" else file_format,
+        partitioning=_partitioning(),
+        basename_template=f"part-{part}-{{i}}.{FILE_FORMATS[file_format]}",
+        existing_data_behavior="overwrite_or_ignore",
+    )
+
+
+def export_entries(db, out_dir: str, file_format: str = "parquet", settle_days: int = SETTLE_DAYS,
+                   today: Optional[datetime.date] = None, batch_size: int = EXPORT_BATCH_SIZE) -> int:
+    """
+    Append the entries added since the last export to the entries dataset.
+
+    Entries are exported in id order, archived ones included, and the
+    high-water mark moves to the last exported id. An entry dated within
+    settle_days of today may still get its remaining weight, so the export
+    stops before the first such entry and continues from it next time.
+
+    Args:
+        db: The CatWeightDatabase to export from
+        out_dir: Directory holding the datasets
+        file_format: "parquet" or "arrow" (Arrow IPC); must match earlier exports
+        settle_days: Days before today whose entries are not exported yet
+        today: The date to count from (defaults to the current date)
+        batch_size: Entries read from the database per page
+
+    Returns:
+        The number of entries exported
+    """
+    pa, _ = _pyarrow()
+    path = os.path.join(out_dir, ENTRIES)
+    state = _check_format(path, file_format)
+    high_water_mark = state.get("high_water_mark", 0)
+    cutoff = np.datetime64((today or datetime.date.today()) - datetime.timedelta(days=settle_days), "D")
+    exported = 0
+
+    while True:
+        arrays = db.get_entries_after_id(high_water_mark, limit=batch_size, result_format="arrays")
+        unsettled = np.flatnonzero(arrays["date"] >= cutoff)
+        count = int(unsettled[0]) if len(unsettled) else len(arrays["id"])
+        if count:
+            columns = {name: values[:count] for name, values in arrays.items()}
+            columns["month"] = np.datetime_as_string(columns["date"], unit="M")
+            _write_partitions(path, pa.table(columns), file_format, str(high_water_mark + 1))
+            high_water_mark = int(columns["id"][-1])
+            _write_state(path, {"format": file_format, "high_water_mark": high_water_mark})
+            exported += count
+        if count < batch_size:
+            return exported
+
+
+def export_daily(db, out_dir: str, file_format: str = "parquet", settle_days: int = SETTLE_DAYS,
+                 today: Optional[datetime.date] = None) -> int:
+    """
+    Append the daily totals of the days since the last export to the daily dataset.
+
+    Days are exported once they are settle_days before today; the
+    high-water mark is the last exported day.
+
+    Args:
+        db: The CatWeightDatabase to export from
+        out_dir: Directory holding the datasets
+        file_format: "parquet" or "arrow" (Arrow IPC); must match earlier exports
+        settle_days: Days before today that are not exported yet
+        today: The date to count from (defaults to the current date)
+
+    Returns:
+        The number of daily rows exported
+    """
+    pa, _ = _pyarrow()
+    path = os.path.join(out_dir, DAILY)
+    state = _check_format(path, file_format)
+    last_day = state.get("high_water_mark")
+    start_date = (datetime.date.fromisoformat(last_day) + datetime.timedelta(days=1)).isoformat() if last_day else ""
+    end_date = ((today or datetime.date.today()) - datetime.timedelta(days=settle_days + 1)).isoformat()
+    if start_date > end_date:
+        return 0
+
+    rows = [
+        {"cat_name": cat_name, "date": date, **day}
+        for cat_name, days in db.get_daily_consumption(start_date, end_date).items()
+        for date, day in days.items()
+    ]
+    if rows:
+        columns = {name: [row[name] for row in rows] for name in DAILY_COLUMNS}
+        columns["date"] = np.array(columns["date"], dtype="datetime64[D]")
+        columns["month"] = np.datetime_as_string(columns["date"], unit="M")
+        _write_partitions(path, pa.table(columns), file_format, start_date or "0000-01-01")
+    _write_state(path, {"format": file_format, "high_water_mark": end_date})
+    return len(rows)
+
+
+def read_history(out_dir: str, table: str = ENTRIES, start_date: Optional[str] = None, end_date: Optional[str] = None,
+                 cat_names: Optional[Sequence[str]] = None, columns: Optional[List[str]] = None):
+    """
+    Load exported entries or daily totals into a pandas DataFrame.
+
+    Only the month and cat partitions matching the filters are opened, and
+    only the requested columns are read. Files are memory-mapped, so Arrow
+    IPC files are used in place without copying.
+
+    Args:
+        out_dir: Directory holding the datasets
+        table: "entries" or "daily"
+        start_date: Optional first date in YYYY-MM-DD format
+        end_date: Optional last date in YYYY-MM-DD format
+        cat_names: Optional cats to load
+        columns: Optional columns to load (defaults to all)
+
+    Returns:
+        A DataFrame with datetime64 dates and a categorical cat_name, ordered
+        by date, or an empty DataFrame if nothing was exported
+    """
+    import pandas as pd
+    import pyarrow.fs
+    _, ds = _pyarrow()
+
+    path = os.path.join(out_dir, table)
+    state = read_state(path)
+    if not state:
+        return pd.DataFrame(columns=columns)
+
+    dataset = ds.dataset(
+        path,
+        format="ipc" if state["format"] == "arrow" else state["format"],
+        partitioning=_partitioning(),
+        filesystem=pyarrow.fs.LocalFileSystem(use_mmap=True),
+        exclude_invalid_files=False,
+        ignore_prefixes=[".", "_"],
+    )
+
+    conditions = []
+    if start_date:
+        conditions += [ds.field("month") >= start_date[:7], ds.field("date") >= datetime.date.fromisoformat(start_date)]
+    if end_date:
+        conditions += [ds.field("month") <= end_date[:7], ds.field("date") <= datetime.date.fromisoformat(end_date)]
+    if cat_names is not None:
+        conditions.append(ds.field("cat_name").isin(list(cat_names)))
+    expression = None
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+
+    frame = dataset.to_table(columns=columns, filter=expression).to_pandas(date_as_object=False)
+    if columns is None:
+        # Partition columns come last; restore the database's column order
+        frame = frame[list(ENTRY_COLUMNS if table == ENTRIES else DAILY_COLUMNS)]
+    if "cat_name" in frame:
+        frame["cat_name"] = frame["cat_name"].astype("category")
+    if "date" in frame:
+        frame = frame.sort_values(["date", "id"] if "id" in frame else "date", ignore_index=True)
+    return frame
@@ -0,0 +1,175 @@
+"""
+Maintenance commands for the cat weight database.
+
+Usage:
+    python -m catweight.maintenance [--db PATH] rollup check
+    python -m catweight.maintenance [--db PATH] rollup rebuild
+    python -m catweight.maintenance [--db PATH] stats rebuild
+    python -m catweight.maintenance [--db PATH] readings prune
+    python -m catweight.maintenance [--db PATH] archive [--older-than-days DAYS]
+    python -m catweight.maintenance [--db PATH] export {entries,daily} --out DIR [--format {parquet,arrow}]
+    python -m catweight.maintenance [--db PATH] matrix check
+    python -m catweight.maintenance [--db PATH] matrix rebuild
+
+With --shards DIR the command runs on every household database in DIR
+instead, several at a time, and each household's output is printed under its
+id.
+
+Commands run on a database with a consumption matrix keep the matrix current.
+"""
+import argparse
+import io
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from db import ARCHIVE_AFTER_DAYS, CatWeightDatabase, DEFAULT_DB_PATH
+from matrix import ConsumptionMatrix, default_matrix_path, existing_matrix
+from router import ShardRouter
+from scale import apply_retention
+
+
+def rollup_check(db, args):
+    """Report daily_consumption buckets that disagree with the raw entries."""
+    mismatches = db.check_daily_consumption()
+    for mismatch in mismatches:
+        print(f"{mismatch['cat_name']} {mismatch['date']}: expected {mismatch['expected']}, found {mismatch['actual']}", file=args.out)
+    print(f"{len(mismatches)} inconsistent daily_consumption rows", file=args.out)
+    return 1 if mismatches else 0
+
+
+def rollup_rebuild(db, args):
+    """Recompute the daily_consumption rollup from the raw entries."""
+    rows = db.rebuild_daily_consumption()
+    print(f"Rebuilt daily_consumption with {rows} rows", file=args.out)
+    return 0
+
+
+def stats_rebuild(db, args):
+    """Recompute the running statistics from the daily_consumption rollup."""
+    rows = db.rebuild_running_stats()
+    print(f"Rebuilt running_stats with {rows} rows", file=args.out)
+    return 0
+
+
+def readings_prune(db, args):
+    """Downsample and delete old bowl scale samples according to the retention policy."""
+    before = db.count_scale_readings()
+    removed = apply_retention(db)
+    print(f"Removed {removed} of {before} scale samples", file=args.out)
+    return 0
+
+
+def archive(db, args):
+    """Move entries older than the given age into the yearly archives."""
+    moved = db.archive_entries(args.older_than_days)
+    print(f"Archived {moved} entries; archives: {', '.join(db.archive_years()) or 'none'}", file=args.out)
+    return 0
+
+
+def export(db, args):
+    """Append the entries or daily totals added since the last export to a columnar dataset."""
+    from export import export_daily, export_entries
+
+    exporter = export_entries if args.table == "entries" else export_daily
+    rows = exporter(db, args.out_dir, file_format=args.format)
+    print(f"Exported {rows} {args.table} rows to {args.out_dir}", file=args.out)
+    return 0
+
+
+def matrix_check(db, args):
+    """Report consumption matrix cells that disagree with the daily_consumption rollup."""
+    mismatches = db.check_consumption_matrix()
+    for mismatch in mismatches:
+        print(f"{mismatch['cat_name']} {mismatch['date']}", file=args.out)
+    print(f"{len(mismatches)} inconsistent consumption matrix cells", file=args.out)
+    return 1 if mismatches else 0
+
+
+def matrix_rebuild(db, args):
+    """Rewrite the consumption matrix from the daily_consumption rollup."""
+    cells = db.rebuild_consumption_matrix()
+    print(f"Rebuilt {db.matrix.path} with {cells} cells", file=args.out)
+    return 0
+
+
+def build_parser():
+    """Build the command line parser."""
+    parser = argparse.ArgumentParser(description="Cat weight database maintenance")
+    parser.add_argument("--db", default=os.environ.get("CATWEIGHT_DB_PATH", DEFAULT_DB_PATH),
+                        help="path to the SQLite database")
+    parser.add_argument("--shards", default=os.environ.get("CATWEIGHT_SHARDS_DIR"),
+                        help="directory of per-household databases to run the command on instead of --db")
+    parser.set_defaults(out=None)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    rollup = commands.add_parser("rollup", help="daily consumption rollup")
+    rollup_commands = rollup.add_subparsers(dest="action", required=True)
+    rollup_commands.add_parser("check", help="compare the rollup with the raw entries").set_defaults(func=rollup_check)
+    rollup_commands.add_parser("rebuild", help="recompute the rollup").set_defaults(func=rollup_rebuild)
+
+    stats = commands.add_parser("stats", help="running statistics per cat and week")
+    stats_commands = stats.add_subparsers(dest="action", required=True)
+    stats_commands.add_parser("rebuild", help="recompute the running statistics").set_defaults(func=stats_rebuild)
+
+    readings = commands.add_parser("readings", help="raw bowl scale samples")
+    readings_commands = readings.add_subparsers(dest="action", required=True)
+    readings_commands.add_parser("prune", help="apply the retention policy").set_defaults(func=readings_prune)
+
+    archive_command = commands.add_parser("archive", help="move old entries into yearly archive files")
+    archive_command.add_argument("--older-than-days", type=int, default=ARCHIVE_AFTER_DAYS,
+                                 help=f"age in days of the entries to move (default {ARCHIVE_AFTER_DAYS})")
+    archive_command.set_defaults(func=archive)
+
+    export_command = commands.add_parser("export", help="append the history to Parquet or Arrow IPC files")
+    export_command.add_argument("table", choices=["entries", "daily"], help="entries or daily totals")
+    export_command.add_argument("--out", dest="out_dir", required=True, help="directory holding the datasets")
+    export_command.add_argument("--format", choices=["parquet", "arrow"], default="parquet", help="file format")
+    export_command.set_defaults(func=export)
+
+    matrix = commands.add_parser("matrix", help="memory-mapped consumption matrix")
+    matrix_commands = matrix.add_subparsers(dest="action", required=True)
+    matrix_commands.add_parser("check", help="compare the matrix with the rollup").set_defaults(func=matrix_check)
+    matrix_commands.add_parser("rebuild", help="rewrite the matrix").set_defaults(func=matrix_rebuild)
+
+    return parser
+
+
+def run_on_shards(args):
+    """Run the command on every household database, printing each household's output in turn."""
+    def run(db):
+        out = io.StringIO()
+        status = args.func(db, argparse.Namespace(**{**vars(args), "out": out}))
+        return status, out.getvalue()
+
+    router = ShardRouter(args.shards)
+    try:
+        results = router.map(run)
+    finally:
+        router.close()
+    for household_id, (status, output) in results.items():
+        print(f"[{household_id}]")
+        print(output, end="")
+    return max((status for status, _ in results.values()), default=0)
+
+
+def main(argv=None):
+    """Main entry point."""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.shards and args.command == "export":
+        parser.error("export writes one dataset per database and cannot run with --shards")
+    if args.shards and args.command == "matrix":
+        parser.error("household databases have no consumption matrix")
+    if args.shards:
+        return run_on_shards(args)
+    matrix = ConsumptionMatrix(default_matrix_path(args.db)) if args.command == "matrix" else existing_matrix(args.db)
+    db = CatWeightDatabase(args.db, matrix=matrix)
+    try:
+        return args.func(db, args)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,273 @@
+"""
+Memory-mapped matrix of every cat's daily consumption.
+
+The matrix is a .npy file next to the database with one row per cat, indexed
+by cat id, and one column per day since 1970-01-01. Each cell holds a cat's
+totals for one day as stored in daily_consumption. CatWeightDatabase keeps
+the cells of the days it writes current, so charts and statistics can slice
+any date range as a NumPy view instead of querying SQLite. Every process maps
+the same file and so shares its pages through the OS page cache.
+"""
+import datetime
+import os
+import threading
+from typing import Any, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+# One cat's day: consumption and initial weight of the completed entries, and
+# the number of completed and open entries. A nonzero complete_count marks a
+# tracked day; a nonzero open_count marks entries still waiting for their
+# remaining weight.
+CELL_DTYPE = np.dtype([
+    ("consumed", "<f4"),
+    ("initial_total", "<f4"),
+    ("complete_count", "<u2"),
+    ("open_count", "<u2"),
+])
+
+# Columns of the daily_consumption rows the cells are written from
+MATRIX_ROLLUP_COLUMNS = "cat_id, date, consumed, initial_total, complete_count, open_count"
+
+# Last day the matrix can hold; rollup rows after it, or before 1970, are left out
+LAST_DAY = "2099-12-31"
+
+# Cats and days allocated beyond the ones written, so the file seldom grows
+SPARE_CATS = 8
+SPARE_DAYS = 366
+
+MATRIX_SUFFIX = "_matrix.npy"
+
+
+def default_matrix_path(db_path: str) -> str:
+    """Get the path of a database's matrix file, <database name>_matrix.npy next to it."""
+    return os.path.splitext(db_path)[0] + MATRIX_SUFFIX
+
+
+def existing_matrix(db_path: str) -> Optional["ConsumptionMatrix"]:
+    """
+    Get a database's matrix if its file exists, None otherwise.
+
+    Every process writing a database whose matrix exists must keep it
+    current, or the matrix drifts from daily_consumption; processes that
+    do not read it pass this to CatWeightDatabase rather than creating one.
+    """
+    path = default_matrix_path(db_path)
+    return ConsumptionMatrix(path) if os.path.exists(path) else None
+
+
+def day_index(date: str) -> int:
+    """Get the column of a YYYY-MM-DD date."""
+    return int(np.datetime64(date, "D").astype(np.int64))
+
+
+LAST_DAY_INDEX = day_index(LAST_DAY)
+
+
+def _cells(rows: Iterable[Sequence[Any]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Turn daily_consumption rows into cat ids, day indices and cells, dropping days out of range."""
+    rows = list(rows)
+    cat_ids = np.array([row[0] for row in rows], dtype=np.int64)
+    days = np.array([row[1] for row in rows], dtype="datetime64[D]").astype(np.int64)
+    cells = np.zeros(len(rows), dtype=CELL_DTYPE)
+    for position, name in enumerate(CELL_DTYPE.names, start=2):
+        cells[name] = [row[position] for row in rows]
+    keep = (days >= 0) & (days <= LAST_DAY_INDEX)
+    return cat_ids[keep], days[keep], cells[keep]
+
+
+class ConsumptionMatrix:
+    """
+    A cats × days array of daily totals, memory-mapped from a .npy file.
+
+    Reads map the file on first use and map it again whenever it was replaced,
+    which happens when a write needs more cats or days than the file holds.
+    Writes are not synchronized by the matrix: CatWeightDatabase makes them
+    while holding the database's write lock, which serializes them across
+    threads and processes.
+    """
+
+    def __init__(self, path: str):
+        """
+        Initialize the matrix without mapping the file.
+
+        Args:
+            path: Path of the .npy file; see default_matrix_path
+        """
+        self.path = path
+        self._array: Optional[np.ndarray] = None
+        # Inode and size of the file the array was mapped from
+        self._file_id: Optional[Tuple[int, int]] = None
+        self._lock = threading.Lock()
+
+    def _mapped(self) -> Optional[np.ndarray]:
+        """Get the mapped array, mapping the file again if it was replaced; None if there is no file."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        file_id = (stat.st_ino, stat.st_size)
+        with self._lock:
+            if file_id != self._file_id:
+                self._array = np.lib.format.open_memmap(self.path, mode="r+")
+                self._file_id = file_id
+            return self._array
+
+    def is_built(self) -> bool:
+        """Whether the file exists and holds a matrix of the current cell layout."""
+        try:
+            array = self._mapped()
+        except ValueError:
+            return False
+        return array is not None and array.dtype == CELL_DTYPE and array.ndim == 2
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        """Rows (cat ids) and columns (days since 1970-01-01) the file holds."""
+        array = self._mapped()
+        return (0, 0) if array is None else array.shape
+
+    def window(self, start_date: str, end_date: str) -> np.ndarray:
+        """
+        Get the cells of every cat for a date range.
+
+        Args:
+            start_date: Start date in YYYY-MM-DD format
+            end_date: End date in YYYY-MM-DD format
+
+        Returns:
+            A CELL_DTYPE array with one row per cat id and one column per day
+            of the range. It is a view of the mapped file when the range lies
+            within the file, and a copy padded with empty cells otherwise.
+        """
+        array = self._mapped()
+        start, stop = day_index(start_date), day_index(end_date) + 1
+        if array is None:
+            return np.zeros((0, max(stop - start, 0)), dtype=CELL_DTYPE)
+        if 0 <= start and stop <= array.shape[1]:
+            return array[:, start:stop]
+
+        cells = np.zeros((array.shape[0], max(stop - start, 0)), dtype=CELL_DTYPE)
+        first, last = max(start, 0), min(stop, array.shape[1])
+        if first < last:
+            cells[:, first - start:last - start] = array[:, first:last]
+        return cells
+
+    def cat(self, cat_id: int, start_date: str, end_date: str) -> np.ndarray:
+        """
+        Get one cat's cells for a date range.
+
+        Args:
+            cat_id: The cat's id in the cats table
+            start_date: Start date in YYYY-MM-DD format
+            end_date: End date in YYYY-MM-DD format
+
+        Returns:
+            A CELL_DTYPE array with one cell per day, a view of the mapped
+            file where window() returns one
+        """
+        cells = self.window(start_date, end_date)
+        if 0 <= cat_id < len(cells):
+            return cells[cat_id]
+        return np.zeros(cells.shape[1], dtype=CELL_DTYPE)
+
+    def update(self, start_date: str, end_date: str, rows: Iterable[Sequence[Any]],
+               today: Optional[datetime.date] = None):
+        """
+        Replace the cells of a date range with rollup rows, in place.
+
+        Cells of the range without a row are cleared. The file is replaced by
+        a larger one first if the rows need more cats or days than it holds.
+        The matrix must have been built with rebuild().
+
+        Args:
+            start_date: Start date in YYYY-MM-DD format
+            end_date: End date in YYYY-MM-DD format
+            rows: All daily_consumption rows of the range, with the
+                MATRIX_ROLLUP_COLUMNS columns
+            today: The date the file should reach when it grows (defaults to
+                the current date)
+
+        Raises:
+            FileNotFoundError: If the matrix was not built yet
+        """
+        cat_ids, days, cells = _cells(rows)
+        start = max(day_index(start_date), 0)
+        stop = min(day_index(end_date), LAST_DAY_INDEX) + 1
+
+        array = self._mapped()
+        if array is None:
+            raise FileNotFoundError(f"No consumption matrix at {self.path}; build it with rebuild()")
+        rows_needed = int(cat_ids.max(initial=-1)) + 1
+        days_needed = int(days.max(initial=-1)) + 1
+        if rows_needed > array.shape[0] or days_needed > array.shape[1]:
+            array = self._write_file(self._grown_shape(array.shape, rows_needed, days_needed, today), array)
+
+        array[:, start:stop] = np.zeros((), dtype=CELL_DTYPE)
+        array[cat_ids, days] = cells
+
+    def rebuild(self, rows: Iterable[Sequence[Any]], today: Optional[datetime.date] = None) -> int:
+        """
+        Replace the file with a matrix written from rollup rows.
+
+        Args:
+            rows: All daily_consumption rows, with the MATRIX_ROLLUP_COLUMNS columns
+            today: The date the file should reach (defaults to the current date)
+
+        Returns:
+            The number of cells written
+        """
+        cat_ids, days, cells = _cells(rows)
+        shape = self._grown_shape((0, 0), int(cat_ids.max(initial=0)) + 1, int(days.max(initial=0)) + 1, today)
+        array = self._write_file(shape)
+        array[cat_ids, days] = cells
+        array.flush()
+        return len(cells)
+
+    def mismatches(self, rows: Iterable[Sequence[Any]]) -> List[Tuple[int, str]]:
+        """
+        Compare the matrix with rollup rows.
+
+        Args:
+            rows: All daily_consumption rows, with the MATRIX_ROLLUP_COLUMNS columns
+
+        Returns:
+            The (cat_id, date) of every cell that differs from its row, or
+            holds totals for a day without one, sorted
+        """
+        cat_ids, days, cells = _cells(rows)
+        array = self._mapped()
+        shape = (0, 0) if array is None else array.shape
+        inside = (cat_ids < shape[0]) & (days < shape[1])
+        mismatched = set(zip(cat_ids[~inside].tolist(), days[~inside].tolist()))
+
+        if array is not None:
+            expected = np.zeros(shape, dtype=CELL_DTYPE)
+            expected[cat_ids[inside], days[inside]] = cells[inside]
+            differ = np.nonzero(expected != array)
+            mismatched.update(zip(differ[0].tolist(), differ[1].tolist()))
+
+        return [(cat_id, str(np.datetime64(day, "D"))) for cat_id, day in sorted(mismatched)]
+
+    @staticmethod
+    def _grown_shape(shape: Tuple[int, int], rows: int, days: int, today: Optional[datetime.date]) -> Tuple[int, int]:
+        """Get the shape of a file holding rows cats and days columns, with room to spare beyond today."""
+        today_index = day_index((today or datetime.date.today()).isoformat())
+        if rows > shape[0]:
+            shape = (rows + SPARE_CATS, shape[1])
+        if max(days, today_index + 1) > shape[1]:
+            shape = (shape[0], min(max(days, today_index + 1) + SPARE_DAYS, LAST_DAY_INDEX + 1))
+        return shape
+
+    def _write_file(self, shape: Tuple[int, int], old: Optional[np.ndarray] = None) -> np.ndarray:
+        """Replace the file with an empty one of the given shape, keeping the cells of old, and map it."""
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        array = np.lib.format.open_memmap(temp_path, mode="w+", dtype=CELL_DTYPE, shape=shape)
+        if old is not None:
+            rows, days = min(old.shape[0], shape[0]), min(old.shape[1], shape[1])
+            array[:rows, :days] = old[:rows, :days]
+        array.flush()
+        del array
+        os.replace(temp_path, self.path)
+        return self._mapped()
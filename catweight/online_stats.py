@@ -0,0 +1,192 @@
+"""
+Running consumption statistics that are updated one day at a time.
+"""
+import datetime
+import math
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+
+# Statistics are stored per cat and per week; buckets start on Mondays
+BUCKET_DAYS = 7
+
+WEEKDAY_KEYS = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+
+
+def bucket_start(date: str) -> str:
+    """
+    Get the first day of the bucket a date belongs to.
+
+    Args:
+        date: A date in YYYY-MM-DD format
+
+    Returns:
+        The Monday on or before the date, in YYYY-MM-DD format
+    """
+    day = datetime.date.fromisoformat(date)
+    return (day - datetime.timedelta(days=day.weekday())).isoformat()
+
+
+@dataclass
+class RunningStats:
+    """
+    Mergeable aggregates of one cat's tracked days.
+
+    A tracked day is a day with at least one completed entry; its value is the
+    food consumed over all completed entries of that day. The mean and spread
+    of daily values are kept with Welford's method, and the least-squares
+    slope of daily values against the tracked-day index (0 for the first
+    tracked day) is kept as running sums. Statistics of consecutive periods
+    are combined with merge().
+
+    Attributes:
+        days: Number of tracked days
+        mean: Mean consumption per tracked day
+        m2: Sum of squared deviations of daily consumption from the mean
+        consumed: Total consumption
+        sum_x: Sum of tracked-day indexes
+        sum_xx: Sum of squared tracked-day indexes
+        sum_xy: Sum of tracked-day index times daily consumption
+        meals: Number of completed entries
+        initial_total: Initial weight of completed entries
+        remaining_total: Remaining weight of completed entries
+        weekday_consumed: Consumption per weekday, Monday first
+        weekday_meals: Completed entries per weekday, Monday first
+        last_date: Last tracked day in YYYY-MM-DD format
+    """
+    days: int = 0
+    mean: float = 0.0
+    m2: float = 0.0
+    consumed: float = 0.0
+    sum_x: float = 0.0
+    sum_xx: float = 0.0
+    sum_xy: float = 0.0
+    meals: int = 0
+    initial_total: float = 0.0
+    remaining_total: float = 0.0
+    weekday_consumed: List[float] = field(default_factory=lambda: [0.0] * 7)
+    weekday_meals: List[int] = field(default_factory=lambda: [0] * 7)
+    last_date: Optional[str] = None
+
+    @property
+    def avg_consumed(self) -> float:
+        """Mean consumption per completed entry."""
+        return self.consumed / self.meals if self.meals else math.nan
+
+    @property
+    def variance(self) -> float:
+        """Population variance of daily consumption."""
+        return max(self.m2, 0.0) / self.days if self.days else 0.0
+
+    @property
+    def std(self) -> float:
+        """Population standard deviation of daily consumption."""
+        return math.sqrt(self.variance)
+
+    @property
+    def slope(self) -> float:
+        """Least-squares slope of daily consumption per tracked day, NaN below two days."""
+        denominator = self.days * self.sum_xx - self.sum_x ** 2
+        if denominator <= 0:
+            return math.nan
+        return (self.days * self.sum_xy - self.sum_x * self.consumed) / denominator
+
+    def add_day(self, date: str, consumed: float, meals: int, initial_total: float, remaining_total: float):
+        """
+        Append a tracked day after the last one.
+
+        Args:
+            date: The day in YYYY-MM-DD format, later than last_date
+            consumed: Food consumed on the day
+            meals: Completed entries on the day
+            initial_total: Initial weight of the day's completed entries
+            remaining_total: Remaining weight of the day's completed entries
+        """
+        x = float(self.days)
+        self.days += 1
+        delta = consumed - self.mean
+        self.mean += delta / self.days
+        self.m2 += delta * (consumed - self.mean)
+        self.sum_x += x
+        self.sum_xx += x * x
+        self.sum_xy += x * consumed
+        self._add_totals(date, consumed, meals, initial_total, remaining_total)
+        self.last_date = date
+
+    def replace_day(self, index: int, date: str, old: tuple, new: tuple):
+        """
+        Change the totals of an already tracked day.
+
+        Args:
+            index: The tracked-day index of the day
+            date: The day in YYYY-MM-DD format
+            old: The day's previous (consumed, meals, initial_total, remaining_total)
+            new: The day's new (consumed, meals, initial_total, remaining_total)
+        """
+        old_consumed, new_consumed = old[0], new[0]
+
+        # Welford removal of the old value followed by insertion of the new one
+        if self.days == 1:
+            self.mean, self.m2 = new_consumed, 0.0
+        else:
+            mean_without = (self.days * self.mean - old_consumed) / (self.days - 1)
+            m2_without = self.m2 - (old_consumed - mean_without) * (old_consumed - self.mean)
+            delta = new_consumed - mean_without
+            self.mean = mean_without + delta / self.days
+            self.m2 = m2_without + delta * (new_consumed - self.mean)
+
+        self.sum_xy += index * (new_consumed - old_consumed)
+        self._add_totals(date, *(-value for value in old))
+        self._add_totals(date, *new)
+
+    def merge(self, later: "RunningStats") -> "RunningStats":
+        """
+        Combine with the statistics of the tracked days that follow.
+
+        Args:
+            later: Statistics of days after last_date
+
+        Returns:
+            New statistics covering the days of both
+        """
+        if not self.days:
+            return later.copy()
+        if not later.days:
+            return self.copy()
+
+        days = self.days + later.days
+        delta = later.mean - self.mean
+        # The later period's indexes continue after this period's days
+        shift = float(self.days)
+        return RunningStats(
+            days=days,
+            mean=self.mean + delta * later.days / days,
+            m2=self.m2 + later.m2 + delta * delta * self.days * later.days / days,
+            consumed=self.consumed + later.consumed,
+            sum_x=self.sum_x + later.sum_x + shift * later.days,
+            sum_xx=self.sum_xx + later.sum_xx + 2 * shift * later.sum_x + shift * shift * later.days,
+            sum_xy=self.sum_xy + later.sum_xy + shift * later.consumed,
+            meals=self.meals + later.meals,
+            initial_total=self.initial_total + later.initial_total,
+            remaining_total=self.remaining_total + later.remaining_total,
+            weekday_consumed=[a + b for a, b in zip(self.weekday_consumed, later.weekday_consumed)],
+            weekday_meals=[a + b for a, b in zip(self.weekday_meals, later.weekday_meals)],
+            last_date=later.last_date,
+        )
+
+    def copy(self) -> "RunningStats":
+        """Get an independent copy."""
+        return RunningStats(**{
+            **self.__dict__,
+            "weekday_consumed": list(self.weekday_consumed),
+            "weekday_meals": list(self.weekday_meals),
+        })
+
+    def _add_totals(self, date, consumed, meals, initial_total, remaining_total):
+        weekday = datetime.date.fromisoformat(date).weekday()
+        self.consumed += consumed
+        self.meals += meals
+        self.initial_total += initial_total
+        self.remaining_total += remaining_total
+        self.weekday_consumed[weekday] += consumed
+        self.weekday_meals[weekday] += meals
@@ -0,0 +1,138 @@
+"""
+Thread-safe SQLite connection pool for the cat weight tracking app.
+"""
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Union
+
+from tuning import ConnectionProfile, get_profile
+
+
+class PoolTimeout(Exception):
+    """Raised when no pooled connection becomes available in time."""
+
+
+class ConnectionPool:
+    """
+    Bounded pool of SQLite connections shared between threads.
+
+    Connections are opened lazily up to max_size and handed out with
+    checkout/checkin semantics: a connection is used by one thread at a time
+    and returned to the pool afterwards, so it can be reused by later calls
+    from any thread (for example other Streamlit sessions or reruns).
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        profile: Optional[Union[str, ConnectionProfile]] = None,
+        max_size: int = 8,
+        timeout: float = 30.0,
+    ):
+        """
+        Initialize an empty pool.
+
+        Args:
+            db_path: Path to the SQLite database file
+            profile: Connection tuning profile applied to every pooled connection
+            max_size: Maximum number of open connections
+            timeout: Seconds acquire() waits for a free connection before raising
+        """
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+
+        self.db_path = db_path
+        self.profile = get_profile(profile)
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle: List[sqlite3.Connection] = []
+        self._size = 0
+        self._closed = False
+        self._available = threading.Condition(threading.Lock())
+
+    @property
+    def size(self) -> int:
+        """Number of connections currently open, idle or checked out."""
+        with self._available:
+            return self._size
+
+    @property
+    def idle(self) -> int:
+        """Number of open connections waiting in the pool."""
+        with self._available:
+            return len(self._idle)
+
+    def acquire(self, timeout: Optional[float] = None) -> sqlite3.Connection:
+        """
+        Check out a connection, opening a new one if the pool is not full.
+
+        Args:
+            timeout: Seconds to wait for a free connection (defaults to the pool timeout)
+
+        Returns:
+            A connection for exclusive use until it is passed to release()
+
+        Raises:
+            PoolTimeout: If every connection stays checked out for the whole timeout
+        """
+        timeout = self.timeout if timeout is None else timeout
+        with self._available:
+            if self._closed:
+                raise RuntimeError("Connection pool is closed")
+            if not self._available.wait_for(lambda: self._idle or self._size < self.max_size, timeout):
+                raise PoolTimeout(f"No connection available within {timeout}s (max_size={self.max_size})")
+            if self._idle:
+                # Most recently used first, its page cache is the warmest
+                return self._idle.pop()
+            self._size += 1
+
+        try:
+            return self.profile.connect(self.db_path, check_same_thread=False)
+        except Exception:
+            with self._available:
+                self._size -= 1
+                self._available.notify()
+            raise
+
+    def release(self, conn: sqlite3.Connection):
+        """
+        Return a checked-out connection to the pool.
+
+        Any transaction left open by the caller is rolled back first.
+
+        Args:
+            conn: A connection previously returned by acquire()
+        """
+        if conn.in_transaction:
+            conn.rollback()
+        with self._available:
+            if self._closed:
+                self._size -= 1
+                conn.close()
+            else:
+                self._idle.append(conn)
+            self._available.notify()
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """
+        Check out a connection for the duration of a with block.
+
+        Yields:
+            A connection for exclusive use inside the block
+        """
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        """Close idle connections; checked-out connections are closed when released."""
+        with self._available:
+            self._closed = True
+            while self._idle:
+                self._idle.pop().close()
+                self._size -= 1
+            self._available.notify_all()
@@ -0,0 +1,259 @@
+"""
+Routing of households to their own SQLite database files.
+
+Every household (tenant) is stored in a shard of its own under one root
+directory, so a write transaction in one household never waits for the write
+lock of another. Shards are created and migrated when first used, and at most
+max_open of them are kept open at a time.
+"""
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from cache import QueryCache
+from db import CatWeightDatabase
+from matrix import existing_matrix
+from pool import ConnectionPool
+from tuning import ConnectionProfile
+
+
+# Household ids double as file names, so only a safe subset is accepted
+HOUSEHOLD_ID = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_-]{0,63}$")
+
+SHARD_SUFFIX = ".db"
+
+
+class ShardRouter:
+    """
+    Maps household ids to CatWeightDatabase shards under a root directory.
+
+    Shards are opened on demand with a connection pool of their own and kept
+    in an LRU of at most max_open shards; the least recently used shard that
+    is not in use is closed when another one has to be opened. A shard handed
+    out by shard() stays open until its block exits, so the LRU can briefly
+    hold more shards than max_open while many are in use at once.
+
+    Queries over all households are fanned out to a thread pool by map().
+    """
+
+    def __init__(
+        self,
+        root_dir: str,
+        max_open: int = 32,
+        profile: Optional[Union[str, ConnectionProfile]] = None,
+        pool_size: int = 4,
+        cache: Optional[QueryCache] = None,
+        max_workers: int = 8,
+    ):
+        """
+        Initialize a router without opening any shard.
+
+        Args:
+            root_dir: Directory holding one database file per household;
+                created if it does not exist
+            max_open: Most shards kept open while not in use
+            profile: Connection tuning profile of every shard (see tuning.py)
+            pool_size: Maximum pooled connections per shard
+            cache: Optional query cache shared by all shards; results are
+                kept apart by database path
+            max_workers: Most shards queried at once by map()
+        """
+        if max_open < 1:
+            raise ValueError("max_open must be at least 1")
+
+        self.root_dir = root_dir
+        self.max_open = max_open
+        self.profile = profile
+        self.pool_size = pool_size
+        self.cache = cache
+        self.max_workers = max_workers
+        self._shards: "OrderedDict[str, Tuple[CatWeightDatabase, ConnectionPool]]" = OrderedDict()
+        self._in_use: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        os.makedirs(root_dir, exist_ok=True)
+
+    @property
+    def open_count(self) -> int:
+        """Number of shards currently open."""
+        with self._lock:
+            return len(self._shards)
+
+    def shard_path(self, household_id: str) -> str:
+        """
+        Get the path of a household's database file.
+
+        Args:
+            household_id: The household id
+
+        Returns:
+            The path of the shard, whether or not it exists yet
+
+        Raises:
+            ValueError: If the id is not a valid household id
+        """
+        if not isinstance(household_id, str) or not HOUSEHOLD_ID.match(household_id):
+            raise ValueError(f"Invalid household id: {household_id!r}")
+        return os.path.join(self.root_dir, household_id + SHARD_SUFFIX)
+
+    def households(self) -> List[str]:
+        """
+        List the households that have a shard on disk.
+
+        Returns:
+            The household ids, sorted
+        """
+        return sorted(
+            name[:-len(SHARD_SUFFIX)] for name in os.listdir(self.root_dir)
+            if name.endswith(SHARD_SUFFIX) and HOUSEHOLD_ID.match(name[:-len(SHARD_SUFFIX)])
+        )
+
+    @contextmanager
+    def shard(self, household_id: str, create: bool = True) -> Iterator[CatWeightDatabase]:
+        """
+        Use a household's database for the duration of a with block.
+
+        A shard that is not open yet is opened, and created and migrated to
+        the current schema if needed. The database is safe to share between
+        threads and stays open until the block exits.
+
+        Args:
+            household_id: The household id
+            create: Whether to create the shard if the household has none
+
+        Yields:
+            The household's CatWeightDatabase
+
+        Raises:
+            ValueError: If the id is not a valid household id
+            KeyError: If create is False and the household has no shard
+        """
+        db = self._acquire(household_id, create)
+        try:
+            yield db
+        finally:
+            self._release(household_id)
+
+    def map(self, func: Callable[[CatWeightDatabase], Any], households: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """
+        Run a function on many households' databases in parallel.
+
+        Args:
+            func: Function of a CatWeightDatabase, called once per household
+                on a worker thread
+            households: The household ids (defaults to every household on disk)
+
+        Returns:
+            What func returned for each household, keyed by household id
+
+        Raises:
+            Exception: The first error raised by func, in household order,
+                once all calls have finished
+        """
+        households = self.households() if households is None else list(households)
+        if not households:
+            return {}
+
+        def run(household_id):
+            with self.shard(household_id, create=False) as db:
+                return func(db)
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(households)),
+                                thread_name_prefix="shard-router") as executor:
+            futures = {household_id: executor.submit(run, household_id) for household_id in households}
+        return {household_id: future.result() for household_id, future in futures.items()}
+
+    def migrate_all(self) -> Dict[str, int]:
+        """
+        Open every household's database, which applies its pending migrations.
+
+        Returns:
+            The schema version of each household, keyed by household id
+        """
+        return self.map(lambda db: db.get_schema_version())
+
+    def get_daily_consumption(self, start_date: str, end_date: str) -> Dict[str, Dict[str, Dict[str, Dict[str, Any]]]]:
+        """
+        Get per-cat, per-day totals within a date range for every household.
+
+        Args:
+            start_date: Start date in YYYY-MM-DD format
+            end_date: End date in YYYY-MM-DD format
+
+        Returns:
+            A dictionary keyed by household id, each as returned by
+            CatWeightDatabase.get_daily_consumption
+        """
+        return self.map(lambda db: db.get_daily_consumption(start_date, end_date))
+
+    def close(self):
+        """Close every open shard; shards still in use are closed when released."""
+        with self._lock:
+            closing = [household_id for household_id in self._shards if not self._in_use.get(household_id)]
+            shards = [self._shards.pop(household_id) for household_id in closing]
+            self.max_open = 0
+        for db, pool in shards:
+            db.close()
+            pool.close()
+
+    def _acquire(self, household_id: str, create: bool) -> CatWeightDatabase:
+        """Get a household's open database, opening it if needed, and mark it in use."""
+        path = self.shard_path(household_id)
+        with self._lock:
+            if household_id in self._shards:
+                self._shards.move_to_end(household_id)
+                self._in_use[household_id] = self._in_use.get(household_id, 0) + 1
+                return self._shards[household_id][0]
+
+        if not create and not os.path.exists(path):
+            raise KeyError(f"Unknown household: {household_id}")
+
+        # Opening migrates the shard, which can take a while; do it without
+        # holding the lock so other households are not held up
+        pool = ConnectionPool(path, profile=self.profile, max_size=self.pool_size)
+        try:
+            db = CatWeightDatabase(pool=pool, cache=self.cache, matrix=existing_matrix(path))
+        except BaseException:
+            pool.close()
+            raise
+
+        with self._lock:
+            if household_id in self._shards:
+                # Another thread opened the shard first; use that one
+                duplicate = (db, pool)
+                self._shards.move_to_end(household_id)
+                db = self._shards[household_id][0]
+            else:
+                duplicate = None
+                self._shards[household_id] = (db, pool)
+            self._in_use[household_id] = self._in_use.get(household_id, 0) + 1
+            evicted = self._evict()
+
+        for shard in ([duplicate] if duplicate else []) + evicted:
+            shard[0].close()
+            shard[1].close()
+        return db
+
+    def _release(self, household_id: str):
+        """Mark one use of a household's database as finished and close shards beyond max_open."""
+        with self._lock:
+            self._in_use[household_id] -= 1
+            if not self._in_use[household_id]:
+                del self._in_use[household_id]
+            evicted = self._evict()
+        for db, pool in evicted:
+            db.close()
+            pool.close()
+
+    def _evict(self) -> List[Tuple[CatWeightDatabase, ConnectionPool]]:
+        """Remove the least recently used shards not in use while more than max_open are open; call with the lock held."""
+        evicted = []
+        for household_id in list(self._shards):
+            if len(self._shards) <= self.max_open:
+                break
+            if not self._in_use.get(household_id):
+                evicted.append(self._shards.pop(household_id))
+        return evicted
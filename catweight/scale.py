@@ -0,0 +1,258 @@
+"""
+Raw bowl scale readings and the detection of feeding sessions in them.
+
+Each cat's bowl scale reports its net weight, in integer centigrams, about
+once per second. Samples are stored as they arrive in scale_readings and
+streamed through a detector that turns them into cat_weights entries: a
+refill adds an entry with the weight the bowl settled at as initial weight,
+and the end of the feeding session records the remaining weight. The
+detector's state is stored per bowl, so ingestion can resume in a new
+process where the last one stopped.
+"""
+import datetime
+import time
+from dataclasses import asdict, dataclass
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+IDLE, FILLING, OPEN = "idle", "filling", "open"
+
+DAY_SECONDS = 24 * 60 * 60
+
+# (age in seconds, bucket length in seconds or None to delete): samples older
+# than the age are averaged into buckets of that length, or deleted
+RETENTION_POLICY: Tuple[Tuple[int, Optional[int]], ...] = (
+    (2 * DAY_SECONDS, 60),
+    (30 * DAY_SECONDS, 15 * 60),
+    (365 * DAY_SECONDS, None),
+)
+
+
+@dataclass(frozen=True)
+class DetectorConfig:
+    """
+    Thresholds of the feeding detector.
+
+    Attributes:
+        noise_cg: Largest change between samples that is still scale noise
+        refill_cg: Smallest rise, over consecutive rising samples, that counts
+            as food poured in
+        settle_seconds: How long the weight must hold still after a refill
+            before it is taken as the initial weight
+        idle_seconds: How long the weight must hold still, after food was
+            eaten, for the session to end
+        min_eaten_cg: Smallest drop from the initial weight that counts as eaten
+    """
+    noise_cg: int = 100
+    refill_cg: int = 1000
+    settle_seconds: int = 10
+    idle_seconds: int = 30 * 60
+    min_eaten_cg: int = 100
+
+
+@dataclass
+class BowlState:
+    """
+    Where the detector is in one bowl's sample stream.
+
+    Attributes:
+        phase: IDLE (no session), FILLING (refill seen, weight not settled
+            yet) or OPEN (session running)
+        entry_id: The cat_weights entry of the open session
+        initial_cg: Initial weight of the open session
+        last_ts: Time of the last sample processed
+        last_cg: Weight of the last sample processed
+        last_change_ts: Time of the last change above noise
+        settled_cg: Weight of the last sample that followed settle_seconds
+            without change
+        rise_cg: Total rise of the run of rising samples the last sample is in
+    """
+    phase: str = IDLE
+    entry_id: Optional[int] = None
+    initial_cg: int = 0
+    last_ts: Optional[int] = None
+    last_cg: Optional[int] = None
+    last_change_ts: Optional[int] = None
+    settled_cg: Optional[int] = None
+    rise_cg: int = 0
+
+
+@dataclass(frozen=True)
+class FeedingEvent:
+    """
+    A refill ("refill") or the end of a feeding session ("end").
+
+    Attributes:
+        kind: "refill" or "end"
+        ts: Time of the sample the event was detected at
+        weight_cg: Initial weight of a refill, or remaining weight at the end
+    """
+    kind: str
+    ts: int
+    weight_cg: int
+
+
+def detect_feedings(state: BowlState, timestamps: Sequence[int], weights_cg: Sequence[int],
+                    config: DetectorConfig = DetectorConfig()) -> List[FeedingEvent]:
+    """
+    Advance the detector over a chunk of one bowl's samples.
+
+    Differences, changes and quiet periods are computed for the whole chunk
+    with array operations; only the few detected events are stepped through.
+    Samples at or before the state's last sample are skipped, and negative
+    weights (the bowl lifted off a tared scale) are ignored.
+
+    Args:
+        state: The bowl's detector state, updated in place
+        timestamps: Sample times in Unix seconds
+        weights_cg: Sample weights in centigrams
+        config: Detector thresholds
+
+    Returns:
+        The events detected in the chunk, in time order
+    """
+    ts = np.asarray(timestamps, dtype=np.int64)
+    weights = np.asarray(weights_cg, dtype=np.int64)
+    order = np.argsort(ts, kind="stable")
+    ts, weights = ts[order], weights[order]
+
+    keep = weights >= 0
+    keep[1:] &= ts[1:] != ts[:-1]
+    if state.last_ts is not None:
+        keep &= ts > state.last_ts
+    ts, weights = ts[keep], weights[keep]
+    if not len(ts):
+        return []
+
+    previous = np.empty_like(weights)
+    previous[0] = weights[0] if state.last_cg is None else state.last_cg
+    previous[1:] = weights[:-1]
+    step = weights - previous
+
+    # Time since the weight last changed by more than noise, at every sample
+    first_change = ts[0] if state.last_change_ts is None else state.last_change_ts
+    last_change = np.maximum.accumulate(np.where(np.abs(step) > config.noise_cg, ts, first_change))
+    quiet = ts - last_change
+
+    # Total rise of each run of consecutive rising samples, so a refill poured
+    # over a few seconds is found where its run first reaches refill_cg
+    up = step > config.noise_cg
+    climbed = np.cumsum(np.where(up, step, 0))
+    run_start = np.maximum.accumulate(np.where(up, -state.rise_cg, climbed))
+    run = climbed - run_start
+    rises = np.flatnonzero(up & (run >= config.refill_cg) & (run - step < config.refill_cg))
+    settled = np.flatnonzero(quiet >= config.settle_seconds)
+    idle = np.flatnonzero(quiet >= config.idle_seconds)
+
+    def first_from(indexes, start):
+        k = np.searchsorted(indexes, start)
+        return int(indexes[k]) if k < len(indexes) else None
+
+    def settled_weight_before(index):
+        k = np.searchsorted(settled, index) - 1
+        return int(weights[settled[k]]) if k >= 0 else state.settled_cg
+
+    events = []
+    i = 0
+    while i < len(ts):
+        if state.phase == FILLING:
+            j = first_from(settled, i)
+            if j is None:
+                break
+            state.phase, state.initial_cg = OPEN, int(weights[j])
+            events.append(FeedingEvent("refill", int(ts[j]), int(weights[j])))
+            i = j + 1
+            continue
+
+        rise = first_from(rises, i)
+        if state.phase == OPEN:
+            # The session ends once the weight held still long enough after
+            # something was eaten, or at the next refill
+            candidates = idle[np.searchsorted(idle, i):]
+            if rise is not None:
+                candidates = candidates[candidates < rise]
+            eaten = candidates[weights[candidates] <= state.initial_cg - config.min_eaten_cg]
+            if len(eaten):
+                j = int(eaten[0])
+                events.append(FeedingEvent("end", int(ts[j]), int(weights[j])))
+                state.phase = IDLE
+                i = j + 1
+                continue
+            if rise is not None:
+                remaining = settled_weight_before(rise)
+                remaining = int(previous[rise]) if remaining is None else remaining
+                events.append(FeedingEvent("end", int(ts[rise]), remaining))
+
+        if rise is None:
+            break
+        state.phase = FILLING
+        i = rise + 1
+
+    state.settled_cg = settled_weight_before(len(ts))
+    state.last_ts, state.last_cg = int(ts[-1]), int(weights[-1])
+    state.last_change_ts = int(last_change[-1])
+    state.rise_cg = int(run[-1])
+    return events
+
+
+def ingest_readings(db, cat_name: str, timestamps: Sequence[int], weights_cg: Sequence[int],
+                    config: DetectorConfig = DetectorConfig()) -> List[FeedingEvent]:
+    """
+    Store a chunk of a bowl's samples and record the feedings detected in it.
+
+    The samples, the entries and the detector state are written in one
+    transaction, so a failed chunk leaves no partial session behind and can
+    simply be posted again.
+
+    Args:
+        db: The CatWeightDatabase to write to
+        cat_name: Name of the cat the bowl belongs to
+        timestamps: Sample times in Unix seconds
+        weights_cg: Sample weights in centigrams
+        config: Detector thresholds
+
+    Returns:
+        The events detected in the chunk
+    """
+    with db.transaction():
+        saved = db.get_scale_state(cat_name)
+        state = BowlState(**saved) if saved else BowlState()
+        db.add_scale_readings(cat_name, timestamps, weights_cg)
+
+        events = detect_feedings(state, timestamps, weights_cg, config)
+        for event in events:
+            if event.kind == "refill":
+                date = datetime.date.fromtimestamp(event.ts).isoformat()
+                state.entry_id = db.add_entry(cat_name, event.weight_cg / 100, date)
+            elif state.entry_id is not None:
+                remaining = min(event.weight_cg, state.initial_cg)
+                db.update_remaining_weight(state.entry_id, remaining / 100)
+                state.entry_id = None
+
+        db.save_scale_state(cat_name, asdict(state))
+    return events
+
+
+def apply_retention(db, now: Optional[int] = None, policy=RETENTION_POLICY) -> int:
+    """
+    Downsample or delete old scale samples according to a retention policy.
+
+    Args:
+        db: The CatWeightDatabase to prune
+        now: Current Unix time (defaults to the clock)
+        policy: Tiers of (age in seconds, bucket length in seconds or None to delete)
+
+    Returns:
+        The number of samples removed
+    """
+    now = int(time.time()) if now is None else now
+    removed = 0
+    # Oldest tier first, so samples about to be deleted are not averaged
+    for age, bucket_seconds in sorted(policy, reverse=True):
+        if bucket_seconds is None:
+            removed += db.delete_scale_readings(now - age)
+        else:
+            removed += db.downsample_scale_readings(now - age, bucket_seconds)
+    return removed
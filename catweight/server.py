@@ -0,0 +1,411 @@
+"""
+Headless HTTP API for ingesting scale readings without the Streamlit app.
+
+Usage:
+    python -m catweight.server [--db PATH] [--host HOST] [--port PORT]
+
+Endpoints (JSON in and out):
+    GET  /health                      liveness check
+    GET  /entries?start=&end=&cat_name=
+                                      entries in a date range, most recent first
+    POST /entries                     {"cat_name", "initial_weight", "date"?}
+                                      adds an entry, answers {"id"}
+    POST /entries/<id>/remaining      {"remaining_weight"}
+                                      closes an open entry; 409 if it was archived
+    POST /batch                       {"entries": [...], "remaining": [{"id", "remaining_weight"}]}
+                                      adds and closes many entries in one transaction
+    POST /readings                    {"cat_name", "ts": [...], "weight_cg": [...]}
+                                      stores raw bowl scale samples and records the
+                                      feedings detected in them, answers {"events"}
+
+Only the standard library, the database layer and the NumPy-based feeding
+detector are imported, so the server starts quickly and stays small; pandas
+and matplotlib are never loaded.
+"""
+import argparse
+import datetime
+import json
+import os
+import queue
+import re
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+from urllib.parse import parse_qsl, urlsplit
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from db import CatWeightDatabase, DEFAULT_DB_PATH
+from matrix import existing_matrix
+from pool import ConnectionPool
+from scale import apply_retention, ingest_readings
+from tuning import ConnectionProfile
+
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8502
+# Most writes committed together by the group committer
+DEFAULT_MAX_BATCH = 256
+# Longest a write waits for others to share its commit, in seconds; with 0 a
+# batch is whatever was queued while the previous commit ran
+DEFAULT_MAX_DELAY = 0.0
+# Largest request body accepted, in bytes
+MAX_BODY_BYTES = 1 << 20
+# Seconds between applications of the scale sample retention policy
+RETENTION_INTERVAL = 60 * 60
+
+ENTRY_REMAINING_PATH = re.compile(r"^/entries/(\d+)/remaining$")
+
+
+class RequestError(Exception):
+    """Raised for a request the server rejects; carries the HTTP status."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class GroupCommitter:
+    """
+    Single writer thread that commits concurrent writes together.
+
+    Writes are queued as functions of the database. The writer takes every
+    write queued so far, up to max_batch, waiting at most max_delay for more
+    to arrive, and runs them in one transaction, so many concurrent requests
+    share one commit (and one fsync). If a write in the batch raises, the
+    batch is rolled back and its writes are retried one transaction each, so
+    one bad write does not fail the others.
+
+    With the default max_delay of 0 a write is committed as soon as the
+    writer is free; under load, writes still share commits because they
+    queue up while the previous commit runs. A delay lets writes arriving
+    just apart share a commit too, at the cost of adding it to the latency
+    of every write, even one arriving alone.
+    """
+
+    def __init__(self, db: CatWeightDatabase, max_batch: int = DEFAULT_MAX_BATCH,
+                 max_delay: float = DEFAULT_MAX_DELAY):
+        """
+        Start the writer thread.
+
+        Args:
+            db: The database to write to
+            max_batch: Most writes committed in one transaction
+            max_delay: Seconds the writer waits for more writes to join a batch;
+                0 commits the writes already queued right away
+        """
+        self.db = db
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.commits = 0
+        self._queue: "queue.Queue[Optional[Tuple[Callable[[CatWeightDatabase], Any], Future]]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="group-committer", daemon=True)
+        self._thread.start()
+
+    def submit(self, write: Callable[[CatWeightDatabase], Any]) -> Any:
+        """
+        Run a write in the next group commit and wait for it.
+
+        Args:
+            write: Function of the database performing the write; it must only
+                use CatWeightDatabase methods, which join the open transaction
+
+        Returns:
+            What the write returned, once its transaction has committed
+        """
+        future: Future = Future()
+        self._queue.put((write, future))
+        return future.result()
+
+    def close(self):
+        """Commit the queued writes and stop the writer thread."""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._commit(batch)
+                    return
+                batch.append(item)
+            self._commit(batch)
+
+    def _commit(self, batch: List[Tuple[Callable[[CatWeightDatabase], Any], Future]]):
+        try:
+            with self.db.transaction():
+                results = [write(self.db) for write, _ in batch]
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0][1].set_exception(e)
+            else:
+                for item in batch:
+                    self._commit([item])
+            return
+        self.commits += 1
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+
+def parse_date(value: Any, field: str) -> str:
+    """Validate a YYYY-MM-DD date."""
+    try:
+        return datetime.date.fromisoformat(value).isoformat()
+    except (TypeError, ValueError):
+        raise RequestError(400, f"{field} must be a date in YYYY-MM-DD format")
+
+
+def parse_weight(value: Any, field: str, positive: bool = False) -> float:
+    """Validate a weight in grams."""
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise RequestError(400, f"{field} must be a number")
+    if value < 0 or (positive and value == 0):
+        raise RequestError(400, f"{field} must be {'greater than' if positive else 'at least'} 0")
+    return float(value)
+
+
+def parse_entry(body: Any) -> Dict[str, Any]:
+    """Validate a new entry as posted to /entries or in a batch."""
+    if not isinstance(body, dict):
+        raise RequestError(400, "entry must be an object")
+    cat_name = body.get("cat_name")
+    if not isinstance(cat_name, str) or not cat_name:
+        raise RequestError(400, "cat_name is required")
+    entry = {
+        "cat_name": cat_name,
+        "initial_weight": parse_weight(body.get("initial_weight"), "initial_weight", positive=True),
+        "date": parse_date(body["date"], "date") if body.get("date") is not None else datetime.date.today().isoformat(),
+    }
+    if body.get("remaining_weight") is not None:
+        entry["remaining_weight"] = parse_weight(body["remaining_weight"], "remaining_weight")
+    return entry
+
+
+def parse_readings(body: Any) -> Tuple[str, List[int], List[int]]:
+    """Validate a chunk of bowl scale samples as posted to /readings."""
+    if not isinstance(body, dict):
+        raise RequestError(400, "body must be an object")
+    cat_name = body.get("cat_name")
+    if not isinstance(cat_name, str) or not cat_name:
+        raise RequestError(400, "cat_name is required")
+    columns = []
+    for field in ("ts", "weight_cg"):
+        values = body.get(field)
+        if not isinstance(values, list) or not all(isinstance(v, int) and not isinstance(v, bool) for v in values):
+            raise RequestError(400, f"{field} must be a list of integers")
+        columns.append(values)
+    if len(columns[0]) != len(columns[1]):
+        raise RequestError(400, "ts and weight_cg must have the same length")
+    return cat_name, columns[0], columns[1]
+
+
+class IngestHandler(BaseHTTPRequestHandler):
+    """Request handler for the ingestion API; see the module docstring."""
+
+    # Keep connections open between requests; scales post continuously
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; without TCP_NODELAY the body
+    # waits for the client's delayed ACK of the headers
+    disable_nagle_algorithm = True
+    server: "IngestServer"
+
+    def do_GET(self):
+        self._dispatch(self._get)
+
+    def do_POST(self):
+        self._dispatch(self._post)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _get(self, path: str, query: Dict[str, str]) -> Tuple[int, Any]:
+        if path == "/health":
+            return 200, {"status": "ok"}
+        if path == "/entries":
+            today = datetime.date.today().isoformat()
+            start = parse_date(query.get("start", today), "start")
+            end = parse_date(query.get("end", today), "end")
+            return 200, self.server.db.get_entries_by_date_range(start, end, query.get("cat_name"))
+        raise RequestError(404, "not found")
+
+    def _post(self, path: str, query: Dict[str, str]) -> Tuple[int, Any]:
+        body = self._read_json()
+        committer = self.server.committer
+
+        if path == "/entries":
+            entry = parse_entry(body)
+            entry_id = committer.submit(lambda db: db.add_entries_bulk([entry])[0])
+            return 201, {"id": entry_id}
+
+        match = ENTRY_REMAINING_PATH.match(path)
+        if match:
+            entry_id = int(match.group(1))
+            if not isinstance(body, dict):
+                raise RequestError(400, "body must be an object")
+            remaining = parse_weight(body.get("remaining_weight"), "remaining_weight")
+            try:
+                updated = committer.submit(lambda db: db.update_remaining_weight(entry_id, remaining))
+            except ValueError as e:
+                # The entry was archived
+                raise RequestError(409, str(e))
+            if not updated:
+                raise RequestError(404, f"entry {entry_id} not found")
+            return 200, {"id": entry_id, "remaining_weight": remaining}
+
+        if path == "/batch":
+            if not isinstance(body, dict):
+                raise RequestError(400, "body must be an object")
+            entries = [parse_entry(entry) for entry in body.get("entries", [])]
+            updates = []
+            for update in body.get("remaining", []):
+                if not isinstance(update, dict) or isinstance(update.get("id"), bool) or not isinstance(update.get("id"), int):
+                    raise RequestError(400, "remaining items need an integer id")
+                updates.append((update["id"], parse_weight(update.get("remaining_weight"), "remaining_weight")))
+
+            def write(db):
+                return db.add_entries_bulk(entries), db.update_remaining_weights_bulk(updates)
+
+            try:
+                entry_ids, closed = committer.submit(write)
+            except ValueError as e:
+                raise RequestError(409, str(e))
+            return 200, {"ids": entry_ids, "closed": closed}
+
+        if path == "/readings":
+            cat_name, timestamps, weights = parse_readings(body)
+            events = committer.submit(lambda db: ingest_readings(db, cat_name, timestamps, weights))
+            self.server.maybe_apply_retention()
+            return 200, {"events": [{"kind": e.kind, "ts": e.ts, "weight_cg": e.weight_cg} for e in events]}
+
+        raise RequestError(404, "not found")
+
+    def _read_json(self) -> Any:
+        # A body that is not read would be parsed as the next request on the
+        # kept-alive connection, so the connection is closed after rejecting it
+        length = self.headers.get("Content-Length") or "0"
+        if not length.isdigit():
+            self.close_connection = True
+            raise RequestError(400, "Content-Length must be a non-negative integer")
+        length = int(length)
+        if length > MAX_BODY_BYTES:
+            self.close_connection = True
+            raise RequestError(413, "request body too large")
+        try:
+            return json.loads(self.rfile.read(length) or b"null")
+        except ValueError:
+            raise RequestError(400, "body must be valid JSON")
+
+    def _dispatch(self, method: Callable[[str, Dict[str, str]], Tuple[int, Any]]):
+        url = urlsplit(self.path)
+        path, query = url.path, dict(parse_qsl(url.query))
+        try:
+            status, payload = method(path, query)
+        except RequestError as e:
+            status, payload = e.status, {"error": str(e)}
+        except Exception as e:
+            self.log_error("request failed: %r", e)
+            status, payload = 500, {"error": "internal error"}
+
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        if self.close_connection:
+            self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class IngestServer(ThreadingHTTPServer):
+    """Threaded HTTP server owning the database pool and the group committer."""
+
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], db_path: str = DEFAULT_DB_PATH,
+                 profile: Optional[Union[str, ConnectionProfile]] = None, pool_size: int = 8,
+                 max_batch: int = DEFAULT_MAX_BATCH, max_delay: float = DEFAULT_MAX_DELAY, verbose: bool = False):
+        """
+        Open the database and bind the server.
+
+        The server keeps the database's consumption matrix current if the app
+        has created one.
+
+        Args:
+            address: (host, port) to listen on; port 0 picks a free port
+            db_path: Path to the SQLite database
+            profile: Connection tuning profile (see tuning.py)
+            pool_size: Maximum pooled connections, shared by reads and the writer
+            max_batch: Most writes committed in one transaction
+            max_delay: Seconds a write waits for others to share its commit
+            verbose: Whether to log every request
+        """
+        self.pool = ConnectionPool(db_path, profile=profile, max_size=pool_size)
+        self.db = CatWeightDatabase(pool=self.pool, matrix=existing_matrix(db_path))
+        self.committer = GroupCommitter(self.db, max_batch=max_batch, max_delay=max_delay)
+        self.verbose = verbose
+        self.next_retention = time.monotonic() + RETENTION_INTERVAL
+        self.retention_lock = threading.Lock()
+        super().__init__(address, IngestHandler)
+
+    def maybe_apply_retention(self):
+        """Apply the scale sample retention policy through the committer, at most once per interval."""
+        with self.retention_lock:
+            if time.monotonic() < self.next_retention:
+                return
+            self.next_retention = time.monotonic() + RETENTION_INTERVAL
+        self.committer.submit(apply_retention)
+
+    def server_close(self):
+        super().server_close()
+        self.committer.close()
+        self.pool.close()
+
+
+def build_parser():
+    """Build the command line parser."""
+    parser = argparse.ArgumentParser(description="Cat weight ingestion API")
+    parser.add_argument("--db", default=os.environ.get("CATWEIGHT_DB_PATH", DEFAULT_DB_PATH),
+                        help="path to the SQLite database")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="address to listen on")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="port to listen on")
+    parser.add_argument("--profile", default=None,
+                        help="connection tuning profile (default: CATWEIGHT_DB_PROFILE or balanced)")
+    parser.add_argument("--pool-size", type=int, default=int(os.environ.get("CATWEIGHT_DB_POOL_SIZE", "8")),
+                        help="maximum pooled SQLite connections")
+    parser.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH,
+                        help="most writes committed in one transaction (1 disables group commit)")
+    parser.add_argument("--max-delay-ms", type=float, default=DEFAULT_MAX_DELAY * 1000,
+                        help="milliseconds a write waits for others to share its commit")
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    return parser
+
+
+def main(argv=None):
+    """Main entry point."""
+    args = build_parser().parse_args(argv)
+    server = IngestServer((args.host, args.port), args.db, profile=args.profile, pool_size=args.pool_size,
+                          max_batch=args.max_batch, max_delay=args.max_delay_ms / 1000, verbose=args.verbose)
+    print(f"Serving on http://{server.server_address[0]}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+"""
+Golden tests for the vectorized consumption statistics.
+
+The expected values were produced by the per-cat loops the statistics
+sections used before they moved to the analytics module.
+"""
+import unittest
+import os
+import sys
+import random
+import datetime
+from tempfile import TemporaryDirectory
+
+# Add the parent directory to the path so we can import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from db import CatWeightDatabase
+from analytics import compute_window_stats
+
+CATS = ["Mittens", "Cheddar", "Lola"]
+TODAY = datetime.date(2026, 10, 17)
+
+
+def fixture_entries():
+    """Five weeks of entries with skipped days, second meals and open entries."""
+    rng = random.Random(42)
+    entries = []
+    for days_ago in range(35):
+        date = (TODAY - datetime.timedelta(days=days_ago)).isoformat()
+        for cat_idx, cat in enumerate(CATS):
+            if cat == "Lola" and days_ago % 3 == 1:
+                continue
+            for meal in range(1 + (days_ago + cat_idx) % 2):
+                initial = round(rng.uniform(80, 150), 1)
+                eaten = round(rng.uniform(20, 70) + cat_idx * 5 - days_ago * 0.5 * (cat_idx - 1), 1)
+                if (days_ago == 0 and meal == 1) or rng.random() < 0.05:
+                    remaining = None
+                else:
+                    remaining = max(0.0, round(initial - eaten, 1))
+                entries.append({"cat_name": cat, "initial_weight": initial, "date": date, "remaining_weight": remaining})
+    return entries
+
+
+class TestWindowStats(unittest.TestCase):
+    """Tests for compute_window_stats."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Load the fixture once through the daily rollup."""
+        temp_dir = TemporaryDirectory()
+        db = CatWeightDatabase(os.path.join(temp_dir.name, "analytics.db"))
+        db.add_entries_bulk(fixture_entries())
+        cls.daily = db.get_daily_consumption("2026-01-01", "2026-12-31")
+        db.close()
+        temp_dir.cleanup()
+
+    def window(self, days):
+        """Compute the stats for the last number of days, including today."""
+        start_date = (TODAY - datetime.timedelta(days=days - 1)).isoformat()
+        return compute_window_stats(self.daily, start_date, TODAY.isoformat(), CATS)
+
+    def assert_column(self, stats, column, expected):
+        """Assert one per-cat column against expected values in CATS order."""
+        self.assertEqual(list(stats.per_cat.index), CATS)
+        for cat, value in zip(CATS, expected):
+            self.assertAlmostEqual(stats.per_cat.at[cat, column], value, places=9, msg=f"{column} of {cat}")
+
+    def test_weekly_stats(self):
+        """Test the 7-day window against the original loop results."""
+        stats = self.window(7)
+
+        self.assert_column(stats, "total_consumed", [531.5, 453.5, 261.9])
+        self.assert_column(stats, "avg_consumed", [53.15, 50.388888888888886, 43.65])
+        self.assert_column(stats, "consistency", [38.38272357959704, 18.34279301403021, 18.820775754468787])
+        self.assert_column(stats, "leftover_pct", [55.04525078237334, 55.617537678606375, 57.89389067524117])
+        self.assertEqual(list(stats.per_cat["trend"]), ["decreasing", "stable", "increasing"])
+        self.assertEqual(list(stats.per_cat["days_tracked"]), [7, 6, 5])
+        self.assertEqual(list(stats.per_cat["meals"]), [10, 9, 6])
+
+        self.assertEqual(stats.daily_totals.idxmax(), "2026-10-14")
+        self.assertAlmostEqual(stats.daily_totals.max(), 267.1)
+        self.assertEqual(stats.leader("avg_consumed"), "Mittens")
+        self.assertEqual(stats.leader("consistency", largest=False, min_days=2), "Cheddar")
+        self.assertEqual(stats.leader("leftover_pct"), "Lola")
+
+    def test_monthly_stats(self):
+        """Test the 30-day window against the original loop results."""
+        stats = self.window(30)
+
+        self.assert_column(stats, "total_consumed", [2430.0, 2114.5, 1373.9])
+        self.assert_column(stats, "avg_consumed", [54.0, 51.573170731707314, 47.37586206896552])
+        self.assert_column(stats, "consistency", [35.826777694903015, 35.3564872273907, 32.19896698653545])
+        self.assert_column(stats, "slope", [-0.8145494994438298, -0.5598522167487685, -0.35706766917293403])
+        self.assert_column(stats, "trend_strength", [0.30168499979401103, 0.2226699996621964, 0.103957396949686])
+        self.assertEqual(list(stats.per_cat["days_tracked"]), [30, 29, 20])
+
+        expected_weekday = [
+            52.32666666666667, 55.059999999999995, 49.162499999999994, 56.85294117647058,
+            55.827777777777776, 43.50555555555555, 47.90625,
+        ]
+        for weekday, value in enumerate(expected_weekday):
+            self.assertAlmostEqual(stats.weekday.at[weekday, "avg_consumed"], value, places=9)
+        self.assertEqual(list(stats.weekday["meals"]), [15, 15, 16, 17, 18, 18, 16])
+
+    def test_minimum_data_thresholds(self):
+        """Test that statistics needing more history are left out."""
+        stats = self.window(3)
+
+        self.assertTrue(stats.per_cat["slope"].isna().all())
+        self.assertIsNone(stats.leader("trend_strength"))
+        self.assertTrue(stats.weekday["avg_consumed"].isna().any())
+
+        single_day = compute_window_stats(self.daily, TODAY.isoformat(), TODAY.isoformat(), CATS)
+        self.assertEqual(list(single_day.per_cat["consistency"]), [0.0] * len(single_day.per_cat))
+        self.assertEqual(set(single_day.per_cat["trend"]), {"stable"})
+
+    def test_empty_window(self):
+        """Test a window without completed entries."""
+        stats = compute_window_stats(self.daily, "2020-01-01", "2020-01-31", CATS)
+
+        self.assertTrue(stats.empty)
+        self.assertTrue(stats.daily_totals.empty)
+        self.assertIsNone(stats.leader("meals"))
+        self.assertEqual(list(stats.weekday["meals"]), [0] * 7)
+
+
+if __name__ == "__main__":
+    unittest.main()
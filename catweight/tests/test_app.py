@@ -8,6 +8,7 @@ import datetime
 import pandas as pd
 import numpy as np
 from unittest.mock import patch, MagicMock
+from tempfile import TemporaryDirectory
 
 # Add the parent directory to the path so we can import the app module
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -17,7 +18,19 @@ sys.modules['streamlit'] = MagicMock()
 import streamlit as st
 
 # Now import the app module
-from app import create_cat_card, display_history_chart, CATS, CAT_COLORS
+from app import (
+    create_cat_card, display_history_chart, setup_page, record_initial_weight, record_remaining_weight,
+    delete_selected_day,
+    record_batch, cat_color, cat_pages, full_run_data, fragment_data,
+)
+from dashboard_data import DashboardData
+from chart_cache import ChartCache
+from assets import AssetCache
+from db import CatWeightDatabase, DEFAULT_CATS
+from matrix import ConsumptionMatrix
+
+CATS = [name for name, color, image in DEFAULT_CATS]
+CAT_COLORS = {name: color for name, color, image in DEFAULT_CATS}
 
 
 class TestAppComponents(unittest.TestCase):
@@ -25,79 +38,57 @@ class TestAppComponents(unittest.TestCase):
     
     def setUp(self):
         """Set up mocks for testing."""
-        # Mock db
-        self.mock_db = MagicMock()
-        
         # Reset streamlit mock before each test
         st.reset_mock()
-    
-    def test_create_cat_card_no_open_entries(self):
-        """Test creating a cat card with no open entries."""
-        # Set up the mock to return no open entries
-        self.mock_db.get_todays_open_entries.return_value = []
         
-        # Test with no recent entries
-        self.mock_db.get_entries_by_date_range.return_value = []
-        
-        # Call the function
-        create_cat_card("Mittens", self.mock_db)
-        
-        # Assert that the expected calls were made
-        self.mock_db.get_todays_open_entries.assert_called_once_with("Mittens")
+        self.today = datetime.date.today()
+    
+    def make_data(self, entries=(), daily=None):
+        """Build a dashboard snapshot from the given entries and daily totals."""
+        cats = [
+            {"id": cat_id, "name": name, "color": color, "image": image}
+            for cat_id, (name, color, image) in enumerate(DEFAULT_CATS, 1)
+        ]
+        return DashboardData(self.today, self.today, daily or {}, list(entries), cats=cats)
+    
+    def test_create_cat_card_no_recent_entries(self):
+        """Test creating a cat card with no recent entries."""
+        create_cat_card("Mittens", self.make_data())
         
-        # Check that we tried to get recent entries
-        today = datetime.date.today().isoformat()
-        seven_days_ago = (datetime.date.today() - datetime.timedelta(days=7)).isoformat()
-        self.mock_db.get_entries_by_date_range.assert_called_once_with(seven_days_ago, today, "Mittens")
+        # Streamlit should show an info message about missing data
+        st.info.assert_called_once_with("No data recorded in the last 7 days.")
+        st.metric.assert_not_called()
     
     def test_create_cat_card_with_open_entry(self):
-        """Test creating a cat card with an open entry."""
-        # Set up the mock to return an open entry
-        mock_entry = {
+        """Test creating a cat card with an open entry and a completed one."""
+        open_entry = {
             "id": 1, 
             "cat_name": "Cheddar", 
-            "date": datetime.date.today().isoformat(),
+            "date": self.today.isoformat(),
             "initial_weight": 120.0, 
             "remaining_weight": None,
             "created_at": datetime.datetime.now().isoformat()
         }
-        self.mock_db.get_todays_open_entries.return_value = [mock_entry]
-        
-        # Test with some recent entries
-        mock_recent_entry = {
+        recent_entry = {
             "id": 2, 
             "cat_name": "Cheddar", 
-            "date": (datetime.date.today() - datetime.timedelta(days=1)).isoformat(),
+            "date": (self.today - datetime.timedelta(days=1)).isoformat(),
             "initial_weight": 130.0, 
             "remaining_weight": 30.0,
             "created_at": (datetime.datetime.now() - datetime.timedelta(days=1)).isoformat()
         }
-        self.mock_db.get_entries_by_date_range.return_value = [mock_recent_entry]
+        other_cat_entry = dict(recent_entry, id=3, cat_name="Lola", remaining_weight=100.0)
         
-        # Call the function
-        create_cat_card("Cheddar", self.mock_db)
+        create_cat_card("Cheddar", self.make_data([open_entry, recent_entry, other_cat_entry]))
         
-        # Assert that the expected calls were made
-        self.mock_db.get_todays_open_entries.assert_called_once_with("Cheddar")
+        # Only the completed entry for this cat counts towards the averages
+        st.metric.assert_any_call("Avg. Daily Consumption (7 days)", "100.0g")
+        st.metric.assert_any_call("Last Recorded Consumption", "100.0g")
     
     @patch('app.plt')
-    @patch('app.datetime')
-    def test_display_history_chart_no_data(self, mock_datetime, mock_plt):
+    def test_display_history_chart_no_data(self, mock_plt):
         """Test displaying the history chart with no data."""
-        # Setup mock for datetime.date.today
-        mock_today = MagicMock()
-        mock_datetime.date.today.return_value = mock_today
-        mock_today.isoformat.return_value = "2023-04-01"
-        
-        # Set up the mock to return empty data
-        empty_data = {cat: [] for cat in CATS}
-        self.mock_db.get_last_30_days_data.return_value = empty_data
-        
-        # Call the function
-        display_history_chart(self.mock_db)
-        
-        # Assert that the function handled no data correctly
-        self.mock_db.get_last_30_days_data.assert_called_once()
+        display_history_chart(self.make_data())
         
         # Streamlit should show an info message about no data
         st.info.assert_called_once()
@@ -105,79 +96,254 @@ class TestAppComponents(unittest.TestCase):
         # Make sure plt.subplots was not called (no chart created)
         mock_plt.subplots.assert_not_called()
     
-    @patch('app.plt')
-    @patch('app.datetime')
-    def test_display_history_chart_with_data(self, mock_datetime, mock_plt):
-        """Test displaying the history chart with data."""
-        # Setup mock for datetime
-        mock_today = MagicMock()
-        mock_datetime.date.today.return_value = mock_today
-        mock_today.isoformat.return_value = "2023-04-01"
-        
-        # Mock for datetime.timedelta
-        def mock_timedelta(days):
-            mock_delta = MagicMock()
-            mock_delta.days = days
-            return mock_delta
+    def make_chart_data(self, consumed=(80.0, 90.0, 100.0)):
+        """Build a snapshot with yesterday's consumption for each cat."""
+        yesterday = (self.today - datetime.timedelta(days=1)).isoformat()
         
-        mock_datetime.timedelta = mock_timedelta
-        
-        # Mock for datetime.date.fromisoformat
-        mock_date = MagicMock()
-        mock_datetime.date.fromisoformat.return_value = mock_date
-        
-        # Set up the mock to return some test data
+        # Per-day totals for each cat
         test_data = {
-            "Mittens": [
-                {
-                    "id": 1,
-                    "cat_name": "Mittens",
-                    "date": "2023-03-31",
-                    "initial_weight": 100.0,
-                    "remaining_weight": 20.0,
-                    "created_at": "2023-03-31T12:00:00"
-                }
-            ],
-            "Cheddar": [
-                {
-                    "id": 2,
-                    "cat_name": "Cheddar",
-                    "date": "2023-03-31",
-                    "initial_weight": 120.0,
-                    "remaining_weight": 30.0,
-                    "created_at": "2023-03-31T12:00:00"
+            cat_name: {
+                yesterday: {
+                    "consumed": value,
+                    "entry_count": 1,
+                    "open_count": 0,
+                    "complete_count": 1
                 }
-            ],
-            "Lola": [
-                {
-                    "id": 3,
-                    "cat_name": "Lola",
-                    "date": "2023-03-31",
-                    "initial_weight": 140.0,
-                    "remaining_weight": 40.0,
-                    "created_at": "2023-03-31T12:00:00"
-                }
-            ]
+            }
+            for cat_name, value in zip(CATS, consumed)
         }
-        self.mock_db.get_last_30_days_data.return_value = test_data
-        
-        # Mock figure and axes for pyplot
+        return self.make_data(daily=test_data)
+    
+    def mock_figure(self, mock_plt):
+        """Make plt.subplots return mock figure and axes."""
         mock_fig = MagicMock()
-        mock_axes = [MagicMock(), MagicMock(), MagicMock()]
-        mock_plt.subplots.return_value = (mock_fig, mock_axes)
+        mock_ax = MagicMock()
+        mock_ax.bar.return_value = []
+        mock_plt.subplots.return_value = (mock_fig, mock_ax)
+        return mock_fig, mock_ax
+    
+    @patch('app.plt')
+    def test_display_history_chart_with_data(self, mock_plt):
+        """Test displaying the history chart with data."""
+        mock_fig, mock_ax = self.mock_figure(mock_plt)
         
         # Call the function
-        display_history_chart(self.mock_db)
-        
-        # Assert the function made the right calls
-        self.mock_db.get_last_30_days_data.assert_called_once()
+        display_history_chart(self.make_chart_data(), cache=ChartCache())
         
         # Check that matplotlib was used to create the plot
         mock_plt.subplots.assert_called_once()
         
-        # Verify that Streamlit shows the plot
-        st.pyplot.assert_called_once_with(mock_fig)
+        # Each cat's series should carry its consumption on yesterday's slot
+        plotted = {call.kwargs["label"]: call.args[1] for call in mock_ax.bar.call_args_list}
+        self.assertEqual(plotted["Mittens"][-2], 80.0)
+        self.assertEqual(plotted["Lola"][-2], 100.0)
+        self.assertEqual(plotted["Lola"][-1], 0)
+        
+        # The figure is encoded, closed and shown as an image
+        mock_fig.savefig.assert_called_once()
+        mock_plt.close.assert_called_once_with(mock_fig)
+        st.image.assert_called_once()
+        st.pyplot.assert_not_called()
+    
+    @patch('app.plt')
+    def test_display_history_chart_reuses_rendered_image(self, mock_plt):
+        """Test that unchanged chart inputs skip matplotlib on later runs."""
+        mock_fig, _ = self.mock_figure(mock_plt)
+        mock_fig.savefig.side_effect = lambda buffer, **kwargs: buffer.write(b"png")
+        cache = ChartCache()
+        
+        display_history_chart(self.make_chart_data(), cache=cache)
+        display_history_chart(self.make_chart_data(), cache=cache)
+        
+        mock_plt.subplots.assert_called_once()
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual([call.args[0] for call in st.image.call_args_list], [b"png", b"png"])
+        
+        # Changed data renders a new image
+        display_history_chart(self.make_chart_data(consumed=(80.0, 90.0, 101.0)), cache=cache)
+        self.assertEqual(mock_plt.subplots.call_count, 2)
+        self.assertEqual(len(cache), 2)
 
+    @patch('app.plt')
+    def test_display_history_chart_altair_backend(self, mock_plt):
+        """Test that the altair backend sends only the daily series to the browser."""
+        st.radio.return_value = "10 days"
+        db = MagicMock()
+        
+        display_history_chart(self.make_chart_data(), db=db, backend="altair")
+        
+        mock_plt.subplots.assert_not_called()
+        db.get_daily_consumption.assert_not_called()
+        st.altair_chart.assert_called_once()
+        
+        spec = st.altair_chart.call_args.args[0].to_dict()
+        rows = next(iter(spec["datasets"].values()))
+        yesterday = (self.today - datetime.timedelta(days=1)).isoformat()
+        self.assertEqual(
+            sorted((row["cat_name"], row["date"], row["consumed"]) for row in rows),
+            sorted((cat, yesterday, value) for cat, value in zip(CATS, [80.0, 90.0, 100.0]))
+        )
+        
+        # Bars use the cat colors and carry value labels
+        color_scale = spec["layer"][0]["encoding"]["color"]["scale"]
+        self.assertEqual(color_scale["range"], [CAT_COLORS[cat] for cat in CATS])
+        self.assertEqual(len(spec["layer"]), 2)
+    
+    def test_display_history_chart_altair_wide_range(self):
+        """Test that ranges beyond the snapshot are read from the daily rollup without a consumption matrix."""
+        st.radio.return_value = "1 year"
+        db = MagicMock()
+        db.matrix = None
+        db.get_daily_consumption.return_value = {}
+        
+        display_history_chart(self.make_chart_data(), db=db, backend="altair")
+        
+        db.get_daily_consumption.assert_called_once_with(
+            (self.today - datetime.timedelta(days=364)).isoformat(), self.today.isoformat()
+        )
+        st.altair_chart.assert_called_once()
+    
+    def test_display_history_chart_altair_matrix(self):
+        """Test that ranges beyond the snapshot are sliced from the consumption matrix."""
+        st.radio.return_value = "1 year"
+        old_date = (self.today - datetime.timedelta(days=200)).isoformat()
+        with TemporaryDirectory() as temp_dir:
+            db = CatWeightDatabase(os.path.join(temp_dir, "chart.db"),
+                                   matrix=ConsumptionMatrix(os.path.join(temp_dir, "chart_matrix.npy")))
+            db.update_remaining_weight(db.add_entry("Lola", 100.0, old_date), 45.0)
+            
+            with patch.object(db, "get_daily_consumption") as get_daily_consumption:
+                display_history_chart(self.make_chart_data(), db=db, backend="altair")
+            db.close()
+        
+        get_daily_consumption.assert_not_called()
+        spec = st.altair_chart.call_args.args[0].to_dict()
+        rows = next(iter(spec["datasets"].values()))
+        self.assertEqual([(row["cat_name"], row["date"], row["consumed"]) for row in rows], [("Lola", old_date, 55.0)])
+    
+    @patch("app.load_dashboard_data")
+    def test_fragments_share_full_run_data(self, mock_load):
+        """Test that a full run loads the data once for all fragments and a lone fragment rerun loads its own."""
+        db = MagicMock()
+        mock_load.side_effect = lambda db, **kwargs: object()
+        
+        with full_run_data(db) as data:
+            self.assertIs(fragment_data(db), data)
+            self.assertIs(fragment_data(db, window_days=0, stats_windows=()), data)
+        self.assertEqual(mock_load.call_count, 1)
+        
+        self.assertIsNot(fragment_data(db, window_days=0), data)
+        mock_load.assert_called_with(db, window_days=0)
+    
+    @patch("app.get_asset_cache")
+    def test_setup_page_injects_stylesheet(self, mock_get_asset_cache):
+        """Test that the page styling is a single style tag without scripts."""
+        mock_get_asset_cache.return_value = AssetCache()
+        
+        setup_page()
+        
+        st.html.assert_called_once()
+        body = st.html.call_args[0][0]
+        self.assertTrue(body.startswith("<style>.main-header"))
+        self.assertTrue(body.endswith("</style>"))
+        self.assertNotIn("<script", body)
+        st.markdown.assert_not_called()
+    
+    def test_record_initial_weight_reruns_entry_fragments(self):
+        """Test that a new entry reruns only the fragments showing entries."""
+        db = MagicMock()
+        input_key = "quick_initial_Lola_2026-10-17"
+        session_state = {input_key: 80.0}
+        
+        with patch.object(st, "session_state", session_state):
+            record_initial_weight(db, "Lola", "2026-10-17", input_key)
+        
+        db.add_entry.assert_called_once_with("Lola", 80.0, "2026-10-17")
+        st.rerun.assert_called_once_with(scope=["status", "input_panel", "cat_cards"])
+        self.assertNotIn(input_key, session_state)
+    
+    def test_record_initial_weight_rejects_zero(self):
+        """Test that an empty input shows an error without writing."""
+        db = MagicMock()
+        session_state = {"quick_initial_Lola_2026-10-17": 0.0}
+        
+        with patch.object(st, "session_state", session_state):
+            record_initial_weight(db, "Lola", "2026-10-17", "quick_initial_Lola_2026-10-17")
+        
+        db.add_entry.assert_not_called()
+        st.rerun.assert_not_called()
+        self.assertEqual(session_state["input_error_Lola"], "Enter weight > 0")
+    
+    def test_record_remaining_weight_reruns_consumption_fragments(self):
+        """Test that completing an entry also reruns the chart and statistics."""
+        db = MagicMock()
+        db.update_remaining_weight.return_value = True
+        input_key = "quick_remaining_Mittens_7_2026-10-17"
+        
+        with patch.object(st, "session_state", {input_key: 25.0}):
+            record_remaining_weight(db, "Mittens", 7, input_key)
+        
+        db.update_remaining_weight.assert_called_once_with(7, 25.0)
+        st.rerun.assert_called_once_with(
+            scope=["status", "input_panel", "cat_cards", "history", "stats_7days", "stats_30days"]
+        )
+    
+    def test_delete_archived_day_shows_error(self):
+        """Test that resetting an archived day shows an error instead of failing."""
+        db = MagicMock()
+        db.delete_entries_by_date.side_effect = ValueError("archived")
+        session_state = {"selected_date": datetime.date(2020, 1, 1), "confirm_day_reset": True}
+        
+        with patch.object(st, "session_state", session_state):
+            delete_selected_day(db)
+        
+        st.rerun.assert_not_called()
+        self.assertFalse(session_state["confirm_day_reset"])
+        self.assertIn("archived", session_state["day_reset_error"])
+    
+    def test_record_batch_single_transaction(self):
+        """Test that a batch submission writes all weights with one commit."""
+        with TemporaryDirectory() as temp_dir:
+            db = CatWeightDatabase(os.path.join(temp_dir, "batch.db"))
+            open_id = db.add_entry("Mittens", 100.0, "2026-10-17")
+            session_state = {
+                "batch_initial_Mittens_2026-10-17": 90.0,
+                "batch_initial_Cheddar_2026-10-17": 0.0,
+                "batch_initial_Lola_2026-10-17": 80.0,
+                f"batch_remaining_{open_id}": 30.0,
+            }
+            
+            statements = []
+            db.conn.set_trace_callback(statements.append)
+            with patch.object(st, "session_state", session_state):
+                record_batch(db, "2026-10-17", CATS, [open_id])
+            
+            entries = db.get_entries_by_date_range("2026-10-17", "2026-10-17")
+            db.close()
+        
+        self.assertEqual(sorted((e["cat_name"], e["initial_weight"], e["remaining_weight"]) for e in entries), [
+            ("Lola", 80.0, None), ("Mittens", 90.0, None), ("Mittens", 100.0, 30.0),
+        ])
+        self.assertEqual([statement for statement in statements if statement in ("BEGIN IMMEDIATE", "COMMIT")], ["BEGIN IMMEDIATE", "COMMIT"])
+        st.rerun.assert_called_once_with(
+            scope=["status", "input_panel", "cat_cards", "history", "stats_7days", "stats_30days"]
+        )
+        self.assertEqual(session_state, {})
+    
+    def test_cat_colors_and_pages(self):
+        """Test that cats without a color get a stable palette color and are paged in order."""
+        cats = [{"id": cat_id, "name": f"Cat {cat_id}", "color": None, "image": None} for cat_id in range(1, 15)]
+        cats[0]["color"] = "#123456"
+        
+        self.assertEqual(cat_color(cats[0]), "#123456")
+        self.assertEqual(cat_color(cats[1]), cat_color(dict(cats[1])))
+        self.assertNotEqual(cat_color(cats[1]), cat_color(cats[2]))
+        self.assertEqual(cat_color({"name": "Stray"}), cat_color({"name": "Stray", "id": None}))
+        
+        pages = cat_pages(cats, per_page=6)
+        self.assertEqual([len(page) for page in pages], [6, 6, 2])
+        self.assertEqual([cat for page in pages for cat in page], cats)
+        self.assertEqual(cat_pages([]), [[]])
 
 if __name__ == "__main__":
     unittest.main() 
\ No newline at end of file
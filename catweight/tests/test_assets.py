@@ -0,0 +1,79 @@
+"""
+Unit tests for the static asset cache.
+"""
+import unittest
+import os
+import sys
+import base64
+from tempfile import TemporaryDirectory
+
+# Add the parent directory to the path so we can import the assets module
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from assets import AssetCache, STATIC_DIR
+
+
+class TestAssetCache(unittest.TestCase):
+    """Tests for the AssetCache class."""
+
+    def setUp(self):
+        """Set up a cache over a temporary directory with one image."""
+        self.temp_dir = TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "cat.png")
+        self.write(b"first", mtime_ns=1_000_000_000)
+        self.assets = AssetCache(self.temp_dir.name)
+
+    def tearDown(self):
+        """Clean up the temporary directory."""
+        self.temp_dir.cleanup()
+
+    def write(self, content, mtime_ns):
+        """Write the image with a fixed modification time."""
+        with open(self.path, "wb") as image_file:
+            image_file.write(content)
+        os.utime(self.path, ns=(mtime_ns, mtime_ns))
+
+    def test_data_uri_encoded_once(self):
+        """Test that an unchanged file is read and encoded only once."""
+        expected = "data:image/png;base64," + base64.b64encode(b"first").decode()
+
+        self.assertEqual(self.assets.data_uri("cat.png"), expected)
+        self.assertEqual(self.assets.data_uri("cat.png"), expected)
+        self.assertEqual((self.assets.misses, self.assets.hits), (1, 1))
+
+    def test_data_uri_reloaded_after_change(self):
+        """Test that a file is encoded again once its mtime changes."""
+        self.assets.data_uri("cat.png")
+        self.write(b"second", mtime_ns=2_000_000_000)
+
+        self.assertEqual(
+            self.assets.data_uri("cat.png"),
+            "data:image/png;base64," + base64.b64encode(b"second").decode(),
+        )
+        self.assertEqual(self.assets.misses, 2)
+
+    def test_text_cached_separately(self):
+        """Test that text and data URI lookups of one file do not collide."""
+        self.assertEqual(self.assets.text("cat.png"), "first")
+        self.assertTrue(self.assets.data_uri("cat.png").startswith("data:image/png;base64,"))
+        self.assertEqual(self.assets.text("cat.png"), "first")
+        self.assertEqual((self.assets.misses, self.assets.hits), (2, 1))
+
+    def test_static_url_versioned_by_mtime(self):
+        """Test that static URLs change when the file changes."""
+        self.assertEqual(self.assets.static_url("cat.png"), "app/static/cat.png?v=1000000000")
+        self.write(b"second", mtime_ns=2_000_000_000)
+        self.assertEqual(self.assets.static_url("cat.png"), "app/static/cat.png?v=2000000000")
+
+    def test_missing_file(self):
+        """Test that a missing file gives an empty string."""
+        self.assertEqual(self.assets.data_uri("dog.png"), "")
+        self.assertEqual(self.assets.static_url("dog.png"), "")
+
+    def test_app_assets_present(self):
+        """Test that every image and the stylesheet are in the served directory."""
+        for name in ["mittens.png", "cheddar.png", "lola.png", "style.css"]:
+            self.assertTrue(os.path.exists(os.path.join(STATIC_DIR, name)))
+
+
+if __name__ == "__main__":
+    unittest.main()
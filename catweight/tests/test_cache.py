@@ -0,0 +1,192 @@
+"""
+Unit tests for the query cache and cached database reads.
+"""
+import unittest
+import os
+import sys
+import datetime
+from unittest.mock import patch
+from tempfile import TemporaryDirectory
+
+# Add the parent directory to the path so we can import the cache module
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from cache import QueryCache
+from db import CatWeightDatabase
+from pool import ConnectionPool
+
+
+class FakeClock:
+    """Manually advanced time source."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestQueryCache(unittest.TestCase):
+    """Tests for the QueryCache class."""
+
+    def setUp(self):
+        """Set up a small cache with a controllable clock."""
+        self.clock = FakeClock()
+        self.cache = QueryCache(max_entries=2, ttl=10.0, clock=self.clock)
+
+    def test_lru_eviction(self):
+        """Test that the least recently used result is evicted first."""
+        for key in ["a", "b"]:
+            self.cache.put("db", key, key.upper(), generation=0)
+        self.cache.get("db", "a")
+        self.cache.put("db", "c", "C", generation=0)
+
+        self.assertEqual(self.cache.get("db", "a"), (True, "A"))
+        self.assertEqual(self.cache.get("db", "b"), (False, None))
+        self.assertEqual(self.cache.get("db", "c"), (True, "C"))
+
+    def test_ttl_expiry(self):
+        """Test that results expire after the TTL."""
+        self.cache.put("db", "a", 1, generation=0)
+        self.clock.now = 9.9
+        self.assertEqual(self.cache.get("db", "a"), (True, 1))
+        self.clock.now = 10.0
+        self.assertEqual(self.cache.get("db", "a"), (False, None))
+
+    def test_invalidation_by_generation(self):
+        """Test that invalidation hides earlier results and rejects stale puts."""
+        self.cache.put("db", "a", 1, generation=0)
+        self.cache.put("other", "a", 2, generation=0)
+        self.cache.invalidate("db")
+
+        self.assertEqual(self.cache.get("db", "a"), (False, None))
+        self.assertEqual(self.cache.get("other", "a"), (True, 2))
+
+        # A query that started before the write must not repopulate the cache
+        self.cache.put("db", "a", 1, generation=0)
+        self.assertEqual(self.cache.get("db", "a"), (False, None))
+
+
+class TestCachedDatabase(unittest.TestCase):
+    """Tests for CatWeightDatabase reads served through a QueryCache."""
+
+    def setUp(self):
+        """Set up two pooled instances sharing one cache."""
+        self.temp_dir = TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, "cache.db")
+        self.cache = QueryCache()
+        self.pool = ConnectionPool(self.db_path, max_size=2)
+        self.db = CatWeightDatabase(pool=self.pool, cache=self.cache, data_version_interval=3600)
+        self.statements = []
+
+    def tearDown(self):
+        """Clean up after each test."""
+        self.db.close()
+        self.pool.close()
+        self.temp_dir.cleanup()
+
+    def count_selects(self):
+        """Trace statements on every pooled connection opened so far."""
+        with self.pool.connection() as conn:
+            conn.set_trace_callback(self.statements.append)
+        return lambda: len([s for s in self.statements if s.startswith("SELECT")])
+
+    def test_repeated_reads_hit_cache(self):
+        """Test that repeated reads are served without querying SQLite."""
+        self.db.add_entry("Lola", 100.0, "2023-01-01")
+        selects = self.count_selects()
+
+        for _ in range(5):
+            entries = self.db.get_entries_by_date_range("2023-01-01", "2023-01-31")
+            self.db.get_daily_consumption("2023-01-01", "2023-01-31")
+
+        self.assertEqual(len(entries), 1)
+        self.assertEqual(selects(), 2)
+        self.assertEqual(self.cache.hits, 8)
+
+    def test_writes_are_visible_immediately(self):
+        """Test that every write path invalidates cached reads."""
+        entry_id = self.db.add_entry("Lola", 100.0, "2023-01-01")
+        read = lambda: self.db.get_daily_consumption("2023-01-01", "2023-01-31")
+
+        self.assertEqual(read()["Lola"]["2023-01-01"]["open_count"], 1)
+
+        self.db.update_remaining_weight(entry_id, 40.0)
+        self.assertEqual(read()["Lola"]["2023-01-01"]["consumed"], 60.0)
+
+        self.db.add_entries_bulk([{"cat_name": "Lola", "initial_weight": 50.0, "date": "2023-01-02"}])
+        self.assertIn("2023-01-02", read()["Lola"])
+
+        self.db.delete_entries_by_date("2023-01-02")
+        self.assertNotIn("2023-01-02", read()["Lola"])
+
+        self.db.reset_database()
+        self.assertEqual(read(), {})
+
+    def test_writes_from_other_instances(self):
+        """Test invalidation by instances sharing the cache and by outside writers."""
+        other = CatWeightDatabase(self.db_path, cache=self.cache)
+        outsider = CatWeightDatabase(self.db_path)
+        try:
+            self.assertEqual(self.db.get_entries_by_date_range("2023-01-01", "2023-01-31"), [])
+
+            # Same process and cache: the shared generation is bumped
+            other.add_entry("Lola", 100.0, "2023-01-01")
+            self.assertEqual(len(self.db.get_entries_by_date_range("2023-01-01", "2023-01-31")), 1)
+
+            # No shared cache: detected through PRAGMA data_version
+            outsider.add_entry("Lola", 100.0, "2023-01-02")
+            self.assertEqual(len(self.db.get_entries_by_date_range("2023-01-01", "2023-01-31")), 1)
+            self.db.data_version_interval = 0
+            self.assertEqual(len(self.db.get_entries_by_date_range("2023-01-01", "2023-01-31")), 2)
+        finally:
+            outsider.close()
+            other.close()
+
+    def test_snapshot_bypasses_cache(self):
+        """Test that reads inside snapshot() neither use nor fill the cache."""
+        other = CatWeightDatabase(self.db_path, cache=self.cache)
+        try:
+            with self.db.snapshot():
+                self.assertEqual(self.db.get_entries_by_date_range("2023-01-01", "2023-01-31"), [])
+                other.add_entry("Lola", 100.0, "2023-01-01")
+                # Read from the snapshot, which predates the write
+                self.assertEqual(self.db.get_daily_consumption("2023-01-01", "2023-01-31"), {})
+            self.assertEqual(self.cache.hits, 0)
+
+            self.assertIn("Lola", self.db.get_daily_consumption("2023-01-01", "2023-01-31"))
+        finally:
+            other.close()
+
+    def test_cached_results_are_copies(self):
+        """Test that changing a returned result does not change what later reads get."""
+        self.db.add_entry("Lola", 100.0, "2023-01-01")
+
+        first = self.db.get_daily_consumption("2023-01-01", "2023-01-31")
+        first["Lola"]["2023-01-01"]["open_count"] = 99
+        second = self.db.get_daily_consumption("2023-01-01", "2023-01-31")
+        second.clear()
+
+        self.assertEqual(self.db.get_daily_consumption("2023-01-01", "2023-01-31")["Lola"]["2023-01-01"]["open_count"], 1)
+        self.assertEqual(self.cache.hits, 2)
+
+    def test_last_30_days_follow_the_date(self):
+        """Test that the last 30 days read after midnight are not served from the previous day."""
+        self.db.add_entry("Lola", 100.0, "2023-01-01")
+
+        class Today(datetime.date):
+            current = datetime.date(2023, 1, 31)
+
+            @classmethod
+            def today(cls):
+                return cls.current
+
+        with patch("datetime.date", Today):
+            self.assertEqual(len(self.db.get_last_30_days_data()["Lola"]), 1)
+            self.assertEqual(len(self.db.get_last_30_days_data()["Lola"]), 1)
+            Today.current = datetime.date(2023, 2, 1)
+            self.assertEqual(self.db.get_last_30_days_data()["Lola"], [])
+        self.assertEqual(self.cache.hits, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+"""
+Unit tests for the per-run dashboard data snapshot.
+"""
+import unittest
+import os
+import sys
+import datetime
+from tempfile import TemporaryDirectory
+
+# Add the parent directory to the path so we can import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from db import CatWeightDatabase
+from dashboard_data import DashboardData
+
+
+class TestDashboardData(unittest.TestCase):
+    """Tests for the DashboardData class."""
+
+    def setUp(self):
+        """Set up a temporary database with a few days of entries."""
+        self.temp_dir = TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, "dashboard.db")
+        self.db = CatWeightDatabase(self.db_path)
+
+        self.today = datetime.date.today()
+        for days_ago in range(5):
+            date = (self.today - datetime.timedelta(days=days_ago)).isoformat()
+            for cat in ["Mittens", "Cheddar", "Lola"]:
+                entry_id = self.db.add_entry(cat, 100.0, date)
+                if days_ago:
+                    self.db.update_remaining_weight(entry_id, 40.0)
+
+        self.old_date = self.today - datetime.timedelta(days=90)
+        self.db.add_entry("Lola", 80.0, self.old_date.isoformat())
+
+    def tearDown(self):
+        """Clean up after each test."""
+        self.db.close()
+        self.temp_dir.cleanup()
+
+    def test_load_uses_constant_number_of_queries(self):
+        """Test that loading the snapshot issues a fixed, small number of queries."""
+        statements = []
+        self.db.conn.set_trace_callback(statements.append)
+
+        DashboardData.load(self.db, today=self.today)
+        DashboardData.load(self.db, today=self.today, selected_date=self.old_date)
+
+        selects = [s for s in statements if s.lstrip().upper().startswith("SELECT")]
+        # Two queries per running statistics window on top of the cats and
+        # entry reads, however many cats there are
+        self.assertEqual(len(selects), (3 + 2 * 2) + (4 + 2 * 2))
+
+    def test_slices_match_database_queries(self):
+        """Test that snapshot slices return what the database would."""
+        data = DashboardData.load(self.db, today=self.today)
+        week_ago = (self.today - datetime.timedelta(days=7)).isoformat()
+        today = self.today.isoformat()
+
+        self.assertEqual(
+            data.entries(week_ago, today, "Lola"),
+            self.db.get_entries_by_date_range(week_ago, today, "Lola")
+        )
+        self.assertEqual(data.open_entries("Mittens"), self.db.get_todays_open_entries("Mittens"))
+        self.assertEqual(data.daily_consumption(week_ago, today), self.db.get_daily_consumption(week_ago, today))
+        last_week = (self.today - datetime.timedelta(days=6)).isoformat()
+        self.assertEqual(data.running_stats(last_week, today), self.db.get_running_stats(last_week, today))
+        self.assertIsNone(data.running_stats(week_ago, today))
+
+        # Selected dates outside the window are loaded too
+        data = DashboardData.load(self.db, today=self.today, selected_date=self.old_date)
+        self.assertEqual(len(data.open_entries("Lola", self.old_date.isoformat())), 1)
+
+    def test_snapshot_ignores_concurrent_writes(self):
+        """Test that reads inside a snapshot do not see commits made meanwhile."""
+        writer = CatWeightDatabase(self.db_path)
+        today = self.today.isoformat()
+        try:
+            with self.db.snapshot():
+                before = self.db.get_entries_by_date_range(today, today)
+                writer.add_entry("Lola", 120.0, today)
+                self.assertEqual(self.db.get_entries_by_date_range(today, today), before)
+        finally:
+            writer.close()
+
+        self.assertEqual(len(self.db.get_entries_by_date_range(today, today)), len(before) + 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,13 +5,15 @@ import unittest
 import os
 import sqlite3
 import datetime
+import shutil
 from tempfile import NamedTemporaryFile
 import sys
 import os
 
 # Add the parent directory to the path so we can import the db module
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from db import CatWeightDatabase
+from db import CatWeightDatabase, MIGRATIONS, SCHEMA_VERSION, ENTRY_SELECT, CAT_ID_SQL
+from tuning import ConnectionProfile, PROFILES, get_profile
 
 
 class TestCatWeightDatabase(unittest.TestCase):
@@ -125,6 +127,546 @@ class TestCatWeightDatabase(unittest.TestCase):
             self.assertEqual(data[cat][0]["initial_weight"], 100.0)
             self.assertEqual(data[cat][0]["remaining_weight"], 30.0)
 
+    
+    def test_get_daily_consumption(self):
+        """Test aggregating consumption and entry counts per cat and day."""
+        # Two completed entries and one open entry for Lola on the same day
+        entry1_id = self.db.add_entry("Lola", 120.0, "2023-01-01")
+        entry2_id = self.db.add_entry("Lola", 80.0, "2023-01-01")
+        self.db.add_entry("Lola", 100.0, "2023-01-01")
+        self.db.update_remaining_weight(entry1_id, 20.0)
+        self.db.update_remaining_weight(entry2_id, 30.0)
+        
+        # A single open entry for Mittens, and one outside the range
+        self.db.add_entry("Mittens", 110.0, "2023-01-02")
+        self.db.add_entry("Mittens", 110.0, "2023-01-05")
+        
+        daily = self.db.get_daily_consumption("2023-01-01", "2023-01-03")
+        
+        self.assertEqual(set(daily), {"Lola", "Mittens"})
+        lola_day = daily["Lola"]["2023-01-01"]
+        self.assertEqual(lola_day["consumed"], 150.0)
+        self.assertEqual(lola_day["entry_count"], 3)
+        self.assertEqual(lola_day["open_count"], 1)
+        self.assertEqual(lola_day["complete_count"], 2)
+        
+        mittens_day = daily["Mittens"]["2023-01-02"]
+        self.assertEqual(mittens_day["consumed"], 0)
+        self.assertEqual(mittens_day["open_count"], 1)
+        self.assertEqual(list(daily["Mittens"]), ["2023-01-02"])
+        
+        # Filtering by cat name
+        daily = self.db.get_daily_consumption("2023-01-01", "2023-01-03", "Mittens")
+        self.assertEqual(list(daily), ["Mittens"])
+
+    
+    def test_get_entries_as_arrays(self):
+        """Test retrieving a date range as typed NumPy columns."""
+        import numpy as np
+        
+        entry_id = self.db.add_entry("Lola", 120.0, "2023-01-01")
+        self.db.update_remaining_weight(entry_id, 20.0)
+        self.db.add_entry("Mittens", 110.0, "2023-01-02")
+        
+        arrays = self.db.get_entries_by_date_range("2023-01-01", "2023-01-31", result_format="arrays")
+        
+        self.assertEqual(arrays["date"].dtype, np.dtype("datetime64[D]"))
+        self.assertEqual(arrays["initial_weight"].dtype, np.float64)
+        self.assertEqual(list(arrays["cat_name"]), ["Mittens", "Lola"])
+        self.assertTrue(np.isnan(arrays["remaining_weight"][0]))
+        self.assertEqual(arrays["remaining_weight"][1], 20.0)
+        self.assertEqual(arrays["date"][1], np.datetime64("2023-01-01"))
+        
+        # Empty ranges keep their column dtypes
+        empty = self.db.get_entries_by_date_range("2024-01-01", "2024-01-31", result_format="arrays")
+        self.assertEqual(len(empty["id"]), 0)
+        self.assertEqual(empty["date"].dtype, np.dtype("datetime64[D]"))
+    
+    def test_get_last_30_days_as_dataframes(self):
+        """Test retrieving the last 30 days as one DataFrame per cat."""
+        import pandas as pd
+        
+        yesterday = (datetime.date.today() - datetime.timedelta(days=1)).isoformat()
+        entry_id = self.db.add_entry("Cheddar", 100.0, yesterday)
+        self.db.update_remaining_weight(entry_id, 30.0)
+        
+        data = self.db.get_last_30_days_data(result_format="dataframe")
+        
+        frame = data["Cheddar"]
+        self.assertEqual(str(frame["cat_name"].dtype), "category")
+        self.assertTrue(pd.api.types.is_datetime64_any_dtype(frame["date"]))
+        self.assertEqual((frame["initial_weight"] - frame["remaining_weight"]).sum(), 70.0)
+        self.assertTrue(data["Lola"].empty)
+        
+        with self.assertRaises(ValueError):
+            self.db.get_entries_by_date_range("2023-01-01", "2023-01-31", result_format="xml")
+    
+    def test_iter_entries(self):
+        """Test streaming a date range in batches and resuming a scan."""
+        entry_ids = self.db.add_entries_bulk(
+            {"cat_name": cat, "initial_weight": 100.0, "date": f"2023-01-0{day}"}
+            for day in [3, 1, 2]
+            for cat in ["Lola", "Mittens"]
+        )
+        
+        entries = list(self.db.iter_entries("2023-01-01", "2023-01-31", batch_size=2))
+        
+        self.assertEqual(len(entries), 6)
+        self.assertEqual(
+            [(e["date"], e["id"]) for e in entries],
+            sorted((e["date"], e["id"]) for e in entries)
+        )
+        
+        # Filter by cat and resume after the first entry
+        lola = list(self.db.iter_entries("2023-01-01", "2023-01-31", "Lola", batch_size=1))
+        self.assertEqual([e["date"] for e in lola], ["2023-01-01", "2023-01-02", "2023-01-03"])
+        resumed = list(self.db.iter_entries(
+            "2023-01-01", "2023-01-31", "Lola", batch_size=1, after=(lola[0]["date"], lola[0]["id"])
+        ))
+        self.assertEqual(resumed, lola[1:])
+        self.assertEqual({e["id"] for e in entries}, set(entry_ids))
+    
+    def test_add_entries_bulk(self):
+        """Test adding entries from a generator across several chunks."""
+        existing_id = self.db.add_entry("Mittens", 90.0, "2023-01-01")
+        
+        def readings():
+            for day in range(1, 8):
+                yield {
+                    "cat_name": "Lola",
+                    "initial_weight": 100.0 + day,
+                    "date": f"2023-02-{day:02d}",
+                    "remaining_weight": 20.0 if day % 2 else None,
+                }
+        
+        entry_ids = self.db.add_entries_bulk(readings(), chunk_size=3)
+        
+        self.assertEqual(len(entry_ids), 7)
+        self.assertNotIn(existing_id, entry_ids)
+        for day, entry_id in enumerate(entry_ids, start=1):
+            entry = self.db.get_entry(entry_id)
+            self.assertEqual(entry["date"], f"2023-02-{day:02d}")
+            self.assertEqual(entry["initial_weight"], 100.0 + day)
+            self.assertEqual(entry["remaining_weight"], 20.0 if day % 2 else None)
+    
+    def test_add_entries_bulk_rolls_back_on_error(self):
+        """Test that a failing bulk insert leaves no partial data behind."""
+        entries = [
+            {"cat_name": "Lola", "initial_weight": 100.0, "date": "2023-02-01"},
+            {"cat_name": "Lola", "date": "2023-02-02"},  # missing initial_weight
+        ]
+        
+        with self.assertRaises(KeyError):
+            self.db.add_entries_bulk(entries, chunk_size=1)
+        
+        self.assertEqual(self.db.get_entries_by_date_range("2023-01-01", "2023-12-31"), [])
+    
+    def test_update_remaining_weights_bulk(self):
+        """Test closing many entries in one call."""
+        entry_ids = self.db.add_entries_bulk(
+            {"cat_name": cat, "initial_weight": 100.0, "date": "2023-03-01"}
+            for cat in ["Mittens", "Cheddar", "Lola"]
+        )
+        
+        updated = self.db.update_remaining_weights_bulk(
+            [(entry_id, 10.0 * i) for i, entry_id in enumerate(entry_ids)] + [(9999, 5.0)],
+            chunk_size=2
+        )
+        
+        self.assertEqual(updated, 3)
+        for i, entry_id in enumerate(entry_ids):
+            self.assertEqual(self.db.get_entry(entry_id)["remaining_weight"], 10.0 * i)
+    
+    def test_daily_rollup_tracks_writes(self):
+        """Test that the daily_consumption rollup follows inserts, updates and deletes."""
+        entry1_id = self.db.add_entry("Lola", 120.0, "2023-01-01")
+        entry2_id = self.db.add_entry("Lola", 80.0, "2023-01-01")
+        self.db.update_remaining_weight(entry1_id, 20.0)
+        
+        day = self.db.get_daily_consumption("2023-01-01", "2023-01-01")["Lola"]["2023-01-01"]
+        self.assertEqual((day["consumed"], day["complete_count"], day["open_count"]), (100.0, 1, 1))
+        
+        self.db.update_remaining_weight(entry2_id, 50.0)
+        day = self.db.get_daily_consumption("2023-01-01", "2023-01-01")["Lola"]["2023-01-01"]
+        self.assertEqual(day["consumed"], 130.0)
+        self.assertEqual((day["min_consumed"], day["max_consumed"]), (30.0, 100.0))
+        self.assertEqual((day["initial_total"], day["remaining_total"]), (200.0, 70.0))
+        
+        # Moving an entry to another day updates both buckets
+        self.db.cursor.execute("UPDATE cat_weights SET date = '2023-01-02' WHERE id = ?", (entry2_id,))
+        self.db.conn.commit()
+        daily = self.db.get_daily_consumption("2023-01-01", "2023-01-02")["Lola"]
+        self.assertEqual(daily["2023-01-01"]["consumed"], 100.0)
+        self.assertEqual(daily["2023-01-02"]["consumed"], 30.0)
+        
+        self.db.delete_entries_by_date("2023-01-01")
+        self.assertEqual(list(self.db.get_daily_consumption("2023-01-01", "2023-01-02")["Lola"]), ["2023-01-02"])
+        self.assertEqual(self.db.check_daily_consumption(), [])
+    
+    def test_rebuild_and_check_daily_rollup(self):
+        """Test detecting and repairing a rollup that drifted from the raw entries."""
+        entry_id = self.db.add_entry("Mittens", 100.0, "2023-01-01")
+        self.db.update_remaining_weight(entry_id, 40.0)
+        self.db.add_entry("Cheddar", 90.0, "2023-01-02")
+        
+        self.db.cursor.execute(f"UPDATE daily_consumption SET consumed = 1 WHERE cat_id = {CAT_ID_SQL}", ("Mittens",))
+        self.db.cursor.execute(f"DELETE FROM daily_consumption WHERE cat_id = {CAT_ID_SQL}", ("Cheddar",))
+        self.db.conn.commit()
+        
+        mismatches = self.db.check_daily_consumption()
+        self.assertEqual([(m["cat_name"], m["date"]) for m in mismatches],
+                         [("Cheddar", "2023-01-02"), ("Mittens", "2023-01-01")])
+        self.assertIsNone(mismatches[0]["actual"])
+        
+        self.assertEqual(self.db.rebuild_daily_consumption(), 2)
+        self.assertEqual(self.db.check_daily_consumption(), [])
+        self.assertEqual(self.db.get_daily_consumption("2023-01-01", "2023-01-01")["Mittens"]["2023-01-01"]["consumed"], 60.0)
+    
+    def test_migrations_applied(self):
+        """Test that a new database is created at the latest schema version."""
+        self.assertEqual(self.db.get_schema_version(), SCHEMA_VERSION)
+        
+        # Running the migrations again is a no-op
+        self.assertEqual(self.db.migrate(), SCHEMA_VERSION)
+        
+        self.db.cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index'")
+        indexes = {row["name"] for row in self.db.cursor.fetchall()}
+        self.assertIn("idx_cat_weights_cat_date", indexes)
+        self.assertIn("idx_cat_weights_open", indexes)
+    
+    def test_migrate_unversioned_database(self):
+        """Test upgrading a database created before schema versioning."""
+        self.db.close()
+        os.unlink(self.db_path)
+        
+        # Recreate the original schema with some data and no user_version
+        conn = sqlite3.connect(self.db_path)
+        conn.execute(
+            "CREATE TABLE cat_weights (id INTEGER PRIMARY KEY AUTOINCREMENT, cat_name TEXT NOT NULL, "
+            "date TEXT NOT NULL, initial_weight REAL NOT NULL, remaining_weight REAL, created_at TEXT NOT NULL)"
+        )
+        conn.execute(
+            "INSERT INTO cat_weights (cat_name, date, initial_weight, created_at) "
+            "VALUES ('Lola', '2023-01-01', 100.0, '2023-01-01T08:00:00')"
+        )
+        conn.commit()
+        conn.close()
+        
+        self.db = CatWeightDatabase(self.db_path)
+        
+        self.assertEqual(self.db.get_schema_version(), SCHEMA_VERSION)
+        self.assertEqual(len(self.db.get_entries_by_date_range("2023-01-01", "2023-01-01")), 1)
+    
+    def test_migrate_to_cats_table(self):
+        """Test that upgrading to the cats table keeps entries, ids and derived tables."""
+        self.db.close()
+        os.unlink(self.db_path)
+        
+        # A database at schema version 6, where entries still carry the cat's name
+        conn = sqlite3.connect(self.db_path)
+        for statements in MIGRATIONS[:6]:
+            for statement in statements:
+                conn.execute(statement)
+        conn.executemany(
+            "INSERT INTO cat_weights (cat_name, date, initial_weight, remaining_weight, created_at) "
+            "VALUES (?, '2023-01-02', 100.0, ?, '2023-01-02T08:00:00')",
+            [("Lola", 40.0), ("Biscuit", 70.0), ("Lola", None)]
+        )
+        conn.execute("DELETE FROM cat_weights WHERE id = 3")
+        conn.execute("INSERT INTO scale_readings VALUES ('Biscuit', 1000, 5000)")
+        conn.execute("PRAGMA user_version = 6")
+        conn.commit()
+        conn.close()
+        
+        self.db = CatWeightDatabase(self.db_path)
+        
+        self.assertEqual(self.db.get_schema_version(), SCHEMA_VERSION)
+        self.assertEqual([cat["name"] for cat in self.db.get_cats()], ["Mittens", "Cheddar", "Lola", "Biscuit"])
+        self.assertEqual(self.db.get_entry(2)["cat_name"], "Biscuit")
+        self.assertEqual(self.db.get_daily_consumption("2023-01-02", "2023-01-02")["Lola"]["2023-01-02"]["consumed"], 60.0)
+        self.assertEqual(self.db.get_running_stats("2023-01-02", "2023-01-08")["Biscuit"].consumed, 30.0)
+        self.assertEqual(self.db.count_scale_readings(), 1)
+        self.assertEqual(self.db.check_daily_consumption(), [])
+        
+        # The id of the deleted entry is not handed out again
+        self.assertEqual(self.db.add_entry("Lola", 90.0, "2023-01-03"), 4)
+    
+    def test_cats(self):
+        """Test adding cats, paging through them, and adding unknown cats on write."""
+        self.assertEqual(self.db.count_cats(), 3)
+        mittens = self.db.get_cats(limit=1)[0]
+        self.assertEqual((mittens["name"], mittens["image"]), ("Mittens", "mittens.png"))
+        
+        biscuit_id = self.db.add_cat("Biscuit", color="#00C9A7")
+        self.assertEqual(self.db.add_cat("Biscuit", image="biscuit.png"), biscuit_id)
+        self.db.add_entry("Pepper", 80.0, "2023-01-01")
+        
+        cats = self.db.get_cats(offset=3)
+        self.assertEqual([(cat["name"], cat["color"], cat["image"]) for cat in cats],
+                         [("Biscuit", "#00C9A7", "biscuit.png"), ("Pepper", None, None)])
+        self.assertEqual(self.db.count_cats(), 5)
+    
+    def test_last_30_days_single_query(self):
+        """Test that the entries of all cats are read with one query."""
+        yesterday = (datetime.date.today() - datetime.timedelta(days=1)).isoformat()
+        self.db.add_entries_bulk(
+            {"cat_name": f"Cat {i}", "initial_weight": 100.0, "date": yesterday} for i in range(50)
+        )
+        
+        statements = []
+        self.db.conn.set_trace_callback(statements.append)
+        data = self.db.get_last_30_days_data()
+        self.db.conn.set_trace_callback(None)
+        
+        self.assertEqual(len(data), 53)
+        self.assertEqual([e["cat_name"] for e in data["Cat 7"]], ["Cat 7"])
+        self.assertEqual(data["Lola"], [])
+        self.assertEqual(len([s for s in statements if "FROM cat_weights" in s]), 1)
+    
+    def test_archive_entries(self):
+        """Test that old entries move to yearly archives and stay readable through them."""
+        self.addCleanup(shutil.rmtree, self.db.archive_dir, True)
+        for date in ["2023-03-01", "2024-12-31", "2025-06-01", "2026-10-01"]:
+            entry_id = self.db.add_entry("Lola", 100.0, date)
+            self.db.update_remaining_weight(entry_id, 40.0)
+        entries = self.db.get_entries_by_date_range("2000-01-01", "2030-12-31")
+        daily = self.db.get_daily_consumption("2000-01-01", "2030-12-31")
+        
+        self.assertEqual(self.db.archive_entries(365, today=datetime.date(2026, 10, 17)), 3)
+        self.assertEqual(self.db.archive_entries(365, today=datetime.date(2026, 10, 17)), 0)
+        self.assertEqual(list(self.db.archive_years()), ["2023", "2024", "2025"])
+        self.assertEqual(self.db.conn.execute("SELECT COUNT(*) FROM cat_weights").fetchone()[0], 1)
+        
+        # Multi-year reads and the rollup see the archived entries
+        self.assertEqual(self.db.get_entries_by_date_range("2000-01-01", "2030-12-31"), entries)
+        self.assertEqual([e["id"] for e in self.db.iter_entries("2000-01-01", "2030-12-31", batch_size=2)],
+                         sorted(e["id"] for e in entries))
+        self.assertEqual(self.db.get_daily_consumption("2000-01-01", "2030-12-31"), daily)
+        self.assertEqual(self.db.check_daily_consumption(), [])
+        self.db.rebuild_daily_consumption()
+        self.assertEqual(self.db.get_daily_consumption("2000-01-01", "2030-12-31"), daily)
+        with self.assertRaises(sqlite3.OperationalError):
+            self.db.conn.execute("DELETE FROM archive_2024.cat_weights")
+        
+        # Only archives overlapping the range are attached
+        db = CatWeightDatabase(self.db_path)
+        attached = lambda: [row[1] for row in db.conn.execute("PRAGMA database_list") if row[1].startswith("archive_")]
+        db.get_entries_by_date_range("2026-01-01", "2026-10-17")
+        self.assertEqual(attached(), [])
+        self.assertEqual(len(db.get_entries_by_date_range("2024-01-01", "2024-12-31", "Lola")), 1)
+        self.assertEqual(attached(), ["archive_2024"])
+        db.close()
+    
+    def test_writes_on_archived_days_keep_their_rollup(self):
+        """Test that writing entries on an archived day keeps the archived entries in its totals."""
+        self.addCleanup(shutil.rmtree, self.db.archive_dir, True)
+        for initial in (100.0, 110.0, 120.0):
+            entry_id = self.db.add_entry("Lola", initial, "2025-03-05")
+            self.db.update_remaining_weight(entry_id, initial - 80.0)
+        self.db.archive_entries(365, today=datetime.date(2026, 10, 17))
+        
+        entry_id = self.db.add_entry("Lola", 90.0, "2025-03-05")
+        day = self.db.get_daily_consumption("2025-03-05", "2025-03-05")["Lola"]["2025-03-05"]
+        self.assertEqual((day["consumed"], day["complete_count"], day["open_count"]), (240.0, 3, 1))
+        
+        self.db.update_remaining_weight(entry_id, 30.0)
+        self.db.add_entries_bulk([{"cat_name": "Lola", "initial_weight": 50.0, "remaining_weight": 10.0, "date": "2025-03-06"},
+                                  {"cat_name": "Lola", "initial_weight": 70.0, "remaining_weight": 20.0, "date": "2025-03-05"}])
+        self.db.update_remaining_weights_bulk([(entry_id, 40.0)])
+        day = self.db.get_daily_consumption("2025-03-05", "2025-03-05")["Lola"]["2025-03-05"]
+        self.assertEqual((day["consumed"], day["complete_count"], day["open_count"]), (340.0, 5, 0))
+        self.assertEqual(self.db.check_daily_consumption(), [])
+        
+        # The running statistics were kept current from the merged totals
+        stats = self.db.get_running_stats("2025-03-03", "2025-03-09")["Lola"]
+        self.db.rebuild_running_stats()
+        self.assertEqual(self.db.get_running_stats("2025-03-03", "2025-03-09")["Lola"], stats)
+        self.assertEqual(stats.consumed, 380.0)
+    
+    def test_archived_entries_are_read_only(self):
+        """Test that open entries stay in cat_weights and writes to archived entries fail loudly."""
+        self.addCleanup(shutil.rmtree, self.db.archive_dir, True)
+        archived_id = self.db.add_entry("Lola", 100.0, "2025-03-05")
+        self.db.update_remaining_weight(archived_id, 20.0)
+        open_id = self.db.add_entry("Lola", 90.0, "2025-03-05")
+        
+        self.assertEqual(self.db.archive_entries(365, today=datetime.date(2026, 10, 17)), 1)
+        self.assertEqual(self.db.conn.execute("SELECT id FROM cat_weights").fetchall()[0][0], open_id)
+        day = self.db.get_daily_consumption("2025-03-05", "2025-03-05")["Lola"]["2025-03-05"]
+        self.assertEqual((day["consumed"], day["complete_count"], day["open_count"]), (80.0, 1, 1))
+        self.assertEqual(self.db.check_daily_consumption(), [])
+        
+        # The open entry can still be completed; the archived one is found but cannot be changed
+        self.assertTrue(self.db.update_remaining_weight(open_id, 30.0))
+        self.assertEqual(self.db.get_entry(archived_id)["remaining_weight"], 20.0)
+        with self.assertRaises(ValueError):
+            self.db.update_remaining_weight(archived_id, 10.0)
+        with self.assertRaises(ValueError):
+            self.db.update_remaining_weights_bulk([(open_id, 10.0), (archived_id, 10.0)])
+        with self.assertRaises(ValueError):
+            self.db.delete_entries_by_date("2025-03-05")
+        self.assertFalse(self.db.update_remaining_weight(10_000, 10.0))
+        self.assertEqual(sorted(e["remaining_weight"] for e in self.db.get_entries_by_date_range("2025-03-05", "2025-03-05")),
+                         [20.0, 30.0])
+    
+    def test_archives_merge_beyond_attach_limit(self):
+        """Test that more than ten archived years are merged into at most ten readable archives."""
+        self.addCleanup(shutil.rmtree, self.db.archive_dir, True)
+        self.db.add_entries_bulk(
+            {"cat_name": "Lola", "initial_weight": 100.0, "remaining_weight": 40.0, "date": f"{year}-06-01"}
+            for year in range(2010, 2022)
+        )
+        other = CatWeightDatabase(self.db_path)
+        daily = self.db.get_daily_consumption("2000-01-01", "2030-12-31")
+        
+        self.assertEqual(self.db.archive_entries(365, today=datetime.date(2026, 10, 17)), 12)
+        self.assertEqual(len(self.db.archive_years()), 10)
+        self.assertEqual(self.db.archive_years()["2010"], ("2010-06-01", "2012-06-01"))
+        
+        # Every whole-history path reads all years
+        self.assertEqual(len(self.db.get_entries_by_date_range("2000-01-01", "2030-12-31")), 12)
+        self.assertEqual(len(list(self.db.iter_entries("2000-01-01", "2030-12-31", batch_size=5))), 12)
+        self.assertEqual(len(self.db.get_entries_after_id(0)), 12)
+        self.assertEqual(self.db.check_daily_consumption(), [])
+        self.assertEqual(self.db.rebuild_daily_consumption(), 12)
+        self.assertEqual(self.db.get_daily_consumption("2000-01-01", "2030-12-31"), daily)
+        self.assertEqual(len(other.get_entries_by_date_range("2000-01-01", "2030-12-31")), 12)
+        
+        # Backfilled years go to the archive covering them, or merge again
+        self.db.add_entries_bulk(
+            {"cat_name": "Lola", "initial_weight": 100.0, "remaining_weight": 40.0, "date": date}
+            for date in ("2011-01-01", "2005-01-01")
+        )
+        self.assertEqual(self.db.archive_entries(365, today=datetime.date(2026, 10, 17)), 2)
+        self.assertEqual(list(self.db.archive_years())[:2], ["2005", "2013"])
+        self.assertEqual(len(other.get_entries_by_date_range("2000-01-01", "2030-12-31")), 14)
+        self.assertEqual(self.db.check_daily_consumption(), [])
+        other.close()
+    
+    def test_reset_database_clears_archives(self):
+        """Test that a reset after archiving leaves every read path empty."""
+        self.addCleanup(shutil.rmtree, self.db.archive_dir, True)
+        for date in ["2024-12-31", "2025-06-01", "2026-10-01"]:
+            entry_id = self.db.add_entry("Lola", 100.0, date)
+            self.db.update_remaining_weight(entry_id, 40.0)
+        self.db.archive_entries(365, today=datetime.date(2026, 10, 17))
+        other = CatWeightDatabase(self.db_path)
+        self.assertEqual(len(other.get_entries_by_date_range("2000-01-01", "2030-12-31")), 3)
+        
+        self.db.reset_database()
+        
+        self.assertEqual(self.db.archive_years(), {})
+        self.assertEqual(self.db.get_entries_by_date_range("2000-01-01", "2030-12-31"), [])
+        self.assertEqual(list(self.db.iter_entries("2000-01-01", "2030-12-31")), [])
+        self.assertEqual(self.db.get_entries_after_id(0), [])
+        self.assertEqual(self.db.get_daily_consumption("2000-01-01", "2030-12-31"), {})
+        self.assertEqual(self.db.get_running_stats("2000-01-01", "2030-12-31"), {})
+        self.assertEqual(self.db.check_daily_consumption(), [])
+        
+        # A connection that still has the archives attached sees them emptied
+        self.assertEqual(other.get_entries_by_date_range("2000-01-01", "2030-12-31"), [])
+        other.close()
+    
+    def test_last_30_days_data_reads_archives(self):
+        """Test that entries archived with a cutoff inside the 30-day window stay in it."""
+        self.addCleanup(shutil.rmtree, self.db.archive_dir, True)
+        today = datetime.date.today()
+        for days_ago in (10, 2):
+            entry_id = self.db.add_entry("Lola", 100.0, (today - datetime.timedelta(days=days_ago)).isoformat())
+            self.db.update_remaining_weight(entry_id, 40.0)
+        before = self.db.get_last_30_days_data()
+        
+        self.assertEqual(self.db.archive_entries(5), 1)
+        self.assertEqual(self.db.get_last_30_days_data(), before)
+        self.assertEqual(len(before["Lola"]), 2)
+    
+    def test_range_queries_use_indexes(self):
+        """Test that the hot queries are served by indexes rather than table scans."""
+        queries = [
+            (f"{ENTRY_SELECT} WHERE w.date BETWEEN ? AND ? AND w.cat_id = {CAT_ID_SQL}",
+             ("2023-01-01", "2023-01-07", "Lola")),
+            (f"{ENTRY_SELECT} WHERE w.date BETWEEN ? AND ?",
+             ("2023-01-01", "2023-01-07")),
+            (f"{ENTRY_SELECT} WHERE w.cat_id = {CAT_ID_SQL} AND w.date = ? AND w.remaining_weight IS NULL",
+             ("Lola", "2023-01-01")),
+            ("DELETE FROM cat_weights WHERE date = ?", ("2023-01-01",)),
+        ]
+        
+        for query, params in queries:
+            self.db.cursor.execute("EXPLAIN QUERY PLAN " + query, params)
+            plan = " ".join(row["detail"] for row in self.db.cursor.fetchall())
+            self.assertRegex(plan, "USING (COVERING )?INDEX", query)
+
+
+
+class TestConnectionProfiles(unittest.TestCase):
+    """Tests for the connection tuning profiles."""
+    
+    def setUp(self):
+        """Set up a temporary database path for each test."""
+        self.temp_db = NamedTemporaryFile(delete=False)
+        self.db_path = self.temp_db.name
+        self.temp_db.close()
+    
+    def tearDown(self):
+        """Clean up after each test."""
+        os.unlink(self.db_path)
+    
+    def pragma(self, db, name):
+        db.cursor.execute(f"PRAGMA {name}")
+        return db.cursor.fetchone()[0]
+    
+    def test_default_profile_uses_wal(self):
+        """Test that a database opened without a profile runs in WAL mode."""
+        db = CatWeightDatabase(self.db_path)
+        try:
+            self.assertEqual(self.pragma(db, "journal_mode"), "wal")
+            self.assertEqual(self.pragma(db, "busy_timeout"), db.profile.busy_timeout)
+        finally:
+            db.close()
+    
+    def test_named_and_custom_profiles(self):
+        """Test applying a preset by name and a custom profile object."""
+        db = CatWeightDatabase(self.db_path, profile="durable")
+        try:
+            self.assertEqual(db.profile, PROFILES["durable"])
+            self.assertEqual(self.pragma(db, "synchronous"), 2)  # FULL
+        finally:
+            db.close()
+        
+        db = CatWeightDatabase(self.db_path, profile=ConnectionProfile(cache_size=-1234, busy_timeout=250))
+        try:
+            self.assertEqual(self.pragma(db, "cache_size"), -1234)
+            self.assertEqual(self.pragma(db, "busy_timeout"), 250)
+        finally:
+            db.close()
+    
+    def test_invalid_profiles(self):
+        """Test that unknown presets and settings are rejected."""
+        with self.assertRaises(ValueError):
+            get_profile("reckless")
+        with self.assertRaises(ValueError):
+            ConnectionProfile(synchronous="SOMETIMES")
+    
+    def test_reader_not_blocked_by_writer(self):
+        """Test that a reader can query while another connection holds the write lock."""
+        writer = CatWeightDatabase(self.db_path)
+        reader = CatWeightDatabase(self.db_path, profile=ConnectionProfile(busy_timeout=0))
+        try:
+            writer.add_entry("Lola", 100.0, "2023-01-01")
+            with writer.transaction() as cursor:
+                cursor.execute(
+                    "INSERT INTO cat_weights (cat_id, date, initial_weight, created_at) "
+                    f"VALUES ({CAT_ID_SQL}, '2023-01-02', 90.0, '2023-01-02T08:00:00')",
+                    ("Lola",)
+                )
+                # The uncommitted insert is not visible, but the read succeeds
+                entries = reader.get_entries_by_date_range("2023-01-01", "2023-01-31")
+                self.assertEqual(len(entries), 1)
+        finally:
+            reader.close()
+            writer.close()
+
 
 if __name__ == "__main__":
     unittest.main() 
\ No newline at end of file
@@ -0,0 +1,105 @@
+"""
+Unit tests for exporting the history to Parquet and Arrow IPC datasets.
+"""
+import unittest
+import os
+import sys
+import datetime
+import importlib.util
+import shutil
+from tempfile import TemporaryDirectory
+
+# Add the parent directory to the path so we can import the export module
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from db import CatWeightDatabase
+from export import export_daily, export_entries, read_history, read_state
+
+TODAY = datetime.date(2026, 10, 17)
+
+
+@unittest.skipUnless(importlib.util.find_spec("pyarrow"), "pyarrow is not installed")
+class TestExport(unittest.TestCase):
+    """Tests for the export module."""
+
+    def setUp(self):
+        """Set up a database with entries across two months for each test."""
+        self.temp_dir = TemporaryDirectory()
+        self.out_dir = os.path.join(self.temp_dir.name, "export")
+        self.db = CatWeightDatabase(os.path.join(self.temp_dir.name, "test.db"))
+        for date in ("2026-09-30", "2026-10-01", "2026-10-14"):
+            for cat_name in ("Lola", "Mittens"):
+                entry_id = self.db.add_entry(cat_name, 100.0, date)
+                self.db.update_remaining_weight(entry_id, 40.0)
+
+    def tearDown(self):
+        """Clean up after each test."""
+        self.db.close()
+        self.temp_dir.cleanup()
+
+    def test_export_entries_is_incremental(self):
+        """Test that each export appends only entries past the high-water mark and settled days."""
+        open_id = self.db.add_entry("Lola", 90.0, "2026-10-15")
+        self.assertEqual(export_entries(self.db, self.out_dir, today=TODAY, batch_size=4), 6)
+        self.assertEqual(read_state(os.path.join(self.out_dir, "entries"))["high_water_mark"], 6)
+        self.assertEqual(export_entries(self.db, self.out_dir, today=TODAY), 0)
+
+        # The entry from two days ago settles a day later, with its remaining weight
+        self.db.update_remaining_weight(open_id, 30.0)
+        self.assertEqual(export_entries(self.db, self.out_dir, today=TODAY + datetime.timedelta(days=1)), 1)
+
+        frame = read_history(self.out_dir)
+        self.assertEqual(list(frame["id"]), list(range(1, 8)))
+        self.assertEqual(frame["remaining_weight"].iloc[-1], 30.0)
+        self.assertEqual(list(frame.columns)[:3], ["id", "cat_name", "date"])
+        self.assertEqual(str(frame["cat_name"].dtype), "category")
+        self.assertTrue(str(frame["date"].dtype).startswith("datetime64"))
+        self.assertTrue(os.path.isdir(os.path.join(self.out_dir, "entries", "month=2026-09", "cat_name=Lola")))
+
+    def test_export_entries_reads_many_archives(self):
+        """Test that the export pages through more than ten archived years in id order."""
+        self.addCleanup(shutil.rmtree, self.db.archive_dir, True)
+        self.db.add_entries_bulk(
+            {"cat_name": "Lola", "initial_weight": 100.0, "remaining_weight": 40.0, "date": f"{year}-06-01"}
+            for year in range(2024, 2011, -1)
+        )
+        self.assertEqual(self.db.archive_entries(365, today=TODAY), 13)
+
+        self.assertEqual(export_entries(self.db, self.out_dir, today=TODAY, batch_size=4), 19)
+        self.assertEqual(read_state(os.path.join(self.out_dir, "entries"))["high_water_mark"], 19)
+        self.assertEqual(sorted(read_history(self.out_dir)["id"]), list(range(1, 20)))
+        self.assertEqual([e["id"] for e in self.db.get_entries_after_id(9, limit=3)], [10, 11, 12])
+
+    def test_read_history_filters(self):
+        """Test that read_history filters by date range and cat and loads only the requested columns."""
+        export_entries(self.db, self.out_dir, today=TODAY)
+
+        frame = read_history(self.out_dir, start_date="2026-10-01", end_date="2026-10-14",
+                             cat_names=["Mittens"], columns=["date", "initial_weight"])
+        self.assertEqual(list(frame.columns), ["date", "initial_weight"])
+        self.assertEqual([str(date.date()) for date in frame["date"]], ["2026-10-01", "2026-10-14"])
+        self.assertTrue(read_history(self.out_dir, start_date="2027-01-01").empty)
+        self.assertTrue(read_history(self.out_dir, "daily").empty)
+
+    def test_arrow_format_and_mismatch(self):
+        """Test exporting Arrow IPC files and refusing to mix formats in one dataset."""
+        self.assertEqual(export_entries(self.db, self.out_dir, file_format="arrow", today=TODAY), 6)
+        self.assertEqual(len(read_history(self.out_dir, cat_names=["Lola"])), 3)
+
+        with self.assertRaises(ValueError):
+            export_entries(self.db, self.out_dir, file_format="parquet", today=TODAY)
+        with self.assertRaises(ValueError):
+            export_daily(self.db, self.out_dir, file_format="csv", today=TODAY)
+
+    def test_export_daily(self):
+        """Test that daily totals are exported once per settled day."""
+        self.assertEqual(export_daily(self.db, self.out_dir, today=TODAY), 6)
+        self.assertEqual(read_state(os.path.join(self.out_dir, "daily"))["high_water_mark"], "2026-10-14")
+        self.assertEqual(export_daily(self.db, self.out_dir, today=TODAY), 0)
+
+        frame = read_history(self.out_dir, "daily", cat_names=["Lola"])
+        self.assertEqual(list(frame["consumed"]), [60.0, 60.0, 60.0])
+        self.assertEqual(list(frame.columns)[:3], ["cat_name", "date", "consumed"])
+
+
+if __name__ == "__main__":
+    unittest.main()
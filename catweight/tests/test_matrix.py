@@ -0,0 +1,121 @@
+"""
+Unit tests for the memory-mapped consumption matrix.
+"""
+import unittest
+import os
+import sys
+import datetime
+from tempfile import TemporaryDirectory
+
+import numpy as np
+
+# Add the parent directory to the path so we can import the matrix module
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from db import CatWeightDatabase
+from matrix import ConsumptionMatrix, default_matrix_path, day_index, existing_matrix
+from server import IngestServer
+
+
+class TestConsumptionMatrix(unittest.TestCase):
+    """Tests for the ConsumptionMatrix class and its upkeep by CatWeightDatabase."""
+
+    def setUp(self):
+        """Set up a database with a consumption matrix for each test."""
+        self.temp_dir = TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, "test.db")
+        self.matrix = ConsumptionMatrix(default_matrix_path(self.db_path))
+        self.db = CatWeightDatabase(self.db_path, matrix=self.matrix)
+        self.cat_ids = {cat["name"]: cat["id"] for cat in self.db.get_cats()}
+
+    def tearDown(self):
+        """Clean up after each test."""
+        self.db.close()
+        self.temp_dir.cleanup()
+
+    def test_writes_update_cells(self):
+        """Test that every kind of write leaves the cells equal to the rollup."""
+        self.assertTrue(self.matrix.is_built())
+        entry_id = self.db.add_entry("Lola", 100.0, "2026-10-16")
+        self.db.update_remaining_weight(entry_id, 30.0)
+        self.db.add_entry("Lola", 50.0, "2026-10-17")
+        cells = self.matrix.cat(self.cat_ids["Lola"], "2026-10-16", "2026-10-17")
+        self.assertEqual(cells["consumed"].tolist(), [70.0, 0.0])
+        self.assertEqual(cells["initial_total"].tolist(), [100.0, 0.0])
+        self.assertEqual(cells["complete_count"].tolist(), [1, 0])
+        self.assertEqual(cells["open_count"].tolist(), [0, 1])
+
+        self.db.add_entries_bulk([{"cat_name": "Mittens", "initial_weight": 90.0, "remaining_weight": 10.0, "date": "2025-01-01"}])
+        self.db.update_remaining_weights_bulk([(entry_id, 40.0)])
+        self.db.delete_entries_by_date("2026-10-17")
+        self.db.archive_entries(today=datetime.date(2026, 10, 17))
+        self.assertEqual(self.db.check_consumption_matrix(), [])
+        self.assertEqual(self.matrix.cat(self.cat_ids["Lola"], "2026-10-16", "2026-10-17")["consumed"].tolist(), [60.0, 0.0])
+
+        self.db.reset_database()
+        self.assertEqual(self.db.check_consumption_matrix(), [])
+        self.assertEqual(self.matrix.window("2026-01-01", "2026-10-17")["complete_count"].sum(), 0)
+
+    def test_window_views_and_padding(self):
+        """Test that ranges within the file are views and others zero-padded copies."""
+        self.db.update_remaining_weight(self.db.add_entry("Mittens", 80.0, "2026-10-17"), 20.0)
+        window = self.matrix.window("2026-10-01", "2026-10-17")
+        self.assertTrue(np.shares_memory(window, self.matrix.window("2026-10-17", "2026-10-17")))
+        self.assertEqual(window.shape, (self.matrix.shape[0], 17))
+        self.assertEqual(window[self.cat_ids["Mittens"], -1]["consumed"], 60.0)
+
+        padded = self.matrix.window("1969-12-31", "1970-01-02")
+        self.assertEqual(padded.shape[1], 3)
+        self.assertEqual(self.matrix.cat(10_000, "2026-10-17", "2026-10-18").tolist(), [(0.0, 0.0, 0, 0)] * 2)
+
+    def test_growth_is_seen_by_other_processes(self):
+        """Test that the file grows for new cats and days and other mappings follow it."""
+        other = ConsumptionMatrix(self.matrix.path)
+        shape = other.shape
+        far_day = (datetime.date.today() + datetime.timedelta(days=800)).isoformat()
+        for index in range(12):
+            self.db.add_entry(f"Cat {index}", 10.0, far_day)
+
+        self.assertGreater(other.shape[0], shape[0])
+        self.assertGreater(other.shape[1], day_index(far_day))
+        cat_id = self.db.get_cats()[-1]["id"]
+        self.assertEqual(other.cat(cat_id, far_day, far_day)["open_count"].tolist(), [1])
+
+    def test_ingestion_server_keeps_matrix_current(self):
+        """Test that the ingestion server writes through an existing matrix, and no other process creates one."""
+        server = IngestServer(("127.0.0.1", 0), self.db_path)
+        try:
+            self.db.update_remaining_weight(self.db.add_entry("Lola", 100.0, "2026-10-17"), 10.0)
+            server.committer.submit(lambda db: db.add_entries_bulk(
+                [{"cat_name": "Lola", "initial_weight": 100.0, "remaining_weight": 10.0, "date": "2026-10-17"}]
+            ))
+        finally:
+            server.server_close()
+
+        self.assertEqual(self.db.check_consumption_matrix(), [])
+        self.assertEqual(self.matrix.cat(self.cat_ids["Lola"], "2026-10-17", "2026-10-17")["consumed"].tolist(), [180.0])
+        self.assertIsNone(existing_matrix(os.path.join(self.temp_dir.name, "other.db")))
+
+    def test_rollback_and_rebuild(self):
+        """Test that rolled back writes leave no trace and that a stale matrix is rebuilt."""
+        with self.assertRaises(RuntimeError):
+            with self.db.transaction():
+                self.db.add_entry("Lola", 100.0, "2026-10-17")
+                raise RuntimeError("abort")
+        self.assertEqual(self.matrix.cat(self.cat_ids["Lola"], "2026-10-17", "2026-10-17")["open_count"].tolist(), [0])
+
+        # Writes made without the matrix leave it stale
+        other = CatWeightDatabase(self.db_path)
+        other.add_entry("Lola", 100.0, "2026-10-17")
+        other.close()
+        self.assertEqual(self.db.check_consumption_matrix(), [{"cat_name": "Lola", "date": "2026-10-17"}])
+        self.db.rebuild_consumption_matrix()
+        self.assertEqual(self.db.check_consumption_matrix(), [])
+
+        other = CatWeightDatabase(self.db_path)
+        with self.assertRaises(ValueError):
+            other.rebuild_consumption_matrix()
+        other.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
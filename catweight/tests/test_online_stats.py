@@ -0,0 +1,178 @@
+"""
+Unit tests for the running consumption statistics.
+"""
+import unittest
+import os
+import sys
+import random
+import datetime
+from tempfile import TemporaryDirectory
+
+import numpy as np
+
+# Add the parent directory to the path so we can import the modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from online_stats import RunningStats, bucket_start
+from db import CatWeightDatabase
+from analytics import compute_window_stats
+
+
+def stats_of(values, first_date="2024-01-01"):
+    """Build RunningStats by appending one tracked day per value."""
+    stats = RunningStats()
+    day = datetime.date.fromisoformat(first_date)
+    for offset, value in enumerate(values):
+        stats.add_day((day + datetime.timedelta(days=offset)).isoformat(), value, 1, value + 10.0, 10.0)
+    return stats
+
+
+class TestRunningStats(unittest.TestCase):
+    """Tests for the RunningStats class."""
+
+    def setUp(self):
+        """Set up a series of daily values."""
+        self.values = [52.0, 61.5, 40.0, 75.25, 58.0, 49.5, 66.0, 71.0, 38.5, 55.0, 60.0]
+
+    def assert_matches_numpy(self, stats, values):
+        """Assert spread and slope against NumPy on the same values."""
+        self.assertEqual(stats.days, len(values))
+        self.assertAlmostEqual(stats.consumed, sum(values))
+        self.assertAlmostEqual(stats.std, np.std(values))
+        self.assertAlmostEqual(stats.slope, np.polyfit(range(len(values)), values, 1)[0])
+
+    def test_add_day(self):
+        """Test appending days one at a time."""
+        self.assert_matches_numpy(stats_of(self.values), self.values)
+        self.assertEqual(stats_of([]).std, 0.0)
+        self.assertTrue(np.isnan(stats_of([50.0]).slope))
+
+    def test_merge(self):
+        """Test that merging consecutive periods equals adding all days."""
+        for split in range(len(self.values) + 1):
+            head = stats_of(self.values[:split])
+            tail = stats_of(self.values[split:], first_date="2024-02-01")
+            merged = head.merge(tail)
+            self.assert_matches_numpy(merged, self.values)
+            self.assertEqual(merged.meals, len(self.values))
+
+        # Merging leaves its inputs untouched
+        head = stats_of(self.values[:3])
+        head.merge(stats_of(self.values[3:], first_date="2024-02-01"))
+        self.assertEqual(head.days, 3)
+
+    def test_replace_day(self):
+        """Test changing the value of a tracked day."""
+        stats = stats_of(self.values)
+        changed = list(self.values)
+        changed[4] = 90.0
+
+        stats.replace_day(4, "2024-01-05", (58.0, 1, 68.0, 10.0), (90.0, 2, 110.0, 20.0))
+        self.assert_matches_numpy(stats, changed)
+        self.assertEqual(stats.meals, len(self.values) + 1)
+        self.assertEqual(stats.weekday_meals[datetime.date(2024, 1, 5).weekday()], 2)
+
+    def test_bucket_start(self):
+        """Test that buckets start on Mondays."""
+        self.assertEqual(bucket_start("2024-01-01"), "2024-01-01")
+        self.assertEqual(bucket_start("2024-01-07"), "2024-01-01")
+        self.assertEqual(bucket_start("2024-01-08"), "2024-01-08")
+
+
+class TestDatabaseRunningStats(unittest.TestCase):
+    """Tests for the running statistics kept by CatWeightDatabase."""
+
+    def setUp(self):
+        """Set up a temporary database."""
+        self.temp_dir = TemporaryDirectory()
+        self.db = CatWeightDatabase(os.path.join(self.temp_dir.name, "stats.db"))
+        self.base = datetime.date(2024, 3, 1)
+
+    def tearDown(self):
+        """Clean up after each test."""
+        self.db.close()
+        self.temp_dir.cleanup()
+
+    def date(self, offset):
+        """Get the ISO date a number of days after the base date."""
+        return (self.base + datetime.timedelta(days=offset)).isoformat()
+
+    def stored_stats(self):
+        """Read the running_stats table."""
+        return [tuple(row) for row in self.db.conn.execute("SELECT * FROM running_stats ORDER BY cat_id, bucket")]
+
+    def assert_consistent_with_rebuild(self):
+        """Assert that the incrementally kept table equals a full recomputation."""
+        incremental = self.stored_stats()
+        self.db.rebuild_running_stats()
+        rebuilt = self.stored_stats()
+
+        self.assertEqual(len(incremental), len(rebuilt))
+        for kept, expected in zip(incremental, rebuilt):
+            self.assertEqual(kept[:2], expected[:2])
+            self.assertEqual(kept[-1], expected[-1])
+            for value, expected_value in zip(kept[2:-1], expected[2:-1]):
+                self.assertAlmostEqual(value, expected_value, places=6)
+
+    def test_writes_keep_statistics_current(self):
+        """Test every write path against a full recomputation."""
+        rng = random.Random(7)
+        entry_ids = []
+        for _ in range(300):
+            date = self.date(rng.randrange(40))
+            cat = rng.choice(["Mittens", "Cheddar", "Lola"])
+            action = rng.random()
+            if action < 0.45:
+                entry_ids.append(self.db.add_entry(cat, round(rng.uniform(60, 150), 1), date))
+            elif action < 0.9 and entry_ids:
+                self.db.update_remaining_weight(rng.choice(entry_ids), round(rng.uniform(0, 50), 1))
+            elif action < 0.94:
+                self.db.delete_entries_by_date(date)
+            elif action < 0.97:
+                self.db.add_entries_bulk([{"cat_name": cat, "initial_weight": 100.0, "date": date, "remaining_weight": 25.0}])
+            elif entry_ids:
+                self.db.update_remaining_weights_bulk([(rng.choice(entry_ids), 10.0)])
+
+        self.assertGreater(len(self.stored_stats()), 0)
+        self.assert_consistent_with_rebuild()
+
+        self.db.reset_database()
+        self.assertEqual(self.stored_stats(), [])
+
+    def test_windows_match_daily_rollup(self):
+        """Test that window reads agree with statistics computed from daily totals."""
+        rng = random.Random(3)
+        for offset in range(45):
+            for cat in ["Mittens", "Cheddar"]:
+                if rng.random() < 0.8:
+                    entry_id = self.db.add_entry(cat, 100.0, self.date(offset))
+                    self.db.update_remaining_weight(entry_id, round(rng.uniform(0, 60), 1))
+
+        daily = self.db.get_daily_consumption(self.date(0), self.date(44))
+        for start, end in [(0, 44), (3, 40), (10, 12), (4, 10)]:
+            start_date, end_date = self.date(start), self.date(end)
+            expected = compute_window_stats(daily, start_date, end_date).per_cat
+            actual = compute_window_stats(daily, start_date, end_date,
+                                          running=self.db.get_running_stats(start_date, end_date)).per_cat
+
+            self.assertEqual(list(actual.index), list(expected.index))
+            self.assertEqual(list(actual["trend"]), list(expected["trend"]))
+            for column in ["total_consumed", "meals", "days_tracked", "consistency", "slope", "leftover_pct"]:
+                np.testing.assert_allclose(actual[column], expected[column], rtol=1e-9, err_msg=column)
+
+    def test_window_reads_skip_history(self):
+        """Test that whole weeks are read from running_stats, not day by day."""
+        for offset in range(60):
+            entry_id = self.db.add_entry("Lola", 100.0, self.date(offset))
+            self.db.update_remaining_weight(entry_id, 40.0)
+
+        statements = []
+        self.db.conn.set_trace_callback(statements.append)
+        stats = self.db.get_running_stats(self.date(0), self.date(59))["Lola"]
+
+        self.assertEqual(stats.days, 60)
+        self.assertAlmostEqual(stats.consumed, 60 * 60.0)
+        self.assertEqual(len(statements), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
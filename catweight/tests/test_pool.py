@@ -0,0 +1,96 @@
+"""
+Unit tests for the connection pool and pooled database access.
+"""
+import unittest
+import os
+import sys
+import threading
+from tempfile import TemporaryDirectory
+
+# Add the parent directory to the path so we can import the pool module
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from db import CatWeightDatabase
+from pool import ConnectionPool, PoolTimeout
+
+
+class TestConnectionPool(unittest.TestCase):
+    """Tests for the ConnectionPool class."""
+
+    def setUp(self):
+        """Set up a pool over a temporary database for each test."""
+        self.temp_dir = TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, "pool.db")
+        self.pool = ConnectionPool(self.db_path, max_size=3, timeout=0.2)
+        self.db = CatWeightDatabase(pool=self.pool)
+
+    def tearDown(self):
+        """Clean up after each test."""
+        self.db.close()
+        self.pool.close()
+        self.temp_dir.cleanup()
+
+    def test_connections_are_reused(self):
+        """Test that sequential calls reuse a single pooled connection."""
+        for day in range(1, 6):
+            self.db.add_entry("Lola", 100.0, f"2023-01-{day:02d}")
+
+        self.assertEqual(len(self.db.get_entries_by_date_range("2023-01-01", "2023-01-31")), 5)
+        self.assertEqual(self.pool.size, 1)
+        self.assertEqual(self.pool.idle, 1)
+
+    def test_acquire_times_out_when_exhausted(self):
+        """Test that acquire raises once max_size connections are checked out."""
+        conns = [self.pool.acquire() for _ in range(3)]
+        try:
+            with self.assertRaises(PoolTimeout):
+                self.pool.acquire()
+        finally:
+            for conn in conns:
+                self.pool.release(conn)
+
+        self.assertEqual(self.pool.idle, 3)
+
+    def test_shared_instance_across_threads(self):
+        """Test that one pooled instance can be used from many threads at once."""
+        errors = []
+
+        def record(cat_name):
+            try:
+                for day in range(1, 11):
+                    entry_id = self.db.add_entry(cat_name, 100.0, f"2023-01-{day:02d}")
+                    self.db.update_remaining_weight(entry_id, 25.0)
+                    self.db.get_daily_consumption("2023-01-01", "2023-01-31", cat_name)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=record, args=(f"Cat {i}",)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertLessEqual(self.pool.size, 3)
+        daily = self.db.get_daily_consumption("2023-01-01", "2023-01-31")
+        self.assertEqual(len(daily), 8)
+        self.assertTrue(all(day["consumed"] == 75.0 for days in daily.values() for day in days.values()))
+
+    def test_writes_join_enclosing_transaction(self):
+        """Test that writes inside transaction() are rolled back together."""
+        with self.assertRaises(RuntimeError):
+            with self.db.transaction():
+                self.db.add_entry("Lola", 100.0, "2023-01-01")
+                self.db.add_entry("Mittens", 100.0, "2023-01-01")
+                raise RuntimeError("abort")
+
+        self.assertEqual(self.db.get_entries_by_date_range("2023-01-01", "2023-01-01"), [])
+
+        with self.db.transaction():
+            self.db.add_entry("Lola", 100.0, "2023-01-01")
+            self.db.add_entry("Mittens", 100.0, "2023-01-01")
+
+        self.assertEqual(len(self.db.get_entries_by_date_range("2023-01-01", "2023-01-01")), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+"""
+Unit tests for routing households to their own database shards.
+"""
+import unittest
+import os
+import sys
+import threading
+import time
+from tempfile import TemporaryDirectory
+
+# Add the parent directory to the path so we can import the router module
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from db import SCHEMA_VERSION
+from router import ShardRouter
+
+
+class TestShardRouter(unittest.TestCase):
+    """Tests for the ShardRouter class."""
+
+    def setUp(self):
+        """Set up a router over a temporary directory for each test."""
+        self.temp_dir = TemporaryDirectory()
+        self.router = ShardRouter(self.temp_dir.name, max_open=2, max_workers=4)
+
+    def tearDown(self):
+        """Clean up after each test."""
+        self.router.close()
+        self.temp_dir.cleanup()
+
+    def test_households_are_isolated(self):
+        """Test that each household gets its own lazily created and migrated database."""
+        self.assertEqual(self.router.households(), [])
+        with self.router.shard("smith") as db:
+            self.assertEqual(db.get_schema_version(), SCHEMA_VERSION)
+            db.add_entry("Lola", 100.0, "2026-10-17")
+        with self.router.shard("jones") as db:
+            db.add_entry("Mittens", 80.0, "2026-10-17")
+
+        self.assertEqual(self.router.households(), ["jones", "smith"])
+        with self.router.shard("smith") as db:
+            self.assertEqual([e["cat_name"] for e in db.get_entries_by_date_range("2026-10-17", "2026-10-17")], ["Lola"])
+
+    def test_invalid_and_unknown_households(self):
+        """Test that unsafe ids are rejected and missing shards are not created on request."""
+        for household_id in ("", "../escape", "a/b", ".hidden", "x" * 65, None):
+            with self.assertRaises(ValueError):
+                self.router.shard_path(household_id)
+        with self.assertRaises(KeyError):
+            with self.router.shard("nobody", create=False):
+                pass
+        self.assertEqual(self.router.households(), [])
+
+    def test_lru_bounds_open_shards(self):
+        """Test that the least recently used idle shard is closed beyond max_open."""
+        for household_id in ("a", "b", "c"):
+            with self.router.shard(household_id) as db:
+                db.add_entry("Lola", 100.0, "2026-10-17")
+        self.assertEqual(self.router.open_count, 2)
+
+        with self.router.shard("a") as db:
+            # Reopened from disk with its data
+            self.assertEqual(len(db.get_entries_by_date_range("2026-10-17", "2026-10-17")), 1)
+
+    def test_shards_in_use_are_not_closed(self):
+        """Test that a shard stays usable while its block runs, however many others open."""
+        with self.router.shard("a") as db:
+            for household_id in ("b", "c", "d"):
+                with self.router.shard(household_id):
+                    pass
+            db.add_entry("Lola", 100.0, "2026-10-17")
+            self.assertEqual(self.router.open_count, 2)
+        self.assertEqual(self.router.open_count, 2)
+
+    def test_writer_does_not_block_other_households(self):
+        """Test that a write transaction held in one household leaves the others writable."""
+        with self.router.shard("hot") as hot, self.router.shard("quiet") as quiet:
+            locked = threading.Event()
+            done = threading.Event()
+
+            def hold_write_lock():
+                with hot.transaction():
+                    hot.add_entry("Lola", 100.0, "2026-10-17")
+                    locked.set()
+                    done.wait(5)
+
+            writer = threading.Thread(target=hold_write_lock)
+            writer.start()
+            locked.wait(5)
+            start = time.perf_counter()
+            quiet.add_entry("Lola", 90.0, "2026-10-17")
+            elapsed = time.perf_counter() - start
+            done.set()
+            writer.join()
+
+        self.assertLess(elapsed, 1.0)
+
+    def test_map_fans_out_to_all_households(self):
+        """Test that map runs on every household in parallel and collects results by id."""
+        for index, household_id in enumerate(["a", "b", "c", "d", "e"]):
+            with self.router.shard(household_id) as db:
+                for _ in range(index):
+                    db.add_entry("Lola", 100.0, "2026-10-17")
+
+        threads = set()
+
+        def count(db):
+            threads.add(threading.get_ident())
+            time.sleep(0.05)
+            return len(db.get_entries_by_date_range("2026-10-17", "2026-10-17"))
+
+        self.assertEqual(self.router.map(count), {"a": 0, "b": 1, "c": 2, "d": 3, "e": 4})
+        self.assertGreater(len(threads), 1)
+        self.assertLessEqual(self.router.open_count, 4)
+        self.assertEqual(self.router.migrate_all(), dict.fromkeys("abcde", SCHEMA_VERSION))
+        self.assertEqual(set(self.router.get_daily_consumption("2026-10-17", "2026-10-17")["e"]), {"Lola"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,148 @@
+"""
+Unit tests for the bowl scale feeding detector and sample retention.
+"""
+import unittest
+import os
+import sys
+import time
+import datetime
+from tempfile import TemporaryDirectory
+
+import numpy as np
+
+# Add the parent directory to the path so we can import the scale module
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from db import CatWeightDatabase
+from scale import BowlState, OPEN, apply_retention, detect_feedings, ingest_readings
+
+START = int(datetime.datetime(2026, 10, 17, 8, 0).timestamp())
+
+
+def eating(start_cg, end_cg, bite_cg=200, seconds_per_bite=10):
+    """Samples of a cat eating from start_cg down to end_cg in bites."""
+    bites = (start_cg - end_cg) // bite_cg
+    return np.repeat(start_cg - bite_cg * np.arange(1, bites + 1), seconds_per_bite)
+
+
+def feeding_day(seed=0):
+    """
+    One sample per second of a bowl fed three times, with scale noise.
+
+    The first meal is poured to 90 g, eaten down to 30 g and left alone until
+    the session times out; the second is poured to 80 g, eaten down to 50 g
+    and topped up to 95 g before it times out.
+    """
+    rng = np.random.default_rng(seed)
+    segments = [
+        np.zeros(60),                   # empty bowl
+        np.linspace(0, 9000, 6),        # pouring
+        np.full(120, 9000),
+        eating(9000, 3000),
+        np.full(2400, 3000),            # untouched until the session ends
+        np.linspace(3000, 8000, 11),    # poured slowly, 5 g per second
+        np.full(120, 8000),
+        eating(8000, 5000),
+        np.full(600, 5000),
+        np.linspace(5000, 9500, 6),     # topped up before the timeout
+        np.full(300, 9500),
+    ]
+    weights = np.concatenate(segments) + rng.integers(-30, 31, sum(len(s) for s in segments))
+    return np.arange(len(weights)) + START, np.maximum(weights, 0).astype(np.int64)
+
+
+class TestDetectFeedings(unittest.TestCase):
+    """Tests for the detect_feedings function."""
+
+    def test_feedings_detected(self):
+        """Test that refills and session ends are found with their weights."""
+        ts, weights = feeding_day()
+        state = BowlState()
+        events = detect_feedings(state, ts, weights)
+
+        self.assertEqual([e.kind for e in events], ["refill", "end", "refill", "end", "refill"])
+        for event, expected in zip(events, [9000, 3000, 8000, 5000, 9500]):
+            self.assertAlmostEqual(event.weight_cg, expected, delta=30)
+        self.assertEqual(state.phase, OPEN)
+
+    def test_chunks_match_single_pass(self):
+        """Test that feeding the stream in chunks gives the same events as at once."""
+        ts, weights = feeding_day(seed=1)
+        expected = detect_feedings(BowlState(), ts, weights)
+
+        state, events = BowlState(), []
+        for start in range(0, len(ts), 97):
+            events += detect_feedings(state, ts[start:start + 97], weights[start:start + 97])
+        self.assertEqual(events, expected)
+
+    def test_lifted_bowl_and_replays_ignored(self):
+        """Test that negative samples and samples already seen do not trigger events."""
+        state = BowlState()
+        ts = np.arange(300) + START
+        weights = np.full(300, 4000)
+        weights[100:110] = -2500
+        self.assertEqual(detect_feedings(state, ts, weights), [])
+
+        self.assertEqual(detect_feedings(state, ts, weights + 5000), [])
+        self.assertEqual(state.last_ts, ts[-1])
+
+    def test_keeps_up_with_many_bowls(self):
+        """Test that a day of samples is processed far faster than real time."""
+        ts, weights = feeding_day()
+        start = time.perf_counter()
+        state = BowlState()
+        for chunk in range(0, len(ts), 60):
+            detect_feedings(state, ts[chunk:chunk + 60], weights[chunk:chunk + 60])
+        elapsed = time.perf_counter() - start
+        # Each chunk covers a minute of one bowl; allow a thousand bowls
+        self.assertLess(elapsed, len(ts) / 1000)
+
+
+class TestIngestReadings(unittest.TestCase):
+    """Tests for storing samples and applying the retention policy."""
+
+    def setUp(self):
+        """Set up a test database in a temporary directory."""
+        self.temp_dir = TemporaryDirectory()
+        self.db = CatWeightDatabase(os.path.join(self.temp_dir.name, "scale.db"))
+
+    def tearDown(self):
+        """Clean up the temporary directory."""
+        self.db.close()
+        self.temp_dir.cleanup()
+
+    def test_entries_recorded_across_chunks(self):
+        """Test that detected feedings become entries, with state kept in the database."""
+        ts, weights = feeding_day()
+        for start in range(0, len(ts), 600):
+            ingest_readings(self.db, "Lola", ts[start:start + 600].tolist(), weights[start:start + 600].tolist())
+
+        entries = sorted(self.db.get_entries_by_date_range("2026-10-17", "2026-10-17"), key=lambda e: e["id"])
+        self.assertEqual(len(entries), 3)
+        self.assertAlmostEqual(entries[0]["initial_weight"], 90, delta=0.5)
+        self.assertAlmostEqual(entries[0]["remaining_weight"], 30, delta=0.5)
+        self.assertAlmostEqual(entries[1]["remaining_weight"], 50, delta=0.5)
+        self.assertIsNone(entries[2]["remaining_weight"])
+        self.assertEqual(self.db.get_scale_state("Lola")["entry_id"], entries[2]["id"])
+        self.assertEqual(self.db.count_scale_readings(), len(ts))
+
+    def test_retention(self):
+        """Test that old samples are averaged per bucket, then deleted, and pruning again is a no-op."""
+        day = 24 * 60 * 60
+        now = START + 400 * day
+        recent = np.arange(now - day - 120, now - day)
+        old = np.arange(now - 10 * day - 120, now - 10 * day)
+        ancient = np.arange(now - 380 * day, now - 380 * day + 60)
+        for ts in (recent, old, ancient):
+            self.db.add_scale_readings("Lola", ts.tolist(), [5000] * len(ts))
+
+        removed = apply_retention(self.db, now=now)
+        self.assertEqual(removed, len(ancient) + len(old) - 2)
+        self.assertEqual(self.db.count_scale_readings(), len(recent) + 2)
+
+        ts, weights = self.db.get_scale_readings("Lola", 0, now)
+        self.assertTrue((weights == 5000).all())
+        self.assertEqual(apply_retention(self.db, now=now), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
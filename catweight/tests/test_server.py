@@ -0,0 +1,245 @@
+"""
+Unit tests for the HTTP ingestion API.
+"""
+import unittest
+import os
+import sys
+import json
+import subprocess
+import threading
+import time
+import http.client
+import socket
+from tempfile import TemporaryDirectory
+
+# Add the parent directory to the path so we can import the server module
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from db import CatWeightDatabase
+from pool import ConnectionPool
+from server import GroupCommitter, IngestServer, MAX_BODY_BYTES
+
+
+class TestIngestServer(unittest.TestCase):
+    """Tests for the ingestion endpoints against a local server."""
+
+    def setUp(self):
+        """Start a server on a free port over a temporary database."""
+        self.temp_dir = TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, "server.db")
+        self.server = IngestServer(("127.0.0.1", 0), self.db_path, pool_size=4)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.client = http.client.HTTPConnection(*self.server.server_address, timeout=10)
+
+    def tearDown(self):
+        """Stop the server and clean up the temporary directory."""
+        self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+        self.temp_dir.cleanup()
+
+    def request(self, method, path, body=None):
+        """Send a request on the kept-alive connection and decode the JSON answer."""
+        self.client.request(method, path, body=None if body is None else json.dumps(body),
+                            headers={"Content-Type": "application/json"})
+        response = self.client.getresponse()
+        return response.status, json.loads(response.read())
+
+    def test_add_and_close_entry(self):
+        """Test adding an entry and recording its remaining weight."""
+        status, body = self.request("POST", "/entries", {"cat_name": "Lola", "initial_weight": 90, "date": "2026-10-17"})
+        self.assertEqual(status, 201)
+        entry_id = body["id"]
+
+        status, _ = self.request("POST", f"/entries/{entry_id}/remaining", {"remaining_weight": 25.5})
+        self.assertEqual(status, 200)
+
+        status, entries = self.request("GET", "/entries?start=2026-10-17&end=2026-10-17&cat_name=Lola")
+        self.assertEqual(status, 200)
+        self.assertEqual([(e["id"], e["initial_weight"], e["remaining_weight"]) for e in entries], [(entry_id, 90.0, 25.5)])
+
+    def test_batch(self):
+        """Test adding and closing many entries with one request."""
+        _, body = self.request("POST", "/entries", {"cat_name": "Mittens", "initial_weight": 100, "date": "2026-10-16"})
+        status, body = self.request("POST", "/batch", {
+            "entries": [{"cat_name": cat, "initial_weight": 80, "date": "2026-10-17"} for cat in ["Mittens", "Lola"]],
+            "remaining": [{"id": body["id"], "remaining_weight": 10}],
+        })
+
+        self.assertEqual(status, 200)
+        self.assertEqual(len(body["ids"]), 2)
+        self.assertEqual(body["closed"], 1)
+
+        db = CatWeightDatabase(self.db_path)
+        self.assertEqual(len(db.get_entries_by_date_range("2026-10-16", "2026-10-17")), 3)
+        self.assertEqual(db.get_daily_consumption("2026-10-16", "2026-10-16")["Mittens"]["2026-10-16"]["consumed"], 90.0)
+        db.close()
+
+    def test_archived_entry_conflict(self):
+        """Test that closing an archived entry is refused with 409."""
+        _, body = self.request("POST", "/entries", {"cat_name": "Lola", "initial_weight": 90, "date": "2020-01-01",
+                                                    "remaining_weight": 10})
+        db = CatWeightDatabase(self.db_path)
+        self.assertEqual(db.archive_entries(), 1)
+        db.close()
+
+        self.assertEqual(self.request("POST", f"/entries/{body['id']}/remaining", {"remaining_weight": 5})[0], 409)
+        status, _ = self.request("POST", "/batch", {"remaining": [{"id": body["id"], "remaining_weight": 5}]})
+        self.assertEqual(status, 409)
+
+    def test_readings(self):
+        """Test that posted scale samples are stored and turned into entries."""
+        start = 1_792_224_000
+        weights = [0] * 30 + [4000, 8000] + [8000] * 30
+        status, body = self.request("POST", "/readings", {
+            "cat_name": "Cheddar", "ts": list(range(start, start + len(weights))), "weight_cg": weights,
+        })
+
+        self.assertEqual(status, 200)
+        self.assertEqual(body["events"], [{"kind": "refill", "ts": start + 41, "weight_cg": 8000}])
+        self.assertEqual(self.request("POST", "/readings", {"cat_name": "Cheddar", "ts": [1, 2], "weight_cg": [5]})[0], 400)
+
+        db = CatWeightDatabase(self.db_path)
+        self.assertEqual(db.count_scale_readings(), len(weights))
+        self.assertEqual(db.get_scale_state("Cheddar")["phase"], "open")
+        db.close()
+
+    def test_invalid_requests(self):
+        """Test that invalid requests are rejected without writing."""
+        self.assertEqual(self.request("POST", "/entries", {"cat_name": "Lola", "initial_weight": 0})[0], 400)
+        self.assertEqual(self.request("POST", "/entries", {"cat_name": "Lola", "initial_weight": 10, "date": "17/10"})[0], 400)
+        self.assertEqual(self.request("POST", "/entries/99/remaining", {"remaining_weight": 5})[0], 404)
+        self.assertEqual(self.request("POST", "/batch", {"entries": [{"initial_weight": 5}]})[0], 400)
+        self.assertEqual(self.request("GET", "/nowhere")[0], 404)
+
+        self.client.request("POST", "/entries", body="{not json", headers={"Content-Type": "application/json"})
+        response = self.client.getresponse()
+        response.read()
+        self.assertEqual(response.status, 400)
+
+        self.assertEqual(self.request("GET", "/entries?start=2000-01-01&end=2100-01-01"), (200, []))
+
+    def test_rejected_bodies_close_connection(self):
+        """Test that a rejected body is not parsed as the next pipelined request."""
+        for length in [str(MAX_BODY_BYTES + 1), "-1", "ten"]:
+            with socket.create_connection(self.server.server_address, timeout=10) as sock:
+                sock.sendall(
+                    f"POST /entries HTTP/1.1\r\nHost: x\r\nContent-Length: {length}\r\n\r\n".encode()
+                    + b"GET /health HTTP/1.1\r\nHost: x\r\n\r\n"
+                )
+                reply = b""
+                while chunk := sock.recv(65536):
+                    reply += chunk
+
+            status = 413 if length.isdigit() else 400
+            self.assertTrue(reply.startswith(f"HTTP/1.1 {status}".encode()))
+            self.assertIn(b"Connection: close", reply)
+            self.assertEqual(reply.count(b"HTTP/1."), 1)
+
+    def test_no_pandas_or_matplotlib(self):
+        """Test that the server module loads without the dashboard's heavy dependencies."""
+        code = (
+            "import sys; sys.path.insert(0, sys.argv[1]); import server; "
+            "print(sorted(m for m in ('pandas', 'matplotlib', 'streamlit') if m in sys.modules))"
+        )
+        package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        output = subprocess.run([sys.executable, "-c", code, package_dir], capture_output=True, text=True, check=True)
+        self.assertEqual(output.stdout.strip(), "[]")
+
+
+class TestGroupCommitter(unittest.TestCase):
+    """Tests for the GroupCommitter class."""
+
+    def setUp(self):
+        """Set up a pooled database in a temporary directory, as the writer runs on its own thread."""
+        self.temp_dir = TemporaryDirectory()
+        self.pool = ConnectionPool(os.path.join(self.temp_dir.name, "group.db"), max_size=2)
+        self.db = CatWeightDatabase(pool=self.pool)
+
+    def tearDown(self):
+        """Close the pool and clean up the temporary directory."""
+        self.pool.close()
+        self.temp_dir.cleanup()
+
+    def test_concurrent_writes_share_commits(self):
+        """Test that writes queued together are committed together."""
+        committer = GroupCommitter(self.db, max_batch=64, max_delay=0.05)
+        results = []
+        threads = [
+            threading.Thread(target=lambda i=i: results.append(
+                committer.submit(lambda db: db.add_entry("Lola", 50.0 + i, "2026-10-17"))
+            ))
+            for i in range(20)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        committer.close()
+
+        self.assertEqual(len(set(results)), 20)
+        self.assertLess(committer.commits, 20)
+        self.assertEqual(len(self.db.get_entries_by_date_range("2026-10-17", "2026-10-17")), 20)
+
+    def test_writes_queued_during_commit_share_next(self):
+        """Test that without a delay, writes queued while a commit runs share the next one."""
+        committer = GroupCommitter(self.db)
+        started, release = threading.Event(), threading.Event()
+
+        def slow(db):
+            started.set()
+            release.wait()
+            return db.add_entry("Lola", 40.0, "2026-10-17")
+
+        threads = [threading.Thread(target=committer.submit, args=(slow,))]
+        threads[0].start()
+        started.wait()
+        threads += [
+            threading.Thread(target=committer.submit, args=(lambda db, i=i: db.add_entry("Lola", 50.0 + i, "2026-10-17"),))
+            for i in range(5)
+        ]
+        for thread in threads[1:]:
+            thread.start()
+        while committer._queue.qsize() < 5:
+            time.sleep(0.001)
+        release.set()
+        for thread in threads:
+            thread.join()
+        committer.close()
+
+        self.assertEqual(committer.commits, 2)
+        self.assertEqual(len(self.db.get_entries_by_date_range("2026-10-17", "2026-10-17")), 6)
+
+    def test_failing_write_isolated(self):
+        """Test that a failing write does not roll back the others in its batch."""
+        committer = GroupCommitter(self.db, max_batch=64, max_delay=0.05)
+
+        def fail(db):
+            db.add_entry("Cheddar", 10.0, "2026-10-17")
+            raise ValueError("bad reading")
+
+        outcomes = {}
+
+        def submit(name, write):
+            try:
+                outcomes[name] = committer.submit(write)
+            except ValueError as e:
+                outcomes[name] = str(e)
+
+        threads = [
+            threading.Thread(target=submit, args=("good", lambda db: db.add_entry("Lola", 50.0, "2026-10-17"))),
+            threading.Thread(target=submit, args=("bad", fail)),
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        committer.close()
+
+        self.assertEqual(outcomes["bad"], "bad reading")
+        entries = self.db.get_entries_by_date_range("2026-10-17", "2026-10-17")
+        self.assertEqual([(e["id"], e["cat_name"]) for e in entries], [(outcomes["good"], "Lola")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+"""
+SQLite connection tuning profiles for the cat weight tracking app.
+"""
+import os
+import sqlite3
+from dataclasses import dataclass
+from typing import Dict, Optional, Union
+
+
+JOURNAL_MODES = {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"}
+SYNCHRONOUS_LEVELS = {"OFF", "NORMAL", "FULL", "EXTRA"}
+TEMP_STORES = {"DEFAULT", "FILE", "MEMORY"}
+
+
+@dataclass(frozen=True)
+class ConnectionProfile:
+    """
+    PRAGMA settings applied to every connection opened by the database layer.
+
+    Attributes:
+        journal_mode: SQLite journal mode; WAL lets readers and a writer
+            proceed concurrently
+        synchronous: How often SQLite waits for fsync (OFF, NORMAL, FULL, EXTRA)
+        mmap_size: Bytes of the database file to memory-map, 0 disables mmap
+        cache_size: Page cache size; negative values are KiB, positive values pages
+        temp_store: Where temporary tables and indices live (DEFAULT, FILE, MEMORY)
+        busy_timeout: Milliseconds to wait for a lock before raising "database is locked"
+    """
+    journal_mode: str = "WAL"
+    synchronous: str = "NORMAL"
+    mmap_size: int = 64 * 1024 * 1024
+    cache_size: int = -16000
+    temp_store: str = "MEMORY"
+    busy_timeout: int = 5000
+
+    def __post_init__(self):
+        """Validate settings, since they are interpolated into PRAGMA statements."""
+        if self.journal_mode.upper() not in JOURNAL_MODES:
+            raise ValueError(f"Unknown journal_mode: {self.journal_mode}")
+        if self.synchronous.upper() not in SYNCHRONOUS_LEVELS:
+            raise ValueError(f"Unknown synchronous level: {self.synchronous}")
+        if self.temp_store.upper() not in TEMP_STORES:
+            raise ValueError(f"Unknown temp_store: {self.temp_store}")
+        for name in ("mmap_size", "cache_size", "busy_timeout"):
+            if not isinstance(getattr(self, name), int):
+                raise ValueError(f"{name} must be an integer")
+
+    def connect(self, db_path: str, check_same_thread: bool = True) -> sqlite3.Connection:
+        """
+        Open a connection to db_path configured with this profile.
+
+        Args:
+            db_path: Path to the SQLite database file
+            check_same_thread: Passed to sqlite3.connect; pooled connections
+                disable it because they move between threads
+
+        Returns:
+            A connection returning sqlite3.Row rows
+        """
+        conn = sqlite3.connect(db_path, timeout=self.busy_timeout / 1000, check_same_thread=check_same_thread)
+        conn.row_factory = sqlite3.Row
+        self.apply(conn)
+        return conn
+
+    def apply(self, conn: sqlite3.Connection):
+        """
+        Apply this profile to an open connection.
+
+        Args:
+            conn: The connection to configure
+        """
+        conn.execute(f"PRAGMA busy_timeout = {self.busy_timeout}")
+        conn.execute(f"PRAGMA journal_mode = {self.journal_mode}")
+        conn.execute(f"PRAGMA synchronous = {self.synchronous}")
+        conn.execute(f"PRAGMA mmap_size = {self.mmap_size}")
+        conn.execute(f"PRAGMA cache_size = {self.cache_size}")
+        conn.execute(f"PRAGMA temp_store = {self.temp_store}")
+
+
+# Named presets. "durable" survives power loss without losing committed
+# transactions, "balanced" may lose the last commits on power loss but never
+# corrupts the database, and "fast" trades durability for write throughput
+# (suitable for benchmarks and scratch databases).
+PROFILES: Dict[str, ConnectionProfile] = {
+    "durable": ConnectionProfile(
+        synchronous="FULL",
+        mmap_size=0,
+        cache_size=-8000,
+        temp_store="DEFAULT",
+    ),
+    "balanced": ConnectionProfile(),
+    "fast": ConnectionProfile(
+        synchronous="OFF",
+        mmap_size=256 * 1024 * 1024,
+        cache_size=-64000,
+        busy_timeout=10000,
+    ),
+}
+
+DEFAULT_PROFILE = "balanced"
+
+
+def get_profile(profile: Optional[Union[str, ConnectionProfile]] = None) -> ConnectionProfile:
+    """
+    Resolve a profile name or object to a ConnectionProfile.
+
+    Args:
+        profile: A ConnectionProfile, the name of a preset, or None to use the
+            CATWEIGHT_DB_PROFILE environment variable (falling back to "balanced")
+
+    Returns:
+        The resolved ConnectionProfile
+
+    Raises:
+        ValueError: If the name does not match a preset
+    """
+    if isinstance(profile, ConnectionProfile):
+        return profile
+
+    name = profile or os.environ.get("CATWEIGHT_DB_PROFILE", DEFAULT_PROFILE)
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Unknown connection profile: {name}") from None